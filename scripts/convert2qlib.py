@@ -2,48 +2,198 @@
 Convert every *.parquet in sample_data/ → Qlib store under qlib_data/daily/.
 Handles any common date column name or datetime index and tolerates
 missing OHLCV columns (keeps what it finds).
+
+    python scripts/convert2qlib.py [--src sample_data] [--dst qlib_data]
+                                   [--freq daily] [--workers N] [--force]
+
+• instruments convert in a process pool (--workers, default all cores)
+• an input whose content hash matches the last run is skipped – the
+  manifest (<dst>/<freq>/.convert_state.json) first compares [mtime, size],
+  then the sha256, so a touched-but-identical file is not re-converted
+• outputs are written atomically as lower-case <symbol>.parquet – the name
+  VixProvider._file looks up
+• every instrument's trading days are kept in .calendars/<symbol>.npy, and
+  calendar.txt is their sorted union (np.unique over one concatenation),
+  so unchanged instruments are never re-read
+• the manifest is flushed as results arrive: an interrupted run resumes
+  where it stopped
 """
-import os, glob, pandas as pd
+import argparse, glob, hashlib, json, os, re, tempfile, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np, pandas as pd
 
 RAW_DIR = "sample_data"              # put raw files here
-OUT_DIR = "qlib_data/daily"
-os.makedirs(OUT_DIR, exist_ok=True)
+OUT_DIR = "qlib_data"
+OHLCV   = ["open", "high", "low", "close", "volume", "adj close"]   # preferred (lower-case)
+MINUTE  = re.compile(r"_\d{4}-\d{2}-\d{2}$")      # <SYM>_<day>.parquet = intraday bars
+FLUSH_S = 2.0                                     # manifest flush interval
+
+# ── helpers ─────────────────────────────────────────────────────────
+def _atomic(dst: str, write, suffix: str):
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=suffix, dir=os.path.dirname(dst))
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
 
-# preferred column set (lower-case)
-OHLCV = ["open", "high", "low", "close", "volume"]
+def _write_text(text: str):
+    def write(p):
+        with open(p, "w") as fh:
+            fh.write(text)
+    return write
 
-calendar = set()
-for fp in glob.glob(f"{RAW_DIR}/*.parquet"):
-    sym = os.path.basename(fp).split(".")[0].upper()
-    df  = pd.read_parquet(fp)
+def _sig(fp: str) -> list:
+    st = os.stat(fp)
+    return [st.st_mtime_ns, st.st_size]
 
+def _sha256(fp: str) -> str:
+    h = hashlib.sha256()
+    with open(fp, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _frame(fp: str) -> pd.DataFrame:
+    df = pd.read_parquet(fp)
     # --- locate date column or use index ---
     for cand in ["datetime", "date", "timestamp"]:
         if cand in df.columns:
             df.index = pd.to_datetime(df[cand])
             break
     else:  # no column found → treat current index as datetime
-        df.index = pd.to_datetime(df.index)
-
-    # --- standardise column names ---
-    df.columns = [c.lower() for c in df.columns]
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df.index = pd.to_datetime(df.index)
 
-    # keep available OHLCV cols
+    # --- standardise column names (yfinance MultiIndex → first level) ---
+    df.columns = [(c[0] if isinstance(c, tuple) else c).lower() for c in df.columns]
     keep = [c for c in OHLCV if c in df.columns]
-    if not keep:
-        print(f"⚠️  {sym}: no OHLCV columns found → skipped")
-        continue
+    df = df[keep].rename_axis("datetime")
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df[~df.index.duplicated(keep="last")]
+
+# ── one instrument (runs in a worker) ───────────────────────────────
+def convert_one(task: dict) -> dict:
+    """
+    task = {sym, src, out, cal, prev}.  → {sym, status, ...manifest entry}.
+    status: "skip" (content unchanged), "wrote", "empty" (no OHLCV columns),
+    "error" (unreadable input – reported, does not stop the batch).
+    """
+    try:
+        return _convert(task)
+    except Exception as e:
+        return {"sym": task["sym"], "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+def _convert(task: dict) -> dict:
+    sym, src, prev = task["sym"], task["src"], task.get("prev") or {}
+    done = os.path.exists(task["out"]) and os.path.exists(task["cal"])
+    sig = _sig(src)
+    if done and prev.get("sig") == sig:
+        return {**prev, "sym": sym, "status": "skip"}
+    sha = _sha256(src)
+    if done and prev.get("sha256") == sha:
+        return {**prev, "sym": sym, "sig": sig, "status": "skip"}
+
+    df = _frame(src)
+    if df.empty or not len(df.columns):
+        return {"sym": sym, "status": "empty", "src": os.path.basename(src), "sig": sig, "sha256": sha}
+    wall = df.index.tz_localize(None) if df.index.tz is not None else df.index   # local dates
+    days = np.unique(wall.to_numpy().astype("datetime64[D]"))
+    _atomic(task["out"], lambda p: df.to_parquet(p), ".parquet")
+    _atomic(task["cal"], lambda p: np.save(p, days), ".npy")
+    return {"sym": sym, "status": "wrote", "src": os.path.basename(src), "sig": sig,
+            "sha256": sha, "rows": len(df), "columns": list(df.columns),
+            "first": str(days[0]), "last": str(days[-1])}
+
+# ── driver ──────────────────────────────────────────────────────────
+def _write_state(path: str, state: dict):
+    _atomic(path, _write_text(json.dumps(state, indent=1, sort_keys=True)), ".json")
+
+def merge_calendars(paths) -> np.ndarray:
+    """Sorted union of per-instrument datetime64[D] arrays."""
+    arrs = [np.load(p) for p in paths]
+    return np.unique(np.concatenate(arrs)) if arrs else np.array([], "datetime64[D]")
+
+def convert(src_dir=RAW_DIR, dst=OUT_DIR, freq="daily", workers=None, force=False) -> dict:
+    out_dir = os.path.join(dst, freq)
+    cal_dir = os.path.join(out_dir, ".calendars")
+    os.makedirs(cal_dir, exist_ok=True)
+    state_p = os.path.join(out_dir, ".convert_state.json")
+    state = {} if force or not os.path.exists(state_p) else json.load(open(state_p))
+
+    tasks = []
+    for fp in sorted(glob.glob(os.path.join(src_dir, "*.parquet"))):
+        stem = os.path.basename(fp).split(".")[0]
+        if MINUTE.search(stem):
+            continue
+        sym = stem.lower()
+        tasks.append({"sym": sym, "src": fp, "prev": state.get(sym),
+                      "out": os.path.join(out_dir, f"{sym}.parquet"),
+                      "cal": os.path.join(cal_dir, f"{sym}.npy")})
 
-    df = df[keep].sort_index()
+    # outputs of the old converter were upper-case – VixProvider never found them
+    syms = {t["sym"] for t in tasks}
+    for name in os.listdir(out_dir):
+        if name.endswith(".parquet") and name != name.lower() and name[:-8].lower() in syms:
+            os.remove(os.path.join(out_dir, name))
 
-    # write parquet
-    df.to_parquet(f"{OUT_DIR}/{sym}.parquet")
-    calendar.update(df.index)
-    print(f"✅  wrote {sym}.parquet with {len(df)} rows")
+    # cheap [mtime, size] check here, so an up-to-date store never starts a pool
+    counts, last = {"wrote": 0, "skip": 0, "empty": 0, "error": 0}, time.monotonic()
+    todo = []
+    for t in tasks:
+        prev = t["prev"] or {}
+        if prev.get("sig") == _sig(t["src"]) and os.path.exists(t["out"]) and os.path.exists(t["cal"]):
+            counts["skip"] += 1
+        else:
+            todo.append(t)
+    tasks = todo
+    workers = min(workers or os.cpu_count() or 1, max(1, len(tasks)))
+    if workers <= 1:
+        results = map(convert_one, tasks)
+    else:
+        # spawn: forking a parent whose pyarrow thread pools are live can deadlock
+        ex = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"))
+        results = (f.result() for f in as_completed([ex.submit(convert_one, t) for t in tasks]))
+    try:
+        for res in results:
+            sym, status = res.pop("sym"), res.pop("status")
+            counts[status] += 1
+            if status == "error":                       # keep the old entry, retry next run
+                print(f"❌  {sym}: {res['error']}")
+                continue
+            if status == "empty":
+                print(f"⚠️  {sym}: no OHLCV columns found → skipped")
+            state[sym] = res
+            if status == "wrote" and time.monotonic() - last > FLUSH_S:
+                _write_state(state_p, state)
+                last = time.monotonic()
+    finally:
+        if workers > 1:
+            ex.shutdown(cancel_futures=True)
+        _write_state(state_p, state)
 
-# write calendar
-with open(f"{OUT_DIR}/calendar.txt", "w") as fh:
-    for ts in sorted(calendar):
-        fh.write(ts.strftime('%Y-%m-%d') + '\n')
+    cal = merge_calendars(os.path.join(cal_dir, f"{s}.npy") for s, e in sorted(state.items())
+                          if "rows" in e and os.path.exists(os.path.join(cal_dir, f"{s}.npy")))
+    text = "".join(f"{d}\n" for d in cal.astype(str))
+    cal_p = os.path.join(out_dir, "calendar.txt")
+    if not os.path.exists(cal_p) or open(cal_p).read() != text:
+        _atomic(cal_p, _write_text(text), ".txt")
+    print(f"✅  {counts['wrote']} written, {counts['skip']} unchanged, {counts['empty']} skipped, "
+          f"{counts['error']} failed ({workers} workers)")
+    print("🗓  calendar.txt written with", len(cal), "trading days")
+    return {**counts, "days": len(cal)}
 
-print("🗓  calendar.txt written with", len(calendar), "trading days")
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default=RAW_DIR)
+    ap.add_argument("--dst", default=OUT_DIR)
+    ap.add_argument("--freq", default="daily")
+    ap.add_argument("--workers", type=int, default=None, help="default: all cores")
+    ap.add_argument("--force", action="store_true", help="ignore the manifest, convert everything")
+    args = ap.parse_args()
+    convert(args.src, args.dst, args.freq, args.workers, args.force)
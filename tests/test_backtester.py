@@ -0,0 +1,43 @@
+import time, numpy as np, pandas as pd, pytest
+import util, ledger, backtester
+
+@pytest.fixture
+def bars():
+    """Three weeks of RTH minute bars with a noisy quantile pair."""
+    days = pd.bdate_range("2025-06-02", periods=15)
+    idx = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(d + pd.Timedelta(hours=9, minutes=30), periods=390, freq="min")
+          .tz_localize("America/New_York").tz_convert("UTC").asi8 for d in days]), tz="UTC")
+    rng = np.random.default_rng(7)
+    price = 500 + np.cumsum(rng.normal(0, 0.05, len(idx)))
+    ret_lo = rng.normal(0, 0.002, len(idx))
+    return idx, price, ret_lo + 0.003, ret_lo
+
+def test_zone_signal_matches_live_rule():
+    assert backtester.zone_signal([0.003, 0.003, -0.001, 0.001], [0.001, -0.001, -0.003, -0.001]).tolist() \
+        == [1, 0, -1, 0]
+
+def test_replay_matches_bar_by_bar_book_trade(bars, tmp_path, monkeypatch):
+    idx, price, hi, lo = bars
+    sig = backtester.zone_signal(hi, lo)
+    res = backtester.replay(idx, price, sig, start_cash=2000, max_day_trades=3)
+
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    led = ledger.Ledger(f"{tmp_path}/ledger.db", start_cash=2000, max_day_trades=3)
+    local = idx.tz_convert("America/New_York").strftime("%Y-%m-%d %H:%M")
+    booked = [i for i in np.flatnonzero(sig)
+              if led.book("BUY" if sig[i] > 0 else "SELL", price[i], local[i]).startswith("EXECUTED")]
+    assert res["fills"].index.equals(idx[booked])
+    assert res["equity"]["cash"].iloc[-1] == pytest.approx(led.cash)
+    assert res["equity"]["pos"].iloc[-1] == led.pos
+    assert res["round_trips"] == led.frame()["day_trades"].sum() > 0
+    assert res["max_drawdown"] <= 0 and res["turnover"] > 0
+
+def test_year_of_minutes_replays_in_seconds():
+    n = 252 * 390
+    idx = pd.date_range("2024-01-02 14:30", periods=n, freq="min", tz="UTC")
+    rng = np.random.default_rng(1)
+    sig = rng.choice(np.array([-1, 0, 0, 0, 1], dtype=np.int8), n)
+    t = time.perf_counter()
+    res = backtester.replay(idx, 500 + rng.normal(0, 1, n), sig, start_cash=10_000)
+    assert time.perf_counter() - t < 10 and len(res["equity"]) == n
@@ -0,0 +1,44 @@
+import os, numpy as np, pandas as pd
+import barstore
+
+def bars(start, n, freq="D", seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range(start, periods=n, freq=freq, tz="UTC")
+    return pd.DataFrame({"close": rng.normal(100, 1, n)}, index=idx)
+
+# ---------------------------------------------------------------------
+def test_upsert_partitions_by_month_and_incoming_wins(tmp_path):
+    root = str(tmp_path)
+    df = bars("2025-01-20", 30)
+    barstore.upsert("SPY", "day", df, root=root)
+    assert [os.path.basename(p) for p in barstore.partitions("spy", "day", root)] \
+        == ["2025-01.parquet", "2025-02.parquet"]
+
+    jan = barstore.partition_path("spy", "day", "2025-01", root)
+    before = os.stat(jan).st_mtime_ns
+    fix = df.iloc[-2:] * 2                       # revise the last two February bars
+    barstore.upsert("spy", "day", fix, root=root)
+    assert os.stat(jan).st_mtime_ns == before    # January untouched
+
+    out = barstore.read("spy", "day", root=root)
+    assert len(out) == 30
+    assert np.allclose(out["close"].iloc[-2:], fix["close"])
+
+def test_append_ignores_rows_already_stored(tmp_path):
+    root = str(tmp_path)
+    df = bars("2025-03-01", 20)
+    barstore.append("spy", "day", df.iloc[:15], root=root)
+    barstore.append("spy", "day", df.iloc[10:] * 0 + 1, root=root)
+    out = barstore.read("spy", "day", root=root)
+    assert len(out) == 20
+    assert np.allclose(out["close"].iloc[:15], df["close"].iloc[:15])
+    assert (out["close"].iloc[15:] == 1).all()
+
+def test_range_read_opens_only_overlapping_months(tmp_path):
+    root = str(tmp_path)
+    barstore.upsert("spy", "minute", bars("2025-01-01", 90 * 24, "h"), root=root)
+    os.remove(barstore.partition_path("spy", "minute", "2025-01", root))
+    out = barstore.read("spy", "minute", "2025-02-10", "2025-02-11 12:00", root=root)
+    assert out.index.min() == pd.Timestamp("2025-02-10", tz="UTC")
+    assert out.index.max() == pd.Timestamp("2025-02-11 12:00", tz="UTC")
+    assert barstore.read("qqq", "day", root=root).empty
@@ -0,0 +1,38 @@
+import json, copy
+import util, bench
+
+FAST = ["build_eod", "build_intraday", "train_daily", "provider_load",
+        "provider_features", "live_predict", "live_trade_intraday", "book_trade"]
+
+# ---------------------------------------------------------------------
+def test_bench_writes_results_and_flags_regressions(tmp_path):
+    paths = copy.deepcopy(util.CFG["paths"])
+    out = tmp_path / "bench.json"
+    res = bench.run(years=2, months=0.2, n_symbols=4, repeat=1, only=FAST,
+                    baseline=str(tmp_path / "none.json"), out=str(out))
+    assert util.CFG["paths"] == paths                  # sandbox restored the config
+    assert json.loads(out.read_text())["cases"].keys() == set(FAST)
+    assert res["meta"]["scale"]["symbols"] == 4 and res["meta"]["minute_bars"] == 4 * 390
+    for r in res["cases"].values():
+        assert r["seconds"] > 0 and r["peak_mb"] >= 0 and r["arrow_mb"] >= 0
+    assert res["cases"]["build_intraday"]["arrow_mb"] > 0      # Parquet reads seen at all
+    assert res["cases"]["book_trade"]["per_op"] < res["cases"]["book_trade"]["seconds"]
+
+    fast = copy.deepcopy(res)
+    fast["cases"]["train_daily"]["seconds"] /= 10
+    flagged = bench.compare(res, fast, tolerance=0.25)
+    assert [(r["case"], r["metric"]) for r in flagged] == [("train_daily", "seconds")]
+    assert bench.compare(res, res, tolerance=0.25) == []
+    heavy = copy.deepcopy(res)
+    heavy["cases"]["build_intraday"]["arrow_mb"] += 64
+    assert [(r["case"], r["metric"]) for r in bench.compare(heavy, res, 0.25)] == \
+           [("build_intraday", "arrow_mb")]
+    fast["meta"]["scale"]["years"] = 5                 # different scale → not comparable
+    assert bench.compare(res, fast, tolerance=0.25) == []
+
+def test_arrow_peak_sees_parquet_buffers(tmp_path):
+    import numpy as np, pandas as pd
+    pd.DataFrame({"x": np.arange(2_000_000, dtype=np.float64)}).to_parquet(tmp_path / "x.parquet")
+    with bench._arrow_peak() as arrow:
+        pd.read_parquet(tmp_path / "x.parquet")
+    assert arrow["bytes"] >= 16e6                       # the decoded column, never in tracemalloc
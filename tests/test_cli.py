@@ -0,0 +1,96 @@
+import json, os, re, shlex, subprocess, sys, time, yaml
+import numpy as np, pandas as pd, pytest
+from lightgbm import LGBMClassifier, LGBMRegressor
+from sklearn.preprocessing import StandardScaler
+import util, registry, live_predict, cli, profiler
+from boosters import lite_bundle, lite_spec
+from dataset_io import read_last, read_tail, write_parquet_atomic
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vix_slope_system")
+
+@pytest.fixture
+def eod(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"model": f"{tmp_path}/", "ready": f"{tmp_path}/",
+                                            "reports": f"{tmp_path}/"})
+    monkeypatch.setattr(registry, "_LOADED", {})
+    monkeypatch.setattr(registry, "_LITE", {})
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2020-01-01", periods=400, freq="D", tz="UTC", name="t")
+    df = pd.DataFrame(rng.normal(size=(400, 3)), index=idx, columns=["S1", "S1_Z", "RV5"])
+    df.iloc[-1, 1] = np.inf                               # scored as missing
+    df["SPY"] = 400.0
+    for h in ("5D", "10D"):
+        df[f"TARGET_{h}"] = np.where(df["S1"] + rng.normal(size=400) > 0, 1.0, -1.0)
+    write_parquet_atomic(df, f"{tmp_path}/dataset_eod.parquet", row_group_size=64)
+    feats = ["S1", "S1_Z", "RV5"]
+    x = df[feats].replace(np.inf, np.nan)
+    for tag in ("5d", "10d"):
+        sc = StandardScaler().fit(x)
+        m = LGBMClassifier(n_estimators=20, verbosity=-1).fit(sc.transform(x), df[f"TARGET_{tag.upper()}"])
+        registry.publish(f"daily_clf_{tag}", {"scaler": sc, "model": m}, rows=len(df), features=feats)
+    return df
+
+# ---------------------------------------------------------------------
+def test_tree_model_matches_lightgbm_with_missing_values():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(600, 4))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    y = (np.nan_to_num(X[:, 0]) + rng.normal(size=600) > 0).astype(int)
+    clf = LGBMClassifier(n_estimators=30, verbosity=-1).fit(X, y)
+    q = LGBMRegressor(objective="quantile", alpha=0.9, n_estimators=30, verbosity=-1)
+    q.fit(X, y + rng.normal(size=600))
+    lite = lite_bundle(lite_spec({"scaler": StandardScaler().fit(X), "clf": clf, "q": q}))
+    assert np.allclose(lite["clf"].predict_proba(X), clf.predict_proba(X), atol=1e-12)
+    assert np.allclose(lite["q"].predict(X), q.predict(X), atol=1e-12)
+    with pytest.raises(ValueError):
+        lite_spec({"scaler": StandardScaler().fit(X), "model": "not-a-booster"})
+
+def test_read_last_matches_read_tail(eod, tmp_path):
+    when, row = read_last(f"{tmp_path}/dataset_eod.parquet", ["S1", "S1_Z", "TARGET_5D"])
+    tail = read_tail(f"{tmp_path}/dataset_eod.parquet", 1)
+    assert when == tail.index[-1].to_pydatetime()
+    assert row["S1"] == tail["S1"].iloc[-1] and row["S1_Z"] == np.inf
+    assert row["TARGET_5D"] == tail["TARGET_5D"].iloc[-1]
+
+def test_score_latest_matches_score_and_ignores_stale_lite(eod):
+    when, p = live_predict.score_latest()
+    full = live_predict.score(live_predict.latest_row()).iloc[-1]
+    assert when == eod.index[-1].to_pydatetime()
+    assert abs(p["5d"] - full["5d"]) < 1e-12 and abs(p["10d"] - full["10d"]) < 1e-12
+
+    path = registry._lite_path("daily_clf_5d", registry.read_state(registry._pointer("daily_clf_5d")))
+    spec = json.load(open(path))
+    json.dump({**spec, "source": "other"}, open(path, "w"))
+    registry._LITE.clear()
+    assert registry.load_lite("daily_clf_5d") is None and live_predict.score_latest() is None
+    registry._LOADED.clear()
+    registry.load("daily_clf_5d")                         # unpickling backfills the artifact
+    assert registry.load_lite("daily_clf_5d") is not None
+
+def test_cold_cli_predict_skips_the_heavy_stacks(eod, tmp_path):
+    cfg = tmp_path / "config.yml"
+    cfg.write_text(yaml.safe_dump(util.CFG))
+    probe = ("import sys, cli; cli.main(['predict']); "
+             "print(sorted(m for m in ('pandas', 'sklearn', 'lightgbm', 'joblib') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", probe], cwd=SRC, capture_output=True, text=True,
+                         env={**os.environ, "VIX_CONFIG": str(cfg)}, check=True).stdout
+    assert out.rstrip().endswith("[]")
+    assert f"{eod.index[-1]:%Y-%m-%d}\n  5-day : " in out
+
+    quiet = subprocess.run([sys.executable, "-c", "import live_trade_intraday, train_backtest, data_etl"],
+                           cwd=SRC, capture_output=True, text=True, check=True)
+    assert quiet.stdout == ""                             # no ENTER / EXIT banners on import
+
+def test_legacy_loop_stages_are_cli_commands_and_profiled(tmp_path, monkeypatch):
+    sh = open(os.path.join(SRC, "auto_loop.sh")).read()
+    blocks = re.findall(r'run_block "[^"]+" \\\n\s*(.+)', sh)
+    cmds = [c for b in blocks for c in shlex.split(b)]
+    assert cmds == ["fetch intraday", "build", "trade", "fetch eod", "build", "train", "predict"]
+    for c in cmds:
+        cli.parser().parse_args(c.split())                   # every stage is a real subcommand
+
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.setitem(util.CFG, "profile", {"enabled": True, "interval_ms": 1})
+    monkeypatch.setattr(live_predict, "main", lambda: time.sleep(0.05))
+    cli.main(["predict"])
+    assert len(profiler.runs("predict")) == 1
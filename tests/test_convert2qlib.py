@@ -0,0 +1,53 @@
+import sys, pathlib, numpy as np, pandas as pd, pytest
+from vix_provider.vix_provider import VixProvider
+
+# importable by name, so spawned pool workers can unpickle convert_one
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "scripts"))
+import convert2qlib as conv
+
+@pytest.fixture
+def raw(tmp_path):
+    src = tmp_path / "raw"
+    src.mkdir()
+    rng = np.random.default_rng(0)
+    for i, sym in enumerate(["SPY", "vixy", "vxz"]):
+        idx = pd.date_range(f"2024-01-0{i + 1}", periods=50 - 5 * i, freq="B", tz="UTC", name="t")
+        pd.DataFrame({"Adj Close": 100 + rng.normal(size=len(idx)).cumsum()},
+                     index=idx).to_parquet(src / f"{sym}.parquet")
+    # intraday bars (yfinance MultiIndex columns) are not daily instruments
+    pd.DataFrame({("Close", "SPY"): [1.0]}, index=pd.DatetimeIndex(["2024-01-02"])) \
+      .to_parquet(src / "SPY_2024-01-02.parquet")
+    return src, tmp_path / "qlib"
+
+# ---------------------------------------------------------------------
+def test_convert_layout_calendar_and_provider(raw):
+    src, dst = raw
+    res = conv.convert(str(src), str(dst), workers=2)
+    assert res["wrote"] == 3
+    daily = dst / "daily"
+    assert sorted(p.name for p in daily.glob("*.parquet")) == ["spy.parquet", "vixy.parquet", "vxz.parquet"]
+
+    union = sorted(set().union(*(pd.read_parquet(p).index.strftime("%Y-%m-%d")
+                                 for p in src.glob("[!S]*.parquet")),
+                               pd.read_parquet(src / "SPY.parquet").index.strftime("%Y-%m-%d")))
+    assert (daily / "calendar.txt").read_text().split() == union
+
+    prov = VixProvider(str(dst), factor_cache=None)
+    assert sorted(prov.instruments()) == ["SPY", "VIXY", "VXZ"]
+    close = prov.load(["$close"], ["SPY"], "daily")["close"]
+    assert np.allclose(close.to_numpy(), pd.read_parquet(src / "SPY.parquet")["Adj Close"])
+
+def test_rerun_skips_unchanged_content(raw):
+    src, dst = raw
+    conv.convert(str(src), str(dst), workers=1)
+    out = dst / "daily" / "vixy.parquet"
+    mtime = out.stat().st_mtime_ns
+
+    (src / "vxz.parquet").touch()                       # same bytes, new mtime
+    df = pd.read_parquet(src / "SPY.parquet")
+    df.iloc[-1, 0] += 1.0
+    df.to_parquet(src / "SPY.parquet")                  # real change
+    res = conv.convert(str(src), str(dst), workers=1)
+    assert (res["wrote"], res["skip"]) == (1, 2)
+    assert out.stat().st_mtime_ns == mtime
+    assert conv.convert(str(src), str(dst), workers=1)["wrote"] == 0
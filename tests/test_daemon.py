@@ -0,0 +1,75 @@
+import json, datetime as dt, pandas as pd
+import util, market, daemon
+
+def test_cycle_runs_closed_stages_and_records_latency(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.setattr(market, "is_open", lambda now=None: False)
+    ran = []
+    def boom():
+        raise RuntimeError("stage blew up")
+    monkeypatch.setattr(daemon, "CLOSED", [("a", lambda: ran.append("a")),
+                                           ("b", boom),
+                                           ("c", lambda: ran.append("c"))])
+    monkeypatch.setattr(daemon, "STATS", {})
+    assert daemon.cycle() is False
+    assert ran == ["a", "c"]                     # a failing stage doesn't stop the cycle
+    stats = json.loads((tmp_path / "daemon_stats.json").read_text())["stages"]
+    assert stats["b"]["errors"] == 1 and stats["a"]["runs"] == 1
+
+def test_market_calendar_sessions():
+    assert market.session(dt.date(2025, 6, 19)) is None            # Juneteenth
+    op, cl = market.session(dt.date(2025, 6, 20))
+    assert market.is_open(op + pd.Timedelta(minutes=1))
+    assert not market.is_open(cl + pd.Timedelta(minutes=1))
+    assert market.last_market_day(dt.date(2025, 6, 22)) == dt.date(2025, 6, 20)
+    assert market.next_open(cl) == market.session(dt.date(2025, 6, 23))[0]
+    assert market.last_closed_session(cl - pd.Timedelta(seconds=1)) == dt.date(2025, 6, 18)
+    assert market.last_closed_session(cl) == dt.date(2025, 6, 20)
+
+def test_eod_fetch_waits_for_the_session_to_close(tmp_path, monkeypatch):
+    import data_etl
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.setattr(daemon, "STATS", {})
+    monkeypatch.setattr(daemon, "CLOSED", [("etl_eod", daemon.etl_eod)])
+    monkeypatch.setattr(daemon, "_EOD_DONE", {"day": dt.date(2025, 6, 18)})   # fetched last evening
+    fetched = []
+    def fetch(mode):
+        fetched.append(market.now_utc())
+        return {"spy": market.last_closed_session(), "vixy": market.last_closed_session()}
+    monkeypatch.setattr(data_etl, "main", fetch)
+    op, cl = market.session(dt.date(2025, 6, 20))
+    for now in (op - pd.Timedelta(hours=2), cl + pd.Timedelta(minutes=5), cl + pd.Timedelta(hours=1)):
+        monkeypatch.setattr(market, "now_utc", lambda now=now: now)
+        assert daemon.cycle() is False
+    assert fetched == [cl + pd.Timedelta(minutes=5)]        # pre-open cycle didn't latch today
+    assert daemon._EOD_DONE["day"] == dt.date(2025, 6, 20)
+
+def test_eod_fetch_retries_until_every_symbol_has_the_bar(tmp_path, monkeypatch):
+    import data_etl, barstore
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/", "raw": f"{tmp_path}/",
+                                            "store": f"{tmp_path}/store/"})
+    monkeypatch.setitem(util.CFG, "symbols", ["spy", "vixy"])
+    monkeypatch.setattr(daemon, "STATS", {})
+    monkeypatch.setattr(daemon, "CLOSED", [("etl_eod", daemon.etl_eod)])
+    monkeypatch.setattr(daemon, "_EOD_DONE", {"day": dt.date(2025, 6, 18)})
+    bar = lambda d: pd.DataFrame({"close": [1.0]}, index=pd.DatetimeIndex(
+        [pd.Timestamp(d, tz="America/New_York").tz_convert("UTC")]))
+    for tag in ("spy", "vixy"):
+        barstore.upsert(tag, "day", bar("2025-06-18").rename(columns={"close": "Adj Close"}))
+    calls = []
+    def fetch_many(jobs):
+        calls.append(sorted(jobs))
+        if len(calls) == 1:                              # polygon hasn't published vixy yet
+            return {"spy": bar("2025-06-20"), "vixy": RuntimeError("HTTP 503")}
+        return {t: bar("2025-06-20") for t in jobs}
+    import polygon_fetch
+    monkeypatch.setattr(polygon_fetch, "fetch_many", fetch_many)
+    cl = market.session(dt.date(2025, 6, 20))[1]
+    for mins in (1, 10, 20):
+        monkeypatch.setattr(market, "now_utc", lambda m=mins: cl + pd.Timedelta(minutes=m))
+        daemon.cycle()
+        if mins == 1:
+            assert daemon._EOD_DONE["day"] == dt.date(2025, 6, 18)      # not latched on a failure
+    assert len(calls) == 2                               # retried once, then latched
+    assert daemon._EOD_DONE["day"] == dt.date(2025, 6, 20)
+    assert data_etl.last_bar_day("vixy") == dt.date(2025, 6, 20)
@@ -0,0 +1,94 @@
+import numpy as np, pandas as pd, pyarrow as pa, pyarrow.parquet as pq, pytest
+import os
+from dataset_io import (write_ready, append_ready, read_ready, read_tail, read_last,
+                        parquet_columns, file_sig, segments)
+
+def frame(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-02 14:30", periods=n, freq="min", tz="UTC", name="ts")
+    df = pd.DataFrame({"SPY": 470 + rng.normal(size=n).cumsum() * .05,
+                       "RET1": rng.normal(0, 1e-3, n), "MA10": rng.normal(0, 1e-2, n)},
+                      index=idx)
+    df["TARGET_5D"] = np.where(rng.normal(size=n) > 0, 1.0, -1.0)
+    df.iloc[-5:, -1] = np.nan                    # look-ahead not arrived yet
+    return df
+
+# ---------------------------------------------------------------------
+def test_ready_schema_round_trips_within_float32_tolerance(tmp_path):
+    df, p = frame(), tmp_path / "ready.parquet"
+    write_ready(df, p, exact=("SPY",))
+    schema = pq.read_schema(p)
+    assert schema.field("ts").type == pa.int64()
+    assert schema.field("SPY").type == pa.float64()
+    assert schema.field("RET1").type == pa.float32()
+    assert schema.field("TARGET_5D").type == pa.int8()
+    assert parquet_columns(p) == list(df.columns)
+
+    out = read_ready(p)
+    pd.testing.assert_index_equal(out.index, df.index.as_unit("ns"))
+    pd.testing.assert_series_equal(out["SPY"], df["SPY"].set_axis(out.index))
+    for c in ("RET1", "MA10"):
+        np.testing.assert_allclose(out[c], df[c], rtol=1e-6)
+    np.testing.assert_array_equal(out["TARGET_5D"], df["TARGET_5D"])   # NaN tail included
+
+def test_range_and_tail_reads_skip_row_groups(tmp_path, monkeypatch):
+    df, p = frame(), tmp_path / "ready.parquet"
+    write_ready(df, p, row_group_size=100)
+    seen = []
+    orig = pq.ParquetFile.read_row_groups
+    monkeypatch.setattr(pq.ParquetFile, "read_row_groups",
+                        lambda self, g, **kw: seen.append(list(g)) or orig(self, g, **kw))
+
+    lo, hi = df.index[250], df.index[420]
+    out = read_ready(p, columns=["RET1"], start=lo, end=hi)
+    assert list(out.columns) == ["RET1"] and len(out) == 171
+    assert seen[-1] == [2, 3, 4]
+    assert read_ready(p, end="2024-01-02").index[-1] == pd.Timestamp("2024-01-02 23:59", tz="UTC")
+
+    tail = read_tail(p, 3)
+    assert seen[-1] == [9]
+    pd.testing.assert_frame_equal(tail, read_ready(p).tail(3))
+
+def test_legacy_pandas_files_still_read(tmp_path):
+    df, p = frame(), tmp_path / "legacy.parquet"
+    df.to_parquet(p)
+    out = read_ready(p, start=df.index[10], end=df.index[19])
+    pd.testing.assert_frame_equal(out, df.iloc[10:20], check_freq=False)
+
+def test_append_ready_adds_segments_without_rewriting_the_base(tmp_path):
+    df, p = frame(), tmp_path / "ready.parquet"
+    write_ready(df.iloc[:600], p, exact=("SPY",), row_group_size=100)
+    base, sigs = os.stat(p).st_mtime_ns, {str(file_sig(p))}
+    for a, b in ((600, 650), (650, 700), (700, 860), (860, 1000)):
+        append_ready(df.iloc[a:b], p, exact=("SPY",), row_group_size=100)
+        sigs.add(str(file_sig(p)))
+    assert os.stat(p).st_mtime_ns == base and len(sigs) == 5
+    assert len(segments(p)) == 4                     # base + [50+50], [160], [140]
+
+    full = read_ready(p)
+    pd.testing.assert_index_equal(full.index, df.index.as_unit("ns"))
+    np.testing.assert_array_equal(full["TARGET_5D"], df["TARGET_5D"])
+    pd.testing.assert_series_equal(full["SPY"], df["SPY"].set_axis(full.index))
+    pd.testing.assert_frame_equal(read_ready(p, start=df.index[590], end=df.index[710]),
+                                  full.iloc[590:711])
+    pd.testing.assert_frame_equal(read_tail(p, 3), full.tail(3))
+    assert read_last(p)[0] == df.index[-1].to_pydatetime()
+
+    write_ready(df.iloc[:10], p)                     # full rewrite drops the segments
+    assert segments(p) == [str(p)] and len(read_ready(p)) == 10
+
+@pytest.mark.parametrize("legacy", [False, True])
+def test_naive_bounds_are_read_in_the_index_zone(tmp_path, legacy):
+    idx = pd.date_range("2020-05-29", "2020-06-05", freq="h", tz="America/New_York", name="ts")
+    df = pd.DataFrame({"RET1": np.arange(len(idx), dtype=np.float32)}, index=idx)
+    p = tmp_path / "ny.parquet"
+    df.to_parquet(p) if legacy else write_ready(df, p, row_group_size=24)
+    check = lambda got, want: pd.testing.assert_frame_equal(got, want.set_axis(want.index.as_unit(got.index.unit)),
+                                                            check_freq=False)
+    day = read_ready(p, start="2020-06-01", end="2020-06-02")
+    check(day, df.loc["2020-06-01":"2020-06-02"])
+    assert day.index[0].hour == 0 and day.index[-1].hour == 23       # whole NY days
+    check(read_ready(p, end="2020-06-02", tail=3), df.loc[:"2020-06-02"].tail(3))
+    lo, hi = pd.Timestamp("2020-06-01 09:00"), pd.Timestamp("2020-06-01 16:00")
+    check(read_ready(p, start=lo, end=hi), df.loc[lo.tz_localize(idx.tz):hi.tz_localize(idx.tz)])
+    check(read_tail(p, None, since=lo), df.loc[lo.tz_localize(idx.tz):])
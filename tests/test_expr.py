@@ -0,0 +1,121 @@
+import numpy as np, pandas as pd, pytest
+import util, feature_engineering as fe
+from vix_provider import expr
+from vix_provider.vix_provider import VixProvider
+from vix_provider.features import FEATURES
+
+EOD = ["S1", "S1_Z", "S1_PCT", "RV5", "TARGET_5D", "TARGET_10D"]
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "daily").mkdir()
+    rng = np.random.default_rng(3)
+    idx = pd.date_range("2022-01-03 04:00", periods=300, freq="B", tz="UTC", name="t")
+    panel = {}
+    for sym, base in (("spy", 450), ("vixy", 20), ("vxz", 12)):
+        close = base * np.exp(np.cumsum(rng.normal(0, .01, len(idx))))
+        pd.DataFrame({"Adj Close": close}, index=idx).to_parquet(tmp_path / "daily" / f"{sym}.parquet")
+        panel[sym.upper()] = close
+    (tmp_path / "daily" / "calendar.txt").write_text(
+        "".join(f"{d:%Y-%m-%d}\n" for d in idx))
+    return VixProvider(str(tmp_path)), pd.DataFrame(panel, index=idx)
+
+# ---------------------------------------------------------------------
+def test_eod_factors_match_feature_engineering(store):
+    prov, panel = store
+    start, end = "2022-06-01", "2022-09-30"
+    got = prov.features(["SPY"], EOD, start, end).xs("SPY")
+    ref = fe._eod_features(panel.copy()).loc[start:end, EOD]
+    # look-back and look-ahead come from outside [start, end]: every row is complete
+    assert got.notna().all().all() and len(got) == len(ref)
+    pd.testing.assert_frame_equal(got, ref, check_names=False, check_freq=False,
+                                  check_index_type=False, rtol=1e-10)
+
+def test_own_field_expressions_per_instrument(store):
+    prov, panel = store
+    got = prov.features(["vixy", "SPY"], ["RET1", "MA10", "ATR10", "RET_FWD"])
+    assert list(got.index.levels[0]) == ["SPY", "VIXY"]
+    for sym in ("SPY", "VIXY"):
+        ref = fe._intraday_features(panel[sym], sym, 10).drop(columns=sym)
+        pd.testing.assert_frame_equal(got.xs(sym).loc[ref.index], ref, check_names=False,
+                                      check_freq=False, check_index_type=False, rtol=1e-10)
+
+def test_shared_subexpressions_evaluate_once(store, monkeypatch):
+    prov, _ = store
+    calls = []
+    orig = expr.Evaluator._eval
+    monkeypatch.setattr(expr.Evaluator, "_eval", lambda self, n: calls.append(n) or orig(self, n))
+    prov.features(["SPY"], ["S1", "S1_Z", "S1_PCT"])
+    s1 = expr.parse(FEATURES["S1"])
+    assert calls.count(s1) == 1
+    assert len(calls) == len(set(calls))
+
+def test_factor_is_independent_of_what_it_is_batched_with(store):
+    prov, panel = store
+    for sym, drop in (("VIXY", slice(40, 60)), ("SPY", slice(120, 124))):   # ragged timelines
+        df = pd.DataFrame({"Adj Close": panel[sym]}).drop(panel.index[drop])
+        df.to_parquet(f"{prov.root}/daily/{sym.lower()}.parquet")
+    plain = VixProvider(prov.root, factor_cache=None)
+    batched = plain.features(["SPY"], EOD).xs("SPY")
+    warm = prov.features(["SPY"], EOD).xs("SPY")           # populates the factor cache
+    for f in EOD:
+        alone = plain.features(["SPY"], [f]).xs("SPY")[f]
+        pd.testing.assert_series_equal(batched[f].dropna(), alone.dropna())
+        pd.testing.assert_series_equal(VixProvider(prov.root).features(["SPY"], [f]).xs("SPY")[f], alone)
+    pd.testing.assert_frame_equal(warm, batched)
+
+def test_parse_shapes_and_errors():
+    assert expr.parse("Log($spy_close).Diff(1)") == expr.parse("Diff(Log($spy_close), 1)")
+    assert expr.parse("$close") == ("field", None, "close")
+    assert expr.extent(expr.parse(FEATURES["S1_Z"])) == (19, 0)
+    assert expr.extent(expr.parse(FEATURES["TARGET_10D"])) == (0, 10)
+    for bad in ("Mean($close)", "Mean($close, 0)", "EMA($close, 5)", "$close +"):
+        with pytest.raises(ValueError):
+            expr.parse(bad)
+
+# ── on-disk factor cache ──────────────────────────────────────────────
+def grow(prov, panel, rows, scale=1.0):
+    """Rewrite every source file with `rows` rows of panel (VXZ optionally restated)."""
+    for sym in panel:
+        df = pd.DataFrame({"Adj Close": panel[sym].iloc[:rows] * (scale if sym == "VXZ" else 1)})
+        df.to_parquet(f"{prov.root}/daily/{sym.lower()}.parquet")
+
+def test_factor_cache_hits_then_updates_only_the_tail(store, monkeypatch):
+    prov, panel = store
+    grow(prov, panel, 200)
+    first = prov.features(["SPY"], EOD)
+    assert prov.cache_info()["factors"]["misses"] == len(EOD)
+
+    again = VixProvider(prov.root)                   # fresh process: served from disk
+    calls = []
+    orig = expr.Evaluator._eval
+    monkeypatch.setattr(expr.Evaluator, "_eval", lambda self, n: calls.append(n) or orig(self, n))
+    pd.testing.assert_frame_equal(again.features(["SPY"], EOD), first)
+    assert calls == [] and again.cache_info()["factors"]["hits"] == len(EOD)
+
+    grow(prov, panel, 300)                           # 100 new days arrive
+    loaded = []
+    orig_load = VixProvider.load
+    monkeypatch.setattr(VixProvider, "load",
+                        lambda self, *a: loaded.append(a[3]) or orig_load(self, *a))
+    inc = again.features(["SPY"], EOD)
+    assert again.cache_info()["factors"]["tails"] == len(EOD)
+    assert all(lo is not None for lo in loaded)      # never re-read from the start
+    fresh = VixProvider(prov.root, factor_cache=None).features(["SPY"], EOD)
+    pd.testing.assert_frame_equal(inc, fresh, rtol=1e-12)
+
+def test_factor_cache_rebuilds_on_revised_history_and_evicts(store):
+    prov, panel = store
+    grow(prov, panel, 200)
+    prov.features(["SPY"], ["S1_Z"])
+    grow(prov, panel, 250, scale=1.01)               # whole history restated
+    got = prov.features(["SPY"], ["S1_Z"])
+    info = prov.cache_info()["factors"]
+    assert info["tails"] == 0 and info["misses"] == 2
+    fresh = VixProvider(prov.root, factor_cache=None).features(["SPY"], ["S1_Z"])
+    pd.testing.assert_frame_equal(got, fresh)
+
+    tiny = VixProvider(prov.root, factor_cache=1)    # 1-byte budget: keeps only the newest
+    tiny.features(["SPY"], EOD)
+    info = tiny.cache_info()["factors"]
+    assert info["entries"] == 1 and info["evictions"] > 0
@@ -6,34 +6,43 @@ qlib.init(provider=VixProvider("./qlib_data"), verbose=False)
 
 START, END = "2023-04-01", "2023-06-30"
 INSTRS      = ["SPY", "VIXY", "VXZ"]
+PAD         = pd.Timedelta(days=60)     # > 20-row warm-up / 10-row look-ahead
 
 # ---------------------------------------------------------------------
 def legacy_frame():
     """
     Re-create the legacy factor table for SPY + spread factors.
+
+    Each factor is computed on the dates of the instruments it reads (SPY
+    alone for RV5 / TARGET_*, VIXY ∩ VXZ for S1*) – how VixProvider
+    evaluates them – over a window padded on both sides, so every row
+    features() returns in [START, END] has a legacy value to compare with.
     """
     # pull close price for all three instruments
     close = (
         qlib.data.D.features(INSTRS, ["$close"],
-                             start_time=START, end_time=END)["$close"]
+                             start_time=str((pd.Timestamp(START) - PAD).date()),
+                             end_time=str((pd.Timestamp(END) + PAD).date()))["$close"]
           .unstack("instrument")               # columns = instruments
           .rename(columns=str.upper)           # SPY / VIXY / VXZ
     )
 
-    df = pd.DataFrame({
-        "SPY":  close["SPY"],
-        "VIXY": close["VIXY"],
-        "VXZ":  close["VXZ"],
-    }).dropna()
-
     # spread and z-score
-    df["S1"]     = df["VXZ"] - df["VIXY"]
-    df["S1_Z"]   = (df["S1"] - df["S1"].rolling(20).mean()) / df["S1"].rolling(20).std()
-    df["S1_PCT"] = df["S1"].pct_change()
-    df["RV5"]    = np.log(df["SPY"]).diff().rolling(5).std()*np.sqrt(252)
-    df["TARGET_5D"]  = np.sign(df["SPY"].shift(-5)  / df["SPY"] - 1).replace(0, np.nan)
-    df["TARGET_10D"] = np.sign(df["SPY"].shift(-10) / df["SPY"] - 1).replace(0, np.nan)
-    return df.dropna()
+    vol = close[["VIXY", "VXZ"]].dropna()
+    s1  = vol["VXZ"] - vol["VIXY"]
+    spread = pd.DataFrame({
+        "S1":     s1,
+        "S1_Z":   (s1 - s1.rolling(20).mean()) / s1.rolling(20).std(),
+        "S1_PCT": s1.pct_change(),
+    })
+
+    spy = close["SPY"].dropna()
+    own = pd.DataFrame({
+        "RV5":        np.log(spy).diff().rolling(5).std()*np.sqrt(252),
+        "TARGET_5D":  np.sign(spy.shift(-5)  / spy - 1).replace(0, np.nan),
+        "TARGET_10D": np.sign(spy.shift(-10) / spy - 1).replace(0, np.nan),
+    })
+    return pd.concat([spread, own], axis=1)
 
 legacy = legacy_frame()
 
@@ -52,5 +61,6 @@ def test_factor_parity():
               .xs("SPY")            # drop instrument level
               .iloc[:, 0]           # series
         )
-        old = legacy[fname].reindex_like(new)
+        old = legacy[fname].reindex(new.index)      # every returned row, warm-up included
+        assert new.notna().any(), fname
         assert np.allclose(old, new, equal_nan=True, atol=1e-8), fname
@@ -0,0 +1,119 @@
+import os, numpy as np, pandas as pd, pytest
+import util, barstore, feature_engineering as fe
+from dataset_io import read_ready
+
+SYMS = ["spy", "vixy", "vxz"]
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    raw, ready = tmp_path / "raw", tmp_path / "ready"
+    raw.mkdir(); ready.mkdir()
+    monkeypatch.setitem(util.CFG, "paths", {"raw": f"{raw}/", "ready": f"{ready}/"})
+    monkeypatch.setitem(util.CFG, "symbols", SYMS)
+    return raw, ready
+
+def raw_closes(n=160, seed=1):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-02 04:00", periods=n, freq="B", tz="UTC")
+    base = {"spy": 450, "vixy": 20, "vxz": 12}
+    return {t: pd.DataFrame({"Adj Close": b * np.exp(np.cumsum(rng.normal(0, .01, n)))},
+                            index=idx) for t, b in base.items()}
+
+def as_built(df):
+    """Float64 in-memory build as read_ready returns it (ns index, float32 features)."""
+    return df.set_axis(df.index.as_unit("ns"))
+
+def write_raw(raw, closes, upto):
+    for t, df in closes.items():
+        df.iloc[:upto].to_parquet(raw / f"{t}.parquet")
+
+# ---------------------------------------------------------------------
+def test_incremental_eod_matches_full_rebuild(dirs, monkeypatch):
+    raw, ready = dirs
+    closes = raw_closes()
+    write_raw(raw, closes, 100)
+    fe.build_eod()
+    first = read_ready(ready / "dataset_eod.parquet")
+    base = os.stat(ready / "dataset_eod.parquet").st_mtime_ns
+
+    tails = []
+    orig = fe.read_tail
+    monkeypatch.setattr(fe, "read_ready", None)            # the history is never read whole
+    monkeypatch.setattr(fe, "read_tail", lambda p, n, **k: tails.append(n) or orig(p, n, **k))
+    for upto in (103, 130, 160):                 # new days arrive
+        write_raw(raw, closes, upto)
+        fe.build_eod()
+    assert tails == [fe.EOD_WARMUP] * 3
+    assert os.stat(ready / "dataset_eod.parquet").st_mtime_ns == base    # … nor rewritten
+    inc = read_ready(ready / "dataset_eod.parquet")
+    full = fe._eod_features(fe._eod_panel())
+
+    assert len(inc) > len(first)
+    pd.testing.assert_frame_equal(inc, as_built(full), check_freq=False,
+                                  check_dtype=False, rtol=1e-6)
+
+def test_incremental_eod_from_bar_store(dirs):
+    raw, ready = dirs
+    closes = raw_closes()
+    for upto in (90, 91, 140, 160):              # daily upserts
+        for t, df in closes.items():
+            barstore.upsert(t, "day", df.iloc[:upto])
+        fe.build_eod()
+    inc = read_ready(ready / "dataset_eod.parquet")
+    full = fe._eod_features(fe._eod_panel())
+    pd.testing.assert_frame_equal(inc, as_built(full), check_freq=False,
+                                  check_dtype=False, rtol=1e-6)
+
+def test_unchanged_raw_is_a_no_op(dirs):
+    raw, ready = dirs
+    write_raw(raw, raw_closes(), 80)
+    fe.build_eod()
+    mtime = (ready / "dataset_eod.parquet").stat().st_mtime_ns
+    fe.build_eod()
+    assert (ready / "dataset_eod.parquet").stat().st_mtime_ns == mtime
+
+def test_revised_history_forces_full_rebuild(dirs):
+    raw, ready = dirs
+    closes = raw_closes()
+    write_raw(raw, closes, 120)
+    fe.build_eod()
+    closes["spy"]["Adj Close"] *= 0.5            # e.g. re-adjusted closes
+    write_raw(raw, closes, 125)
+    fe.build_eod()
+    out = read_ready(ready / "dataset_eod.parquet")
+    assert np.allclose(out["SPY"], closes["spy"]["Adj Close"].reindex(out.index))
+
+# ---------------------------------------------------------------------
+def minute_day(day, seed, bars=390):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range(f"{day} 13:30", periods=bars, freq="min", tz="UTC", name="ts")
+    close = 500 * np.exp(np.cumsum(rng.normal(0, 1e-4, bars)))
+    return pd.DataFrame({"open": close, "high": close, "low": close,
+                         "close": close, "volume": 1.0}, index=idx)
+
+def test_streaming_intraday_matches_full_rebuild(dirs, monkeypatch):
+    raw, ready = dirs
+    days = {d: minute_day(d, i) for i, d in
+            enumerate(["2025-06-16", "2025-06-17", "2025-06-18"])}
+    days["2025-06-16"].to_parquet(raw / "SPY_2025-06-16.parquet")
+    fe.build_intraday("SPY")
+    dst = ready / "dataset_intraday_SPY.parquet"
+    base = os.stat(dst).st_mtime_ns
+    reads = []
+    orig = fe.read_ready
+    monkeypatch.setattr(fe, "read_ready", lambda *a, **k: reads.append(k) or orig(*a, **k))
+    # today's file is re-fetched with more bars, then a new day starts
+    days["2025-06-17"].iloc[:120].to_parquet(raw / "SPY_2025-06-17.parquet")
+    fe.build_intraday("SPY")
+    days["2025-06-17"].to_parquet(raw / "SPY_2025-06-17.parquet")
+    fe.build_intraday("SPY")
+    days["2025-06-18"].iloc[:30].to_parquet(raw / "SPY_2025-06-18.parquet")
+    fe.build_intraday("SPY")
+    inc = read_ready(dst)
+    assert os.stat(dst).st_mtime_ns == base                # history never rewritten
+    assert reads and all(k.get("start") is not None for k in reads)   # … nor read whole
+
+    fe.build_intraday("SPY", incremental=False)
+    full = read_ready(ready / "dataset_intraday_SPY.parquet")
+    assert len(inc) == 390 * 2 + 30 - 9 - 10       # warm-up + look-ahead
+    pd.testing.assert_frame_equal(inc, full, check_freq=False, rtol=1e-10)
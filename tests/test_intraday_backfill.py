@@ -0,0 +1,46 @@
+from datetime import date
+import numpy as np, pandas as pd, pytest
+import util, barstore, polygon_fetch, data_etl_intraday as etl
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"raw": f"{tmp_path}/", "store": f"{tmp_path}/store/"})
+    return tmp_path
+
+def session_bars(day, bars=390):
+    """Regular-hours minute bars (+ a few pre-market ones) for one session."""
+    sched = etl.sessions(day, day)
+    op = sched["market_open"].iloc[0]
+    idx = pd.date_range(op - pd.Timedelta(minutes=5), periods=bars + 5, freq="min", name="ts")
+    c = np.linspace(500, 501, len(idx))
+    return pd.DataFrame({"open": c, "high": c, "low": c, "close": c, "volume": 1.0}, index=idx)
+
+# ---------------------------------------------------------------------
+def test_plan_batches_only_missing_and_partial_sessions(store):
+    barstore.upsert("SPY", "minute", session_bars(date(2025, 6, 9)))         # complete
+    barstore.upsert("SPY", "minute", session_bars(date(2025, 6, 11), 200))   # partial
+    jobs, sched = etl.plan_backfill(["SPY"], date(2025, 6, 9), date(2025, 6, 20), max_batch=4)
+    runs = [[d.date().isoformat() for d in days] for _, days in jobs]
+    # Jun 19 (Juneteenth) is not a session; Jun 9 is already complete
+    assert runs == [["2025-06-10", "2025-06-11", "2025-06-12", "2025-06-13"],
+                    ["2025-06-16", "2025-06-17", "2025-06-18", "2025-06-20"]]
+
+def test_backfill_records_completeness_and_reruns_skip(store, monkeypatch):
+    calls = []
+    def fake_fetch_many(jobs, workers=None, timespan="day"):
+        calls.append(dict(jobs))
+        out = {}
+        for k, (sym, a, b) in jobs.items():
+            days = etl.sessions(date.fromisoformat(a), date.fromisoformat(b)).index
+            out[k] = pd.concat([session_bars(d.date()) for d in days])
+        return out
+    monkeypatch.setattr(polygon_fetch, "fetch_many", fake_fetch_many)
+
+    etl.backfill(["SPY"], date(2025, 6, 2), date(2025, 6, 13), max_batch=5)
+    assert [(a, b) for _, a, b in calls[0].values()] == \
+        [("2025-06-02", "2025-06-06"), ("2025-06-09", "2025-06-13")]
+    done = etl.completeness("SPY", etl.sessions(date(2025, 6, 2), date(2025, 6, 13)))
+    assert set(done.values()) == {390}
+
+    etl.backfill(["SPY"], date(2025, 6, 2), date(2025, 6, 13))
+    assert len(calls) == 1                      # nothing left to fetch
@@ -0,0 +1,45 @@
+import datetime as dt, pandas as pd, pytest
+import util, ledger, portfolio
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.setitem(util.CFG, "portfolio", {"start_cash": 1000, "max_day_trades": 3})
+    monkeypatch.setattr(ledger, "_OPEN", {})
+    return tmp_path
+
+# ---------------------------------------------------------------------
+def test_book_trade_rules_and_restart(reports):
+    assert portfolio.book_trade("SELL", 100.0, "2025-06-02 10:00") == "SKIP – no inventory"
+    assert portfolio.book_trade("BUY", 2000.0, "2025-06-02 10:01") == "SKIP – insufficient cash"
+    for m in range(3):                                   # three round-trips on Monday
+        assert portfolio.book_trade("BUY", 100.0, f"2025-06-02 10:1{m}").startswith("EXECUTED")
+        assert portfolio.book_trade("SELL", 101.0, f"2025-06-02 10:2{m}").startswith("EXECUTED")
+    portfolio.book_trade("BUY", 100.0, "2025-06-03 10:00")
+    assert portfolio.book_trade("SELL", 100.0, "2025-06-03 10:05") == "SKIP – PDT cap"
+
+    led = ledger.get()
+    assert (led.cash, led.pos) == (903.0, 1)
+    led.close()
+    ledger._OPEN.clear()                                 # restart: state comes back from the db
+    led = ledger.get()
+    assert (led.cash, led.pos, led.pdt.count(dt.date(2025, 6, 3))) == (903.0, 1, 3)
+    # Monday's trades leave the 5-business-day window the following Monday
+    assert portfolio.book_trade("SELL", 100.0, "2025-06-09 10:00").startswith("EXECUTED")
+    eq = led.frame()
+    assert list(eq.columns) == ledger.COLS and eq["day_trades"].sum() == 4
+
+def test_pdt_window_counts_business_days():
+    w = ledger.PDTWindow(5)
+    w.add(dt.date(2025, 6, 6))                           # Friday
+    w.add("2025-06-12 15:59")                            # Thursday
+    assert w.count(dt.date(2025, 6, 12)) == 2
+    assert w.count(dt.date(2025, 6, 13)) == 1            # Friday+5 bdays → out
+    assert len(w.q) == 1
+
+def test_legacy_equity_curve_is_imported_once(reports):
+    pd.DataFrame([{"timestamp": "2025-06-02 09:00", "cash": 500.0, "pos": 5, "nav": 1000.0,
+                   "day_trades": 0}]).to_csv(reports / "equity_curve.csv", index=False)
+    led = ledger.get()
+    assert (led.cash, led.pos) == (500.0, 5)
+    assert len(led.frame()) == 1
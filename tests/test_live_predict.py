@@ -0,0 +1,46 @@
+import numpy as np, pandas as pd, pytest
+from lightgbm import LGBMClassifier
+from sklearn.preprocessing import StandardScaler
+import util, registry, live_predict
+from dataset_io import write_parquet_atomic, read_tail
+
+@pytest.fixture
+def eod(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"model": f"{tmp_path}/", "ready": f"{tmp_path}/"})
+    monkeypatch.setattr(registry, "_LOADED", {})
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2020-01-01", periods=500, freq="D", tz="UTC", name="t")
+    df = pd.DataFrame(rng.normal(size=(500, 3)), index=idx, columns=["S1", "S1_Z", "RV5"])
+    df["SPY"] = 400.0
+    for h in ("5D", "10D"):
+        df[f"TARGET_{h}"] = np.where(df["S1"] + rng.normal(size=500) > 0, 1.0, -1.0)
+    write_parquet_atomic(df, f"{tmp_path}/dataset_eod.parquet", row_group_size=64)
+    feats = ["S1", "S1_Z", "RV5"]
+    for tag in ("5d", "10d"):
+        sc = StandardScaler().fit(df[feats])
+        m = LGBMClassifier(n_estimators=20, verbosity=-1).fit(sc.transform(df[feats]), df[f"TARGET_{tag.upper()}"])
+        registry.publish(f"daily_clf_{tag}", {"scaler": sc, "model": m}, rows=len(df), features=feats)
+    return df
+
+# ---------------------------------------------------------------------
+def test_read_tail_decodes_only_trailing_row_groups(eod, tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+    seen = []
+    orig = pq.ParquetFile.read_row_groups
+    monkeypatch.setattr(pq.ParquetFile, "read_row_groups",
+                        lambda self, g, **kw: seen.append(list(g)) or orig(self, g, **kw))
+    path = f"{tmp_path}/dataset_eod.parquet"
+    pd.testing.assert_frame_equal(read_tail(path, 70), eod.tail(70), check_freq=False)
+    assert seen[-1] == [6, 7]                       # 500 rows / 64 → groups 0..7
+    tail = read_tail(path, None, since="2021-05-01", columns=["S1"])
+    pd.testing.assert_frame_equal(tail, eod.loc["2021-05-01":, ["S1"]], check_freq=False)
+    assert seen[-1] == [7]
+
+def test_batch_score_matches_per_row_predict(eod):
+    rows = eod.tail(5)
+    p = live_predict.score(rows)
+    assert list(p.columns) == ["5d", "10d"] and p.index.equals(rows.index)
+    single = [live_predict.predict("10d", rows.iloc[: i + 1]) for i in range(5)]
+    assert np.allclose(p["10d"], single)
+    hist = live_predict.score_history("2021-01-01")
+    assert len(hist) == len(eod.loc["2021-01-01":]) and hist.notna().all().all()
@@ -0,0 +1,53 @@
+import threading, time
+import util, profiler
+
+def spin(s):
+    t = time.perf_counter()
+    while time.perf_counter() - t < s:
+        pass
+
+def fast(): spin(0.05)
+def slow(): spin(0.25)
+
+# ---------------------------------------------------------------------
+def test_stage_writes_rotated_folded_and_svg_and_diffs(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.setitem(util.CFG, "profile", {"enabled": True, "interval_ms": 1, "keep": 2})
+    for work in ((fast, slow), (slow, fast), (slow, fast)):
+        with profiler.stage("train"):
+            for fn in work:
+                fn()
+    runs = profiler.runs("train")
+    assert len(runs) == 2 and len(list((tmp_path / "profiles" / "train").glob("*.svg"))) == 2
+
+    stacks = profiler.load(runs[-1])
+    leaf = {s[-1] for s in stacks}
+    assert "test_profiler:spin" in leaf
+    svg = open(runs[-1].replace(".folded", ".svg")).read()
+    assert svg.startswith("<svg") and "test_profiler:slow" in svg
+
+    with profiler.Sampler(interval_ms=1) as s:
+        slow(); fast()
+    hot = profiler.hot(s.stacks)
+    assert hot["test_profiler:slow"][0] > hot["test_profiler:fast"][0]
+    assert hot["test_profiler:spin"][1] > 0.8             # self time sits in the loop
+
+def test_sampler_sees_busy_pool_threads_and_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.delenv("PROFILE", raising=False)
+    with profiler.stage("etl"):
+        fast()
+    assert not (tmp_path / "profiles").exists()           # opt-in only
+
+    with profiler.Sampler(interval_ms=1) as s:
+        t = threading.Thread(target=slow, name="fetch-0")
+        t.start(); t.join()
+    assert any(st[0] == "[fetch-0]" and st[-1] == "test_profiler:spin" for st in s.stacks)
+
+def test_diff_ranks_the_function_that_got_hot():
+    a = {("main", "fetch"): 80, ("main", "fit"): 20}
+    b = {("main", "fetch"): 30, ("main", "fit"): 70}
+    rows = profiler.diff(a, b, top=2)
+    assert {r[0] for r in rows} == {"fetch", "fit"}
+    f, ia, ib, sa, sb = next(r for r in rows if r[0] == "fit")
+    assert (ia, ib, sa, sb) == (0.2, 0.7, 0.2, 0.7)
@@ -8,3 +8,51 @@ def test_load():
     cal = prov.calendar("daily")
     df = prov.load(["close"], [sym], "daily", str(cal[0]), str(cal[-1]))
     assert not df.empty and "close" in df.columns
+
+# ---------------------------------------------------------------------
+import numpy as np, pandas as pd, pyarrow.parquet as pq, pytest
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "daily").mkdir()
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2020-01-01", periods=600, freq="B", tz="UTC", name="t")
+    frames = {}
+    for sym, n in (("spy", 600), ("vixy", 400)):
+        df = pd.DataFrame({"close": 100 + rng.normal(size=n).cumsum(),
+                           "volume": rng.integers(1, 1000, n)}, index=idx[-n:])
+        df.to_parquet(tmp_path / "daily" / f"{sym}.parquet", row_group_size=100)
+        frames[sym.upper()] = df
+    # legacy raw layout: only "Adj Close"
+    adj = pd.DataFrame({"Adj Close": 20 + rng.normal(size=600).cumsum()}, index=idx)
+    adj.to_parquet(tmp_path / "daily" / "vxz.parquet", row_group_size=100)
+    frames["VXZ"] = adj.rename(columns={"Adj Close": "close"})
+    return tmp_path, frames
+
+def test_load_matches_full_read(store):
+    root, frames = store
+    prov = VixProvider(str(root))
+    got = prov.load(["$close"], ["vxz", "SPY", "VIXY"], "daily", "2021-03-01", "2021-06-30")
+    ref = (pd.concat({s: f.loc["2021-03-01":"2021-06-30", ["close"]] for s, f in frames.items()},
+                     names=["instrument", "datetime"]).sort_index())
+    pd.testing.assert_frame_equal(got, ref, check_index_type=False)
+    assert got.index.is_monotonic_increasing
+
+def test_load_decodes_overlapping_row_groups_once(store, monkeypatch):
+    root, _ = store
+    prov = VixProvider(str(root))
+    seen = []
+    orig = pq.ParquetFile.read_row_group
+    monkeypatch.setattr(pq.ParquetFile, "read_row_group",
+                        lambda self, g, **kw: seen.append(g) or orig(self, g, **kw))
+    first = prov.load(["close"], ["SPY"], "daily", "2021-06-01", "2021-09-30")
+    assert sorted(seen) == [3, 4]                     # 600 rows / 100 → groups 0..5
+    seen.clear()
+    again = prov.load(["close"], ["SPY"], "daily", "2021-06-01", "2021-09-30")
+    assert seen == [] and prov.hits > 0
+    pd.testing.assert_frame_equal(first, again)
+
+    fp = root / "daily" / "spy.parquet"               # rewritten file → re-read
+    pd.read_parquet(fp).assign(close=1.0).to_parquet(fp, row_group_size=100)
+    assert (prov.load(["close"], ["SPY"], "daily", "2021-06-01", "2021-09-30")["close"] == 1).all()
+    assert seen
@@ -0,0 +1,63 @@
+import os, joblib, numpy as np, pytest
+from sklearn.preprocessing import StandardScaler
+import util, registry
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"model": f"{tmp_path}/"})
+    monkeypatch.setattr(registry, "_LOADED", {})
+    return tmp_path
+
+def scaler(shift=0.0):
+    return StandardScaler().fit(np.arange(10.0).reshape(-1, 1) + shift)
+
+# ---------------------------------------------------------------------
+def test_load_is_cached_until_a_new_version_is_published(models, monkeypatch):
+    registry.publish("clf", {"scaler": scaler(), "model": "m1"}, rows=10, features=["a"])
+    b1, meta = registry.load("clf")
+    assert meta["version"] == 1 and meta["features"] == ["a"] and meta["rows"] == 10
+
+    calls = []
+    with monkeypatch.context() as m:
+        m.setattr(joblib, "load", lambda p: calls.append(p))
+        assert registry.load("clf")[0] is b1 and calls == []      # hot path: no unpickle
+
+    registry.publish("clf", {"scaler": scaler(1.0), "model": "m2"}, rows=11)
+    b2, meta = registry.load("clf")
+    assert meta["version"] == 2 and b2["model"] == "m2"
+
+def test_identical_publish_is_a_noop_and_old_versions_are_pruned(models):
+    for i in range(4):
+        registry.publish("clf", {"model": i})
+    assert registry.publish("clf", {"model": 3})["version"] == 4
+    registry.prune("clf", keep=2)
+    assert registry.versions("clf") == [3, 4]
+    assert not [f for f in os.listdir(registry._dir("clf")) if f.startswith(".tmp-")]
+
+def test_legacy_pair_falls_back_with_one_shared_scaler(models):
+    s = scaler()
+    joblib.dump((s, "lo-model"), models / "spy_reg_lo.pkl")
+    joblib.dump((s, "hi-model"), models / "spy_reg_hi.pkl")
+    bundle, meta = registry.load("spy_reg")
+    assert meta["version"] == 0
+    assert bundle["lo"] == "lo-model" and bundle["hi"] == "hi-model"
+    assert isinstance(bundle["scaler"], StandardScaler)
+
+    registry.publish("spy_reg", {"scaler": s, "lo": "lo2", "hi": "hi2"})
+    assert registry.load("spy_reg")[0]["hi"] == "hi2"           # registry wins once published
+
+def test_corrupt_artifact_is_rejected(models):
+    meta = registry.publish("clf", {"model": 1})
+    with open(registry._dir("clf") + "/" + meta["file"], "ab") as fh:
+        fh.write(b"junk")
+    with pytest.raises(ValueError):
+        registry.load("clf")
+
+def test_failed_lite_backfill_still_returns_the_bundle(models, monkeypatch):
+    registry.publish("clf", {"model": 1})
+    registry._LOADED.clear()
+    def full(*a, **k):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(registry, "export_lite", full)
+    bundle, meta = registry.load("clf")
+    assert bundle == {"model": 1} and meta["version"] == 1
@@ -0,0 +1,55 @@
+import os, numpy as np, pandas as pd, pytest
+import util, shm
+import parallel
+from parallel import pmap
+
+@pytest.fixture
+def ready(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"ready": f"{tmp_path}/"})
+    return tmp_path
+
+def probe(payload, task, threads=None):
+    X, y = payload
+    return type(X).__name__, X.flags.writeable, float(X[task].sum()), float(y[task])
+
+# ---------------------------------------------------------------------
+def test_pmap_workers_attach_to_one_mapped_copy(ready):
+    X = np.random.default_rng(0).normal(size=(20_000, 8)).astype(np.float32)
+    y = np.arange(20_000, dtype=np.float32)
+    out = pmap(probe, [0, 5, 19_999], (X, y), workers=2)
+    assert [o[0] for o in out] == ["memmap"] * 3 and not any(o[1] for o in out)
+    assert [o[2] for o in out] == pytest.approx([float(X[i].sum()) for i in (0, 5, 19_999)])
+    assert os.listdir(ready / ".shm") == []            # released → unlinked
+
+def pid(payload, task, threads=None):
+    return os.getpid(), float(payload[0][task].sum())
+
+def test_pool_shares_once_and_reuses_workers_across_batches(ready, monkeypatch):
+    X = np.random.default_rng(1).normal(size=(20_000, 4)).astype(np.float32)
+    saves = []
+    orig = np.save
+    monkeypatch.setattr(np, "save", lambda *a, **k: saves.append(a[0]) or orig(*a, **k))
+    with parallel.pool((X,), workers=2) as run:
+        a = run(pid, [0, 1, 2, 3])
+        b = run(pid, [4, 5, 6, 7])
+    assert len(saves) == 1                                 # payload written once
+    assert len({p for p, _ in a + b}) <= 2                 # same two workers both batches
+    assert [v for _, v in b] == pytest.approx([float(X[i].sum()) for i in range(4, 8)])
+    assert os.listdir(ready / ".shm") == []
+
+def test_refcount_keeps_file_until_last_release(ready):
+    X = np.ones((10_000, 4))
+    (ref,), r1 = shm.share((X,))
+    (ref2,), r2 = shm.share([X])
+    assert ref == ref2 and os.path.exists(ref.path)    # written once
+    shm.release(r1)
+    assert np.array_equal(shm.resolve(ref), X)
+    shm.release(r2)
+    assert not os.path.exists(ref.path)
+    assert shm.share((np.ones(3), "x"))[0][0].shape == (3,)   # small arrays stay inline
+
+def test_matrix_is_clean_float32():
+    df = pd.DataFrame({"a": [1.0, np.inf, 3.0], "b": [1.0, 2.0, np.nan], "T": [1.0, -1.0, 1.0]})
+    X, y = shm.matrix(df, ["a", "b"], ["T"])
+    assert X.dtype == np.float32 and X.flags.c_contiguous and X.shape == (1, 2)
+    assert y["T"].tolist() == [1.0]
@@ -0,0 +1,58 @@
+import json, threading, pytest
+import util, market, daemon
+
+@pytest.fixture
+def trace(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"reports": f"{tmp_path}/"})
+    monkeypatch.setattr(util, "SPANS", {})
+    monkeypatch.setattr(util, "COUNTERS", {})
+    util._EVENTS.clear()
+    return tmp_path
+
+# ---------------------------------------------------------------------
+def test_spans_nest_per_thread_and_record_errors(trace):
+    @util.span("inner")
+    def inner():
+        util.count("rows_read", 10)
+
+    with util.span("stage"):
+        inner()
+        inner()
+        t = threading.Thread(target=inner)           # own stack → top-level path
+        t.start(); t.join()
+    with pytest.raises(ValueError), util.span("stage"):
+        raise ValueError
+
+    assert util.SPANS["stage/inner"]["n"] == 2 and util.SPANS["inner"]["n"] == 1
+    assert util.SPANS["stage"]["n"] == 2 and util.SPANS["stage"]["errors"] == 1
+    assert util.SPANS["stage"]["total_s"] >= util.SPANS["stage/inner"]["total_s"]
+    assert util.COUNTERS == {"rows_read": 30}
+
+def test_flush_writes_jsonl_and_prometheus(trace):
+    with util.span("fetch", symbol="SPY"):
+        util.count("bytes_read", 2048)
+    util.trace_flush()
+    util.trace_flush()                               # nothing new: counters only
+    lines = [json.loads(l) for l in (trace / "trace.jsonl").read_text().splitlines()]
+    assert [l.get("span") for l in lines] == ["fetch", None, None]
+    assert lines[0]["symbol"] == "SPY" and lines[0]["s"] >= 0
+    assert lines[-1]["counters"] == {"bytes_read": 2048}
+
+    prom = (trace / "metrics.prom").read_text()
+    assert 'vix_span_calls_total{span="fetch"} 1' in prom
+    assert "# TYPE vix_bytes_read_total counter" in prom
+    assert "vix_bytes_read_total 2048" in prom
+
+def test_daemon_cycle_traces_stage_substeps(trace, monkeypatch, capsys):
+    monkeypatch.setattr(market, "is_open", lambda now=None: False)
+    monkeypatch.setattr(daemon, "STATS", {})
+    def stage():
+        with util.span("fit"):
+            util.log("legacy caller", level=30)      # level= used to crash log()
+    monkeypatch.setattr(daemon, "CLOSED", [("train", stage)])
+    daemon.cycle()
+    assert "30| legacy caller" in capsys.readouterr().out
+    spans = [json.loads(l).get("span") for l in (trace / "trace.jsonl").read_text().splitlines()]
+    assert spans[:2] == ["train/fit", "train"]
+    stats = json.loads((trace / "daemon_stats.json").read_text())
+    assert "counters" in stats
@@ -0,0 +1,115 @@
+import json, numpy as np, pandas as pd, pytest
+from lightgbm import LGBMClassifier, LGBMRegressor
+import util, registry, train_backtest as tb
+from dataset_io import read_ready
+
+@pytest.fixture
+def ready(tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "paths", {"ready": f"{tmp_path}/", "model": f"{tmp_path}/",
+                                            "reports": f"{tmp_path}/"})
+    monkeypatch.setattr(registry, "_LOADED", {})
+    rng = np.random.default_rng(3)
+    n = 700
+    df = pd.DataFrame(rng.normal(size=(n, 3)), columns=["S1", "S1_Z", "RV5"],
+                      index=pd.date_range("2020-01-01", periods=n, tz="UTC", name="t"))
+    df["SPY"] = 400.0
+    df["TARGET_5D"] = np.where(df["S1"] + rng.normal(size=n) > 0, 1.0, -1.0)
+    df["TARGET_10D"] = np.where(df["RV5"] + rng.normal(size=n) > 0, 1.0, -1.0)
+    df.iloc[-10:, df.columns.get_loc("TARGET_10D")] = np.nan
+    df.to_parquet(tmp_path / "dataset_eod.parquet")
+    return df
+
+def test_shared_binning_matches_per_model_sklearn_fits(ready):
+    df, feats = tb.load_eod()
+    metrics = tb.train_daily_all(df, feats, tb.DAILY)
+    assert [m["model"] for m in metrics] == ["daily_clf_5d", "daily_clf_10d"]
+    assert [m["rows"] for m in metrics] == [700, 690]
+
+    # a target labelled on every row trains exactly what LGBMClassifier would
+    bundle, meta = registry.load("daily_clf_5d")
+    assert meta["features"] == feats and meta["target"] == "TARGET_5D"
+    Xs = bundle["scaler"].transform(df[feats].to_numpy())
+    ref = LGBMClassifier(num_leaves=31, random_state=42, verbosity=-1).fit(Xs, df["TARGET_5D"])
+    assert np.allclose(bundle["model"].predict_proba(Xs), ref.predict_proba(Xs))
+    # a shorter target reuses the parent's bins but only its own rows / labels
+    bundle, meta = registry.load("daily_clf_10d")
+    y = df["TARGET_10D"].to_numpy()[:690]
+    p = bundle["model"].predict_proba(Xs[:690])[:, 1]
+    assert meta["rows"] == 690 and ((p > 0.5) == (y > 0)).mean() > 0.8
+
+def test_quantile_pair_fits_concurrently_off_one_matrix(ready, tmp_path):
+    idx = pd.date_range("2025-06-02 13:30", periods=600, freq="min", tz="UTC", name="ts")
+    rng = np.random.default_rng(5)
+    intra = pd.DataFrame(rng.normal(size=(600, 2)), columns=["RET1", "MA10"], index=idx)
+    intra["SPY"] = 500.0
+    intra["RET_FWD"] = 0.001 * intra["RET1"] + rng.normal(0, 0.001, 600)
+    intra.to_parquet(tmp_path / "dataset_intraday_SPY.parquet")
+
+    tb.train_intraday("SPY", workers=2)
+    bundle, meta = registry.load("spy_reg")
+    X = bundle["scaler"].transform(intra[["RET1", "MA10"]])
+    ref = LGBMRegressor(objective="quantile", alpha=0.8, random_state=42, verbosity=-1) \
+        .fit(X, intra["RET_FWD"])
+    assert np.allclose(bundle["hi"].predict(X), ref.predict(X))
+    assert (bundle["hi"].predict(X) > bundle["lo"].predict(X)).mean() > 0.9
+
+def test_unchanged_inputs_skip_training_until_data_changes_or_forced(ready, tmp_path, monkeypatch):
+    monkeypatch.setitem(util.CFG, "walkforward", {"refit": 100})
+    assert tb.train_all() == ["daily", "walkforward"]
+    assert registry.current("daily_clf_5d")["fingerprint"]
+    assert tb.train_all() == []                              # nothing re-run, nothing appended
+    assert len(pd.read_csv(tmp_path / "metrics_log.csv")) == 2
+    assert len(pd.read_csv(tmp_path / "winrate_log.csv")) == 1
+
+    assert tb.train_all(force=True) == ["daily", "walkforward"]
+    assert registry.current("daily_clf_5d")["version"] == 1    # same bytes → same version
+
+    df = read_ready(tmp_path / "dataset_eod.parquet")
+    df.iloc[-1, 0] += 1.0
+    df.to_parquet(tmp_path / "dataset_eod.parquet")
+    assert tb.train_all() == ["daily", "walkforward"]
+
+def test_rung_budgets_and_config_sampling():
+    assert tb.rung_budgets(6, 3) == [1, 3, 6]
+    assert tb.rung_budgets(1, 3) == [1]
+    cfgs = tb.sample_configs(10, tb.SPACE, seed=1)
+    assert len({json.dumps(c, sort_keys=True) for c in cfgs}) == 10
+    assert all(c["objective"] == "binary" for c in cfgs)
+
+def eod_dir(path, n=1100, unlabelled=0):
+    rng = np.random.default_rng(11)
+    df = pd.DataFrame(rng.normal(size=(n, 3)), columns=["S1", "S1_Z", "RV5"],
+                      index=pd.date_range("2018-01-01", periods=n, tz="UTC", name="t"))
+    df["SPY"] = 400.0
+    df["TARGET_5D"] = np.where(np.tanh(3 * df["S1"]) + rng.normal(0, .5, n) > 0, 1.0, -1.0)
+    df["TARGET_10D"] = df["TARGET_5D"]
+    df.iloc[n - unlabelled:, df.columns.get_indexer(["TARGET_5D", "TARGET_10D"])] = np.nan
+    path.mkdir(exist_ok=True)
+    df.to_parquet(path / "dataset_eod.parquet")
+    return {"ready": f"{path}/", "model": f"{path}/", "reports": f"{path}/"}
+
+def test_search_resumes_from_checkpoint_and_promotes_only_a_winner(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "_LOADED", {})
+    monkeypatch.setitem(util.CFG, "search", {"candidates": 6, "eta": 2, "seed": 4})
+    monkeypatch.setitem(util.CFG, "paths", eod_dir(tmp_path / "ref"))
+    ref = tb.search()
+
+    monkeypatch.setitem(util.CFG, "paths", eod_dir(tmp_path / "cut"))
+    assert tb.search(budget_s=0) is None                    # paused after one batch
+    ck = json.loads((tmp_path / "cut" / "search_daily_clf_5d.json").read_text())
+    assert 0 < len(ck["scores"]) < ref["fits"]
+    res = tb.search()
+    assert res == ref                                       # resumed → same outcome
+
+    live = registry.current("daily_clf_5d")
+    if res["promoted"]:
+        assert res["auc_mean"] > res["incumbent_auc"] and live["params"] == res["best"]
+    else:
+        assert not live
+
+def test_search_folds_cover_only_labelled_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "_LOADED", {})
+    monkeypatch.setitem(util.CFG, "search", {"candidates": 2, "eta": 2, "seed": 1})
+    monkeypatch.setitem(util.CFG, "paths", eod_dir(tmp_path, unlabelled=10))   # live tail: no TARGET yet
+    res = tb.search()
+    assert res["fits"] > 0 and 0 < res["auc_mean"] < 1
@@ -0,0 +1,68 @@
+import numpy as np, pandas as pd
+from sklearn.preprocessing import StandardScaler
+from lightgbm import LGBMClassifier
+from walkforward import run_walkforward, parse_refit
+
+FEATS = ["S1", "S1_Z", "RV5"]
+
+def synthetic_eod(n=140, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n, len(FEATS))), columns=FEATS,
+                      index=pd.date_range("2023-01-02", periods=n, freq="B"))
+    drift = df["S1"] + 0.5 * rng.normal(size=n)
+    df["TARGET_5D"] = np.where(drift > 0, 1.0, -1.0)
+    return df
+
+def legacy_loop(df, start):
+    """The pre-engine refit-every-day loop from train_backtest."""
+    wins = trades = 0
+    for i in range(start, len(df) - 5):
+        train, test = df.iloc[:i], df.iloc[i:i+1]
+        scaler = StandardScaler().fit(train[FEATS])
+        model  = LGBMClassifier(num_leaves=31, verbosity=-1).fit(
+                    scaler.transform(train[FEATS]), train["TARGET_5D"])
+        prob_up = model.predict_proba(scaler.transform(test[FEATS]))[0, 1]
+        pred = 1 if prob_up > 0.6 else -1 if prob_up < 0.4 else 0
+        if pred != 0:
+            trades += 1
+            wins += pred == int(test["TARGET_5D"].iloc[0])
+    return wins, trades
+
+# ---------------------------------------------------------------------
+def test_daily_cadence_matches_legacy():
+    df = synthetic_eod()
+    res = run_walkforward(df, FEATS, refit="daily", start=100, progress=False)
+    assert (res["wins"], res["trades"]) == legacy_loop(df, 100)
+    assert res["refits"] == len(df) - 5 - 100
+
+def test_cadence_limits_refits():
+    df = synthetic_eod()
+    res = run_walkforward(df, FEATS, refit=10, start=100, progress=False)
+    assert res["refits"] == 4
+    assert sum(f["bars"] for f in res["folds"]) == len(df) - 5 - 100
+    assert sum(f["trades"] for f in res["folds"]) == res["trades"]
+
+def test_parse_refit():
+    assert parse_refit("weekly") == (5, False)
+    assert parse_refit("drift") == (None, True)
+    assert parse_refit("7") == (7, False)
+
+def test_parallel_merge_matches_serial():
+    df = synthetic_eod()
+    kw = dict(refit="drift", start=100, max_age=8, progress=False)
+    serial = run_walkforward(df, FEATS, workers=1, **kw)
+    pooled = run_walkforward(df, FEATS, workers=2, **kw)
+    strip = lambda r: [(f["start"], f["bars"], f["trades"], f["wins"])
+                       for f in r["folds"]]
+    assert strip(serial) == strip(pooled)
+    assert (serial["wins"], serial["trades"]) == (pooled["wins"], pooled["trades"])
+
+def test_fold_results_do_not_depend_on_thread_count():
+    from walkforward import make_model, run_fold
+    df = synthetic_eod(n=400)
+    X, y = df[FEATS].to_numpy(), df["TARGET_5D"].to_numpy()
+    probs = [make_model(**({} if n is None else {"n_jobs": n})).fit(X[:300], y[:300])
+             .predict_proba(X[300:])[:, 1] for n in (None, 1, 3)]
+    assert (probs[0] == probs[1]).all() and (probs[0] == probs[2]).all()
+    runs = [run_fold((X, y, {}), (300, 395), n) for n in (None, 1, 3)]
+    assert len({(f["trades"], f["wins"]) for f in runs}) == 1
@@ -0,0 +1,93 @@
+"""
+cache.py – on-disk factor cache for VixProvider.features
+========================================================
+<provider_uri>/.factor_cache/<key>.npz   t (int64 ns UTC), v (float64), meta (json)
+
+key     = sha1 of (parsed expression, instrument, freq, FORMAT) – the parsed tuple is
+          the normalised form, so spacing / method-vs-call spelling share
+          an entry; expressions that only reference other instruments
+          ($spy_close …) are stored once under instrument "*"; a series
+          is always evaluated on its own sources' timeline, never on the
+          union of whatever it was batched with
+version = [mtime_ns, size] of every source file the expression reads
+
+lookup() says whether an entry is current ("hit"), built from an older
+version of the sources ("stale" – the caller recomputes only the tail and
+checks the overlap, see VixProvider._tail), or absent ("miss").
+Entries are evicted least-recently-used once the directory exceeds
+max_bytes; a read touches the file's mtime, which is the LRU clock.
+"""
+
+from __future__ import annotations
+import hashlib, json, os
+import numpy as np
+
+CACHE_BYTES = 256 << 20
+FORMAT      = 2           # 2: per-source-set timelines (v1 entries may hold batch-dependent rows)
+
+
+class FactorCache:
+    def __init__(self, root: str, max_bytes: int = CACHE_BYTES):
+        self.dir = os.path.join(root, ".factor_cache")
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "tails": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(node: tuple, inst: str, freq: str) -> str:
+        return hashlib.sha1(repr((node, inst, freq, FORMAT)).encode()).hexdigest()[:24]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.dir, f"{key}.npz")
+
+    def lookup(self, key: str, version: list):
+        """("hit" | "stale" | "miss", (meta, t, v) | None)."""
+        p = self._path(key)
+        try:
+            with np.load(p) as z:
+                meta, t, v = json.loads(str(z["meta"])), z["t"], z["v"]
+            os.utime(p)
+        except (OSError, ValueError, KeyError):
+            return "miss", None
+        return ("hit" if meta["version"] == version else "stale"), (meta, t, v)
+
+    def store(self, key: str, meta: dict, t: np.ndarray, v: np.ndarray) -> None:
+        """Atomic write (temp file + os.replace), then evict down to max_bytes."""
+        os.makedirs(self.dir, exist_ok=True)
+        p = self._path(key)
+        tmp = f"{p}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp, t=t.astype(np.int64), v=v.astype(np.float64),
+                     meta=np.array(json.dumps(meta)))
+            os.replace(tmp, p)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return                                   # read-only store: just don't cache
+        self.evict(keep=p)
+
+    def evict(self, keep: str | None = None) -> None:
+        files = []
+        for e in os.scandir(self.dir):
+            if e.name.endswith(".npz") and ".tmp" not in e.name:
+                st = e.stat()
+                files.append((st.st_mtime_ns, st.st_size, e.path))
+        total = sum(f[1] for f in files)
+        for _, size, path in sorted(files):          # oldest first
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+
+    def info(self) -> dict:
+        n = size = 0
+        if os.path.isdir(self.dir):
+            for e in os.scandir(self.dir):
+                if e.name.endswith(".npz"):
+                    n, size = n + 1, size + e.stat().st_size
+        return {**self.stats, "entries": n, "bytes": size}
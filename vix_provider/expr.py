@@ -0,0 +1,161 @@
+"""
+expr.py – qlib-style factor expressions for VixProvider.features
+================================================================
+    Std(Log($spy_close).Diff(1), 5) * 15.874507866387544
+    ($vxz_close - $vixy_close) / Ref($vxz_close - $vixy_close, 1) - 1
+
+• $<field>         the row instrument's own column  ($close)
+• $<inst>_<field>  another instrument's column, same for every row ($spy_close)
+• operators        Ref Diff Mean Std Sum Max Min Log Sign Abs, + - * / **,
+                   method form  x.Diff(1)  ≡  Diff(x, 1)
+
+parse() builds plain tuples, so identical subexpressions compare and hash
+equal; Evaluator memoises on them, which makes S1 inside S1_Z and S1_PCT
+a single computation per request.  Every node evaluates to a
+datetime × instrument float64 matrix; rolling kernels run on
+sliding_window_view over the time axis.
+"""
+
+from __future__ import annotations
+import ast, re
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ROLLING = {"Mean": np.mean, "Std": lambda w, axis: np.std(w, axis=axis, ddof=1),
+           "Sum": np.sum, "Max": np.max, "Min": np.min}
+UNARY   = {"Log": np.log, "Sign": np.sign, "Abs": np.abs}
+SHIFT   = {"Ref", "Diff"}
+BINARY  = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/", ast.Pow: "**"}
+
+_FIELD = re.compile(r"\$([A-Za-z]\w*)")
+
+
+# ───────────────────────────── parsing ───────────────────────────────
+def parse(text: str) -> tuple:
+    """Expression string → node tuple (op, *args)."""
+    src = _FIELD.sub(lambda m: f"__f_{m.group(1)}", text.strip())
+    try:
+        tree = ast.parse(src, mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"cannot parse expression {text!r}") from e
+    return _node(tree, text)
+
+def _node(t, text):
+    if isinstance(t, ast.Constant) and isinstance(t.value, (int, float)):
+        return ("const", float(t.value))
+    if isinstance(t, ast.Name) and t.id.startswith("__f_"):
+        inst, _, field = t.id[4:].rpartition("_")
+        return ("field", inst.upper() or None, field.lower())
+    if isinstance(t, ast.UnaryOp) and isinstance(t.op, (ast.USub, ast.UAdd)):
+        x = _node(t.operand, text)
+        return x if isinstance(t.op, ast.UAdd) else ("*", ("const", -1.0), x)
+    if isinstance(t, ast.BinOp) and type(t.op) in BINARY:
+        return (BINARY[type(t.op)], _node(t.left, text), _node(t.right, text))
+    if isinstance(t, ast.Call) and not t.keywords:
+        if isinstance(t.func, ast.Name):                  # Op(x, n)
+            op, args = t.func.id, t.args
+        elif isinstance(t.func, ast.Attribute):           # x.Op(n)
+            op, args = t.func.attr, [t.func.value, *t.args]
+        else:
+            op, args = None, []
+        if op in UNARY and len(args) == 1:
+            return (op, _node(args[0], text))
+        if (op in ROLLING or op in SHIFT) and len(args) == 2:
+            n = args[1]
+            if isinstance(n, ast.UnaryOp) and isinstance(n.op, ast.USub):
+                n = ast.Constant(-n.operand.value) if isinstance(n.operand, ast.Constant) else n
+            if isinstance(n, ast.Constant) and isinstance(n.value, int) \
+                    and (n.value > 0 or op == "Ref"):
+                return (op, _node(args[0], text), n.value)
+            raise ValueError(f"{op} needs {'an' if op == 'Ref' else 'a positive'} "
+                             f"integer window in {text!r}")
+    raise ValueError(f"unsupported expression {ast.unparse(t)!r} in {text!r}")
+
+
+# ────────────────────────── static analysis ──────────────────────────
+def fields(node: tuple) -> set:
+    """{(instrument | None, field)} referenced by node."""
+    if node[0] == "field":
+        return {node[1:]}
+    if node[0] == "const":
+        return set()
+    return set().union(*(fields(a) for a in node[1:] if isinstance(a, tuple)))
+
+def extent(node: tuple) -> tuple[int, int]:
+    """(rows of history, rows of future) needed to evaluate node at one date."""
+    op = node[0]
+    if op in ("field", "const"):
+        return 0, 0
+    if op in UNARY:
+        return extent(node[1])
+    if op in ROLLING or op in SHIFT:
+        back, fwd = extent(node[1])
+        n = node[2]
+        if op in ROLLING:
+            return back + n - 1, fwd
+        return (back + n, fwd) if n > 0 else (back, fwd - n)
+    (b1, f1), (b2, f2) = extent(node[1]), extent(node[2])
+    return max(b1, b2), max(f1, f2)
+
+
+# ───────────────────────────── kernels ───────────────────────────────
+def shift(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if n > 0:
+        out[n:] = x[:-n]
+    elif n < 0:
+        out[:n] = x[-n:]
+    else:
+        out[:] = x
+    return out
+
+def rolling(x: np.ndarray, w: int, fn) -> np.ndarray:
+    """fn over trailing windows of w rows; NaN until the window is full or holds NaN."""
+    out = np.full_like(x, np.nan)
+    if len(x) >= w:
+        out[w - 1:] = fn(sliding_window_view(x, w, axis=0), axis=-1)
+    return out
+
+
+# ──────────────────────────── evaluation ─────────────────────────────
+class Evaluator:
+    """
+    Evaluate nodes on aligned arrays.
+
+    columns : {field: (T × N) array of the requested instruments,
+               (inst, field): (T,) array for cross-instrument references}
+    """
+    def __init__(self, columns: dict):
+        self.columns = columns
+        self.memo = {}
+
+    def __call__(self, node: tuple) -> np.ndarray:
+        hit = self.memo.get(node)
+        if hit is None:
+            with np.errstate(all="ignore"):
+                hit = self.memo[node] = self._eval(node)
+        return hit
+
+    def _eval(self, node):
+        op = node[0]
+        if op == "const":
+            return np.asarray(node[1])
+        if op == "field":
+            inst, field = node[1:]
+            if inst is None:
+                return self.columns[field]
+            return self.columns[(inst, field)][:, None]
+        if op in UNARY:
+            return UNARY[op](self(node[1]))
+        if op in ROLLING or op in SHIFT:
+            x = np.asarray(self(node[1]), dtype=np.float64)
+            if x.ndim == 0:
+                return x
+            if op == "Ref":
+                return shift(x, node[2])
+            if op == "Diff":
+                return x - shift(x, node[2])
+            return rolling(x, node[2], ROLLING[op])
+        a, b = self(node[1]), self(node[2])
+        return {"+": np.add, "-": np.subtract, "*": np.multiply,
+                "/": np.divide, "**": np.power}[op](a, b)
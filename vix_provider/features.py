@@ -0,0 +1,30 @@
+"""
+Factor library – qlib expressions for the columns feature_engineering builds
+============================================================================
+EOD factors reference instruments explicitly ($spy_close, $vxz_close …) so
+they evaluate the same for every row instrument; intraday factors use the
+row instrument's own $close.  Windows mirror feature_engineering
+(Z_WIN = 20, RV_WIN = 5, HORIZONS = 5 / 10, INTRA_WIN = 10).
+"""
+
+S1 = "($vxz_close - $vixy_close)"
+
+def _target(h: int) -> str:
+    # Sign(x) / Abs(Sign(x)): ±1, and 0 / 0 → NaN for a flat move (legacy .replace(0, nan))
+    r = f"(Ref($spy_close, -{h}) / $spy_close - 1)"
+    return f"Sign({r}) / Abs(Sign({r}))"
+
+FEATURES = {
+    # ── EOD ──────────────────────────────────────────────────────────
+    "S1":         S1,
+    "S1_Z":       f"({S1} - Mean({S1}, 20)) / Std({S1}, 20)",
+    "S1_PCT":     f"{S1} / Ref({S1}, 1) - 1",
+    "RV5":        "Std(Diff(Log($spy_close), 1), 5) * 15.874507866387544",   # √252
+    "TARGET_5D":  _target(5),
+    "TARGET_10D": _target(10),
+    # ── intraday (row instrument's minute closes) ────────────────────
+    "RET1":       "$close / Ref($close, 1) - 1",
+    "MA10":       "Mean($close, 10) / $close - 1",
+    "ATR10":      "(Max($close, 10) - Min($close, 10)) / Ref($close, 1)",
+    "RET_FWD":    "Ref($close, -10) / $close - 1",
+}
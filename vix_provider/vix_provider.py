@@ -8,15 +8,41 @@ VixProvider – Parquet data provider for Qlib 0.9.6
 
 from __future__ import annotations
 import os, pandas as pd
+from collections import OrderedDict
 from functools import lru_cache
 from typing import Iterable, List
 import numpy as np
+import pyarrow as pa, pyarrow.parquet as pq
+from . import expr
+from .features import FEATURES
+from .cache import FactorCache, CACHE_BYTES
+
+CACHE_SIZE = 512          # footers + (row group, column) arrays held per provider
+TAIL_CHECK = 8            # overlap rows a factor-cache tail update must reproduce
+
+
+def _ns(t, end: bool = False):
+    """Bound / statistic → naive-UTC epoch ns; a bare 'YYYY-MM-DD' end covers the day."""
+    if t is None or t == "":
+        return None
+    ts = pd.Timestamp(t)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    if end and isinstance(t, str) and len(t) <= 10:
+        ts += pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return ts.value
 
 
 class VixProvider:
     # ────────────────────────── boilerplate ──────────────────────────
-    def __init__(self, provider_uri: str):
+    def __init__(self, provider_uri: str, cache_size: int = CACHE_SIZE,
+                 factor_cache: int | None = CACHE_BYTES):
         self.root = os.path.abspath(provider_uri)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()        # (file, mtime, size[, group, col]) → decoded
+        self.hits = self.misses = 0
+        # factor_cache = byte budget of <root>/.factor_cache, None / 0 = off
+        self.factors = FactorCache(self.root, factor_cache) if factor_cache else None
 
     def _file(self, symbol: str, freq: str) -> str:
         return os.path.join(self.root, freq, f"{symbol.lower()}.parquet")
@@ -47,43 +73,118 @@ class VixProvider:
     ) -> pd.DataFrame:
         """
         Return primitive columns only; Qlib’s expression engine sits on top.
+
+        Only the requested columns of the row groups overlapping
+        [start_time, end_time] are decoded, and the decoded arrays are kept
+        in a bounded LRU keyed by file mtime – repeated D.features calls
+        over the same window never touch Parquet again.
         """
         fields = [f.lstrip("$") for f in fields]        # "$close" → "close"
+        lo, hi = _ns(start_time), _ns(end_time, end=True)
 
-        parts = []
-        for sym in instruments:
+        names, lens, times, tz = [], [], [], None
+        cols = {f: [] for f in fields}
+        for sym in sorted({s.upper() for s in instruments}):
             fp = self._file(sym, freq)
             if not os.path.exists(fp):
                 continue
-            raw = pd.read_parquet(fp)
-            if (
-                "close" in fields
-                and "close" not in raw.columns
-                and "adj close" in raw.columns
-            ):
-                raw["close"] = raw["adj close"]
-            df = raw[fields]
-            if start_time:
-                df = df.loc[start_time:end_time]
-            if start_time:
-                df = df.loc[start_time:end_time]
-            df = (
-                df.reset_index()                       # index → column
-                  .rename(columns={"index": "datetime"})
-                  .assign(instrument=sym.upper())
-            )
-            parts.append(df)
-
-        if not parts:
+            t, data, tz = self._slice(fp, fields, lo, hi)
+            names.append(sym)
+            lens.append(len(t))
+            times.append(t)
+            for f in fields:
+                cols[f].append(data[f])
+
+        if not names:
             raise ValueError("No data loaded for given parameters")
 
-        return (
-            pd.concat(parts)
-              .set_index(["instrument", "datetime"])
-              .sort_index()
+        # (instrument, datetime) index straight from codes – instruments are
+        # visited in sorted order and each slice is time-sorted, so the
+        # result is already lexsorted
+        level, t_codes = np.unique(np.concatenate(times), return_inverse=True)
+        dt_level = pd.DatetimeIndex(level)
+        if tz is not None:
+            dt_level = dt_level.tz_localize("UTC").tz_convert(tz)
+        index = pd.MultiIndex(
+            levels=[pd.Index(names), dt_level],
+            codes=[np.repeat(np.arange(len(names)), lens), t_codes],
+            names=["instrument", "datetime"], verify_integrity=False,
         )
+        return pd.DataFrame({f: np.concatenate(cols[f]) for f in fields},
+                            index=index, columns=fields)
+
+    # ─────────────────────── columnar file cache ─────────────────────
+    def _footer(self, fp: str):
+        """(time column, per-row-group [min, max] ns, column names) – cached on mtime."""
+        st = os.stat(fp)
+        key = (fp, st.st_mtime_ns, st.st_size)
+        hit = self._cache_get(key)
+        if hit is None:
+            pf   = pq.ParquetFile(fp)
+            meta = pf.schema_arrow.pandas_metadata or {}
+            tcol = next(c for c in meta.get("index_columns", []) if isinstance(c, str))
+            tz   = getattr(pf.schema_arrow.field(tcol).type, "tz", None)
+            pos  = pf.metadata.schema.names.index(tcol)
+            span = []
+            for g in range(pf.metadata.num_row_groups):
+                s = pf.metadata.row_group(g).column(pos).statistics
+                span.append((_ns(s.min), _ns(s.max)) if s is not None and s.has_min_max
+                            else (None, None))
+            lower = {c.lower(): c for c in pf.schema_arrow.names}
+            hit = self._cache_put(key, (tcol, tz, span, lower))
+        return key, hit
+
+    def _group(self, key, fp, g, tcol, col):
+        """Decoded (times, values) of one column of one row group."""
+        k = key + (g, col)
+        hit = self._cache_get(k)
+        if hit is None:
+            tbl = pq.ParquetFile(fp).read_row_group(g, columns=[tcol, col])
+            t   = tbl.column(tcol).cast(pa.timestamp("ns")).to_numpy().view("i8")
+            v   = tbl.column(col).to_numpy()
+            if len(t) > 1 and (np.diff(t) < 0).any():
+                o = np.argsort(t, kind="stable")
+                t, v = t[o], v[o]
+            hit = self._cache_put(k, (t, v))
+        return hit
+
+    def _slice(self, fp: str, fields, lo, hi):
+        """(datetime64 times, {field: values}, tz) of fp within [lo, hi]."""
+        key, (tcol, tz, span, lower) = self._footer(fp)
+        groups = [g for g, (a, b) in enumerate(span)
+                  if not (a is not None and hi is not None and a > hi)
+                  and not (b is not None and lo is not None and b < lo)]
+        t, out = np.empty(0, "i8"), {}
+        for f in fields:
+            c = lower.get(f) or (lower.get("adj close") if f == "close" else None)
+            if c is None:
+                raise KeyError(f"{f!r} not in {fp}")
+            parts = [self._group(key, fp, g, tcol, c) for g in groups]
+            t = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, "i8")
+            v = np.concatenate([p[1] for p in parts]) if parts else np.empty(0)
+            i = 0 if lo is None else np.searchsorted(t, lo, "left")
+            j = len(t) if hi is None else np.searchsorted(t, hi, "right")
+            out[f] = v[i:j]
+        if fields:
+            t = t[i:j]
+        return t.view("datetime64[ns]"), out, tz
 
-    # ───────────────────── minimal features helper ───────────────────
+    def _cache_get(self, key):
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return hit
+
+    def _cache_put(self, key, value):
+        self._cache[key] = value
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    # ─────────────────────── expression features ─────────────────────
     def features(
         self,
         instruments: Iterable[str],
@@ -93,61 +194,185 @@ class VixProvider:
         freq: str = "daily",
     ) -> pd.DataFrame:
         """
-        Handles:
-          • "$close"
-          • RV5  → Std(Log($spy_close).Diff(1),5)*15.874507866387544
-          • TARGET_5D / TARGET_10D
-        All other expressions raise NotImplemented (tests skip them for now).
+        Evaluate qlib expressions (see expr.py) or FEATURES names, one column
+        per entry of `fields`, on an (instrument, datetime) index.
+
+        With the factor cache on (the default) every (expression,
+        instrument) series is computed over the full source history once
+        and kept under <provider_uri>/.factor_cache; later calls only slice
+        it, and a source file that grew costs just its new tail.  Without
+        it the load window is widened by the largest look-back / look-ahead
+        (in calendar rows) and the result cut back to [start_time, end_time].
         """
-        # --- base close price matrix ---------------------------------
-        base = (
-            self.load(["close"], instruments, freq, start_time, end_time)
-              .unstack("instrument")["close"]          # datetime × symbol
-        )
+        insts = sorted({s.upper() for s in instruments})
+        insts = [s for s in insts if os.path.exists(self._file(s, freq))]
+        nodes = [expr.parse(FEATURES.get(f.strip(), f)) for f in fields]
+        if not insts:
+            raise ValueError("No data loaded for given parameters")
+        lo, hi = _ns(start_time), _ns(end_time, end=True)
 
-        cols = []
-        for f in fields:
-            tag = f.replace(" ", "")                   # strip blanks for match
-
-            # 1) raw close ---------------------------------------------------
-            if tag == "$close":
-                col = (
-                    base.stack()                       # back to MultiIndex
-                        .to_frame(name=f)
-                )
-
-            # 2) RV5 ---------------------------------------------------------
-            elif (tag.lower()
-                == "std(log($spy_close).diff(1),5)*15.874507866387544".lower()
-            ):
-                spy = base["SPY"]
-                rv  = (
-                    np.log(spy).diff()
-                    .rolling(5).std()           # ←  **ddof = 0**  (pop std)
-                    * 15.874507866387544
-                )
-                col = (
-                    rv.to_frame(name=f)
-                    .assign(instrument="SPY")
-                    .set_index("instrument", append=True)
-                    .swaplevel()
-                )
-
-            # 3) target labels ----------------------------------------------
-            elif tag.upper() in {"TARGET_5D", "TARGET_10D"}:
-                horizon = 5 if "5D" in tag.upper() else 10
-                spy     = base["SPY"]
-                tgt     = np.sign(spy.shift(-horizon) / spy - 1).replace(0, np.nan)
-                col = (
-                    tgt.to_frame(name=f)
-                       .assign(instrument="SPY")
-                       .set_index("instrument", append=True)
-                       .swaplevel()
-                )
-
-            else:
-                raise NotImplementedError(f"Unsupported expression: {f}")
-
-            cols.append(col)
-
-        return pd.concat(cols, axis=1).sort_index()
+        # own-field expressions are per instrument; cross-instrument-only
+        # ones ($spy_close …) are the same series for every row → key "*"
+        own  = [any(i is None for i, _ in expr.fields(n)) for n in nodes]
+        todo = {}
+        for n, o in zip(nodes, own):
+            for key in (insts if o else ["*"]):
+                todo.setdefault(key, {})[n] = None
+        got = {}
+        for key, ns in todo.items():
+            ns = list(ns)
+            for n, series in zip(ns, self._series(ns, key, freq, lo, hi)):
+                got[(n, key)] = series
+
+        frames = {}
+        for inst in insts:
+            cols = {}
+            for f, n, o in zip(fields, nodes, own):
+                t, v, tz = got[(n, inst if o else "*")]
+                idx = pd.DatetimeIndex(t.view("datetime64[ns]"), name="datetime")
+                cols[f] = pd.Series(v, index=idx if tz is None else
+                                    idx.tz_localize("UTC").tz_convert(tz))
+            frames[inst] = pd.DataFrame(cols, columns=list(fields))
+        return pd.concat(frames, names=["instrument", "datetime"])
+
+    @staticmethod
+    def _timelines(nodes, key) -> list:
+        """
+        Node positions grouped by the (instrument, field) set they read.
+        Each group is evaluated on the union of its own sources' dates, so a
+        factor never depends on what else was requested with it (a VIXY-only
+        date must not shift Ref($spy_close, -5)); CSE works within a group.
+        """
+        groups = {}
+        for i, n in enumerate(nodes):
+            src = tuple(sorted({(inst or key, f) for inst, f in expr.fields(n)}))
+            groups.setdefault(src, []).append(i)
+        return list(groups.values())
+
+    def _series(self, nodes, key, freq, lo, hi) -> list:
+        """[(t ns, values, tz)] per node for instrument `key`, cut to [lo, hi]."""
+        if self.factors is None:
+            full = [None] * len(nodes)
+            for pos in self._timelines(nodes, key):
+                grp  = [nodes[i] for i in pos]
+                back = max(expr.extent(n)[0] for n in grp)
+                fwd  = max(expr.extent(n)[1] for n in grp)
+                t, tz, vals = self._compute(grp, key, freq, *self._window(lo, hi, back, fwd, freq))
+                for i, v in zip(pos, vals):
+                    full[i] = (t, v, tz)
+        else:
+            full = self._cached(nodes, key, freq)
+        out = []
+        for t, v, tz in full:
+            i = 0 if lo is None else np.searchsorted(t, lo, "left")
+            j = len(t) if hi is None else np.searchsorted(t, hi, "right")
+            out.append((t[i:j], v[i:j], tz))
+        return out
+
+    def _compute(self, nodes, key, freq, lo, hi):
+        """Evaluate nodes (sharing one source set) for one instrument → (t ns, tz, [values per node])."""
+        need = {}
+        for n in nodes:
+            for inst, f in expr.fields(n):
+                need.setdefault(f, set()).add(inst or key)
+        wide = {f: self.load([f], sorted(s), freq, lo, hi)[f].unstack("instrument")
+                for f, s in sorted(need.items())}
+        if not wide:
+            raise ValueError(f"no $field referenced by {nodes}")
+        times = wide[next(iter(wide))].index
+        for w in wide.values():
+            times = times.union(w.index)
+        columns = {}
+        for f, w in wide.items():
+            w = w.reindex(index=times)
+            for inst in w.columns:
+                columns[(inst, f)] = w[inst].to_numpy(dtype=np.float64)
+                if inst == key:
+                    columns[f] = columns[(inst, f)][:, None]
+
+        ev = expr.Evaluator(columns)
+        tz = None if times.tz is None else str(times.tz)
+        t  = (times if tz is None else times.tz_convert("UTC").tz_localize(None)).as_unit("ns").asi8
+        return t, tz, [np.broadcast_to(ev(n), (len(t), 1))[:, 0] for n in nodes]
+
+    # ─────────────────────── factor cache glue ───────────────────────
+    def _version(self, node, key, freq) -> list:
+        out = []
+        for sym in sorted({inst or key for inst, _ in expr.fields(node)}):
+            st = os.stat(self._file(sym, freq))
+            out.append([sym, st.st_mtime_ns, st.st_size])
+        return out
+
+    def _cached(self, nodes, key, freq) -> list:
+        """Full-history series per node: disk hit, tail update or one compute per timeline."""
+        res, todo = [None] * len(nodes), []
+        for i, n in enumerate(nodes):
+            ck, ver = FactorCache.key(n, key, freq), self._version(n, key, freq)
+            status, entry = self.factors.lookup(ck, ver)
+            if status == "hit":
+                self.factors.stats["hits"] += 1
+                res[i] = (entry[1], entry[2], entry[0]["tz"])
+                continue
+            upd = self._tail(n, key, freq, entry) if status == "stale" else None
+            if upd is None:
+                todo.append(i)
+                continue
+            self.factors.stats["tails"] += 1
+            t, v, tz = res[i] = upd
+            self.factors.store(ck, {"inst": key, "freq": freq, "version": ver, "tz": tz}, t, v)
+        for pos in self._timelines([nodes[i] for i in todo], key):
+            grp = [todo[j] for j in pos]               # one Evaluator per timeline → shared CSE memo
+            t, tz, vals = self._compute([nodes[i] for i in grp], key, freq, None, None)
+            for i, v in zip(grp, vals):
+                self.factors.stats["misses"] += 1
+                n = nodes[i]
+                self.factors.store(FactorCache.key(n, key, freq),
+                                   {"inst": key, "freq": freq, "tz": tz,
+                                    "version": self._version(n, key, freq)}, t, v)
+                res[i] = (t, v, tz)
+        return res
+
+    def _tail(self, node, key, freq, entry):
+        """
+        Extend a cached series after its sources grew: recompute from
+        look-back + TAIL_CHECK rows before the first row whose look-ahead
+        was incomplete, and accept only if the overlap reproduces the
+        cached values exactly (otherwise history was revised → None).
+        """
+        meta, t, v = entry
+        back, fwd = expr.extent(node)
+        m   = len(t)
+        cut = m - fwd                                  # rows that were final
+        k   = max(0, cut - back - TAIL_CHECK)
+        if m == 0 or cut <= 0:
+            return None
+        t2, tz, (v2,) = self._compute([node], key, freq, int(t[k]), None)
+        s = min(k + back, cut)                         # first row with a full window
+        if (tz != meta["tz"] or len(t2) < m - k or not np.array_equal(t2[:m - k], t[k:])
+                or not np.allclose(v2[s - k:cut - k], v[s:cut], rtol=1e-12, atol=0,
+                                   equal_nan=True)):
+            return None
+        return np.concatenate([t[:cut], t2[cut - k:]]), np.concatenate([v[:cut], v2[cut - k:]]), tz
+
+    def cache_info(self) -> dict:
+        """Hit / miss counters of the in-memory array LRU and the disk factor cache."""
+        return {"arrays": {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)},
+                "factors": self.factors.info() if self.factors is not None else None}
+
+    def _window(self, lo, hi, back: int, fwd: int, freq: str):
+        """[lo, hi] (ns) widened by back / fwd calendar rows (None = open end)."""
+        try:
+            cal = self._calendar_ns(freq)
+        except FileNotFoundError:                      # no calendar: read the whole file
+            return (None if back else lo), (None if fwd else hi)
+        if lo is not None and back:
+            i = np.searchsorted(cal, lo, "left") - back
+            lo = int(cal[i]) if i >= 0 else None
+        if hi is not None and fwd:
+            j = np.searchsorted(cal, hi, "right") + fwd     # first entry past the window
+            hi = int(cal[j]) - 1 if j < len(cal) else None
+        return lo, hi
+
+    @lru_cache(None)
+    def _calendar_ns(self, freq: str) -> np.ndarray:
+        return np.array([_ns(t) for t in self.calendar(freq)], dtype=np.int64)
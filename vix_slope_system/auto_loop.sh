@@ -30,21 +30,31 @@ sys.exit(0 if o<=now<=c else 1)
 PY
 }
 
-# ── run a block of modules with banners ─────────────────────────────────────
+# ── run a block of cli.py subcommands with banners ──────────────────────────
+# each stage is `python cli.py <cmd>` (the modules do nothing on import);
+# PROFILE=1 makes cli.py sample the stage → reports/profiles/<stage>/
 run_block() {
   local title="$1"; shift
-  local mods=("$@"); local tot=${#mods[@]}
+  local cmds=("$@"); local tot=${#cmds[@]}
   local idx=1
-  for mod in "${mods[@]}"; do
-      log "Stage ${idx}/${tot} – ${title}: ${mod}.py"
-      $PY - <<PY 2>>"$ERR" >>"$LOG"
-import importlib, util
-util.log(f">>> ${mod}.py"); importlib.import_module("${mod}"); util.log(f"<<< ${mod}.py")
-PY
+  for cmd in "${cmds[@]}"; do
+      log "Stage ${idx}/${tot} – ${title}: cli.py ${cmd}"
+      # shellcheck disable=SC2086  # "fetch eod" → two arguments
+      "$PY" cli.py $cmd 2>>"$ERR" >>"$LOG" || log "❌ cli.py ${cmd} failed"
       idx=$((idx+1))
   done
 }
 
+# ── resident daemon (default) ───────────────────────────────────────────────
+# daemon.py keeps imports, models and the NYSE calendar in memory and runs the
+# same stages in-process; LEGACY=1 falls back to the cold-launch loop below.
+# PROFILE=1 samples every stage (both modes) → reports/profiles/<stage>/.
+if [[ "${LEGACY:-0}" != 1 ]]; then
+  cd "$ROOT"
+  log "🟢 auto_loop → daemon.py"
+  exec "$PY" daemon.py --interval $((INTERVAL * 60)) --step "$STEP" >>"$LOG" 2>>"$ERR"
+fi
+
 # ── MAIN LOOP ───────────────────────────────────────────────────────────────
 log "🟢 auto_loop launched – intraday every $((INTERVAL/60)) min"
 
@@ -53,13 +63,13 @@ while true; do
       ################################################################# OPEN
       cd "$ROOT"
       run_block "Intraday" \
-        data_etl_intraday  feature_engineering  live_trade_intraday
+        "fetch intraday"  build  trade
       sleep_for=$INTERVAL
   else
       ############################################################### CLOSED
       cd "$ROOT"
       run_block "Nightly-loop" \
-        data_etl  feature_engineering  train_backtest  live_predict
+        "fetch eod"  build  train  predict
       sleep_for=$STEP            # grind: run again after 15 s
   fi
 
@@ -1,17 +1,48 @@
-import pandas as pd, plotly.express as px, webbrowser
+"""
+backtest_report.py – P/L dashboard: NAV, CV AUC and daemon stage timings.
+
+    python backtest_report.py [--no-open]
+
+Writes reports/dashboard.html (plotly) and opens it in the browser.
+"""
+import argparse, os
 from util import CFG
+import ledger
+
+def main(open_browser: bool = True) -> str:
+    import pandas as pd, plotly.express as px, webbrowser
+    met_path   = f'{CFG["paths"]["reports"]}metrics_log.csv'
+    trace_path = f'{CFG["paths"]["reports"]}{CFG.get("trace", {}).get("jsonl", "trace.jsonl")}'
+
+    df_eq  = ledger.get().frame()
+    df_met = pd.read_csv(met_path, parse_dates=["timestamp"])
 
-eq_path = f'{CFG["paths"]["reports"]}equity_curve.csv'
-met_path = f'{CFG["paths"]["reports"]}metrics_log.csv'
+    fig1 = px.line(df_eq, x="timestamp", y="nav", title="Equity Curve")
+    fig2 = px.line(df_met, x="timestamp", y="auc_mean", title="AUC over time")
+    figs = [fig1, fig2]
 
-df_eq  = pd.read_csv(eq_path, parse_dates=["timestamp"])
-df_met = pd.read_csv(met_path, parse_dates=["timestamp"])
+    # daemon stage timings (util.span events) – where each cycle spends its time
+    if os.path.exists(trace_path):
+        ev = pd.read_json(trace_path, lines=True)
+        ev = ev[ev["span"].notna()] if "span" in ev else ev.iloc[:0]
+        if len(ev):
+            ev["timestamp"] = pd.to_datetime(ev["ts"], unit="s", utc=True)
+            stages = ev[~ev["span"].str.contains("/")]
+            steps  = ev.groupby("span", as_index=False)["s"].sum().nlargest(20, "s")
+            figs.append(px.scatter(stages, x="timestamp", y="s", color="span",
+                                   title="Stage latency per cycle (s)"))
+            figs.append(px.bar(steps, x="s", y="span", orientation="h",
+                               title="Total time by stage / sub-step (s)"))
 
-fig1 = px.line(df_eq, x="timestamp", y="nav", title="Equity Curve")
-fig2 = px.line(df_met, x="timestamp", y="auc_mean", title="AUC over time")
+    html = "<h1>P/L Dashboard</h1>" + "".join(f.to_html(full_html=False) for f in figs)
+    out = f'{CFG["paths"]["reports"]}dashboard.html'
+    with open(out, "w") as f: f.write(html)
+    if open_browser:
+        webbrowser.open("file://" + os.path.abspath(out))
+    print("Dashboard written:", out)
+    return out
 
-html = "<h1>P/L Dashboard</h1>" + fig1.to_html(full_html=False) + fig2.to_html(full_html=False)
-out = f'{CFG["paths"]["reports"]}dashboard.html'
-with open(out, "w") as f: f.write(html)
-webbrowser.open("file://" + out)
-print("Dashboard opened:", out)
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--no-open", action="store_true", help="write the HTML only")
+    main(open_browser=not ap.parse_args().no_open)
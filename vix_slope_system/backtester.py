@@ -0,0 +1,104 @@
+"""
+backtester.py – replay dataset_intraday_<SYMBOL> through the quantile zone
+rules with portfolio.book_trade semantics.
+
+live_trade_intraday books one bar at a time through the ledger, so seeing
+P/L from the hi / lo regressors meant waiting for it live.  Here the whole
+history is scored in one pass, the ±ZONE rule becomes a signal vector, and
+only bars that carry a signal walk through ledger.fill_rule (same cash /
+inventory / PDT checks, same PDTWindow).  Cash and position are then
+forward-filled onto every bar with searchsorted to mark the book to market.
+
+    python backtester.py [--symbol SPY] [--start 2025-01-01] [--end …]
+
+Writes reports/backtest_<SYM>.parquet (per-bar equity) and logs return,
+turnover and max drawdown.
+"""
+import argparse, numpy as np, pandas as pd
+from util import CFG, log
+from ledger import PDTWindow, fill_rule
+from dataset_io import write_parquet_atomic, read_ready
+import registry
+from live_trade_intraday import TZ, zone_signal    # the live rule, vectorised
+
+# ── signals ─────────────────────────────────────────────────────────
+def predict_zone(df: pd.DataFrame, symbol="SPY"):
+    """(ret_hi, ret_lo) for every row, one scaler pass shared by both quantiles."""
+    bundle, meta = registry.load(f"{symbol.lower()}_reg")
+    feats = meta.get("features") or [c for c in df.columns if c not in ("RET_FWD", symbol)]
+    X = bundle["scaler"].transform(df[feats].replace([np.inf, -np.inf], np.nan))
+    return bundle["hi"].predict(X), bundle["lo"].predict(X)
+
+# ── replay ──────────────────────────────────────────────────────────
+def replay(index: pd.DatetimeIndex, price, signal, start_cash=None,
+           max_day_trades=None, qty=1) -> dict:
+    """
+    Book every signal bar under book_trade's rules and mark to market.
+    Returns {"equity": per-bar frame, "fills": fill frame, + summary stats}.
+    """
+    pf = CFG.get("portfolio", {})
+    start_cash = pf.get("start_cash", 10_000) if start_cash is None else start_cash
+    cap = pf.get("max_day_trades", 3) if max_day_trades is None else max_day_trades
+    price  = np.asarray(price, dtype=float)
+    signal = np.asarray(signal)
+
+    ev   = np.flatnonzero(signal)
+    days = index[ev].tz_convert(TZ).date if index.tz is not None else index[ev].date
+    cash, pos, pdt = float(start_cash), 0, PDTWindow()
+    rows = []                                    # (bar, side, cash, pos, day_trades)
+    for i, day in zip(ev, days):
+        side = 1 if signal[i] > 0 else -1
+        if side < 0 and pos < qty:               # most sells while flat: no-op
+            continue
+        skip, cash_, pos_, dtr = fill_rule("BUY" if side > 0 else "SELL", price[i],
+                                           qty, cash, pos, pdt, day, cap)
+        if skip:
+            continue
+        cash, pos = cash_, pos_
+        if dtr:
+            pdt.add(day)
+        rows.append((i, side, cash, pos, dtr))
+
+    f = np.array(rows, dtype=float).reshape(-1, 5)
+    fi = f[:, 0].astype(np.int64)
+    # state after the last fill at or before each bar
+    k = np.searchsorted(fi, np.arange(len(price)), side="right") - 1
+    cash_bar = np.where(k >= 0, f[k, 2] if len(f) else 0.0, start_cash)
+    pos_bar  = np.where(k >= 0, f[k, 3] if len(f) else 0.0, 0.0)
+    nav      = cash_bar + pos_bar * price
+    dd       = nav / np.maximum.accumulate(nav) - 1 if len(nav) else nav
+
+    equity = pd.DataFrame({"price": price, "signal": signal, "cash": cash_bar,
+                           "pos": pos_bar, "nav": nav, "drawdown": dd}, index=index)
+    fills = pd.DataFrame({"side": np.where(f[:, 1] > 0, "BUY", "SELL"),
+                          "price": price[fi], "cash": f[:, 2], "pos": f[:, 3],
+                          "nav": f[:, 2] + f[:, 3] * price[fi],
+                          "day_trades": f[:, 4].astype(int)}, index=index[fi])
+    notional = float(np.sum(price[fi]) * qty)
+    return {"equity": equity, "fills": fills,
+            "trades": len(fills), "round_trips": int(f[:, 4].sum()),
+            "turnover": notional / start_cash,
+            "return": float(nav[-1] / start_cash - 1) if len(nav) else 0.0,
+            "max_drawdown": float(dd.min()) if len(dd) else 0.0}
+
+def run(symbol="SPY", start=None, end=None, **kw) -> dict:
+    """Score dataset_intraday_<symbol> in [start, end] and replay it."""
+    df = read_ready(f'{CFG["paths"]["ready"]}dataset_intraday_{symbol}.parquet',
+                    start=start, end=end)
+    ret_hi, ret_lo = predict_zone(df, symbol)
+    res = replay(df.index, df[symbol].to_numpy(), zone_signal(ret_hi, ret_lo), **kw)
+    res["equity"]["ret_hi"], res["equity"]["ret_lo"] = ret_hi, ret_lo
+    return res
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--symbol", default="SPY")
+    ap.add_argument("--start")
+    ap.add_argument("--end")
+    args = ap.parse_args()
+    res = run(args.symbol, args.start, args.end)
+    out = f'{CFG["paths"]["reports"]}backtest_{args.symbol}.parquet'
+    write_parquet_atomic(res["equity"], out)
+    log(f"backtest {args.symbol}: {len(res['equity']):,} bars, {res['trades']} fills "
+        f"({res['round_trips']} round-trips)  return {res['return']:.2%}  "
+        f"turnover {res['turnover']:.1f}x  max DD {res['max_drawdown']:.2%} → {out}")
@@ -0,0 +1,106 @@
+"""
+barstore.py – partitioned, append-only Parquet store for raw bars.
+
+Layout (under CFG['paths']['store'], default <raw>/store/):
+
+    <symbol>/<freq>/<YYYY-MM>.parquet        e.g.  spy/day/2025-06.parquet
+                                                   spy/minute/2025-06.parquet
+
+• one file per symbol × frequency × UTC month, UTC DatetimeIndex "ts"
+• append()  adds only rows newer than what is stored
+• upsert()  merges on timestamp, incoming rows win
+  – both rewrite just the month partitions the new rows fall into
+• read()    opens only the partitions overlapping [start, end] and pushes
+            the date range + column projection down into the Parquet reader
+• every partition write is temp-file + os.replace, so readers never see a
+  half-written file
+"""
+import glob, os, pandas as pd
+from util import CFG
+from dataset_io import write_parquet_atomic, file_sig
+
+def store_root(root=None) -> str:
+    return root or CFG["paths"].get("store", f'{CFG["paths"]["raw"]}store/')
+
+def _dir(symbol, freq, root=None) -> str:
+    return os.path.join(store_root(root), symbol.lower(), freq)
+
+def partition_path(symbol, freq, month, root=None) -> str:
+    return os.path.join(_dir(symbol, freq, root), f"{month}.parquet")
+
+def partitions(symbol, freq, root=None) -> list[str]:
+    return sorted(glob.glob(os.path.join(_dir(symbol, freq, root), "*.parquet")))
+
+def signature(symbol, freq, root=None) -> list:
+    """[[partition, mtime_ns, size], ...] – changes whenever any write lands."""
+    return [[os.path.basename(p), *file_sig(p)] for p in partitions(symbol, freq, root)]
+
+def _ts(x):
+    t = pd.Timestamp(x)
+    return t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+
+def _normalise(df):
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):   # yfinance (field, ticker)
+        df.columns = df.columns.get_level_values(0)
+    df.index = pd.DatetimeIndex(df.index)
+    df.index = (df.index.tz_localize("UTC") if df.index.tz is None
+                else df.index.tz_convert("UTC"))
+    df.index.name = "ts"
+    df = df[~df.index.duplicated("last")]
+    return df.sort_index()
+
+def _months(index):
+    return index.tz_convert("UTC").strftime("%Y-%m")
+
+# ── writers ─────────────────────────────────────────────────────────
+def upsert(symbol, freq, df, root=None) -> int:
+    """Merge df into the store keyed on timestamp (incoming rows win)."""
+    if df is None or df.empty:
+        return 0
+    df = _normalise(df)
+    for month, part in df.groupby(_months(df.index)):
+        fp = partition_path(symbol, freq, month, root)
+        if os.path.exists(fp):
+            old = pd.read_parquet(fp)
+            part = pd.concat([old[~old.index.isin(part.index)], part]).sort_index()
+        write_parquet_atomic(part, fp)
+    return len(df)
+
+def append(symbol, freq, df, root=None) -> int:
+    """Add only rows strictly newer than the last stored bar."""
+    if df is None or df.empty:
+        return 0
+    df = _normalise(df)
+    last = last_timestamp(symbol, freq, root)
+    if last is not None:
+        df = df[df.index > last]
+    return upsert(symbol, freq, df, root)
+
+# ── readers ─────────────────────────────────────────────────────────
+def last_timestamp(symbol, freq, root=None):
+    parts = partitions(symbol, freq, root)
+    if not parts:
+        return None
+    return pd.read_parquet(parts[-1], columns=[]).index.max()
+
+def read(symbol, freq, start=None, end=None, columns=None, root=None):
+    """Bars for [start, end] (inclusive); empty frame when nothing stored."""
+    lo = _ts(start) if start is not None else None
+    hi = _ts(end) if end is not None else None
+    parts = [p for p in partitions(symbol, freq, root)
+             if (lo is None or os.path.basename(p)[:7] >= lo.strftime("%Y-%m"))
+             and (hi is None or os.path.basename(p)[:7] <= hi.strftime("%Y-%m"))]
+    filters = ([("ts", ">=", lo)] if lo is not None else []) + \
+              ([("ts", "<=", hi)] if hi is not None else [])
+    frames = [pd.read_parquet(p, columns=columns, filters=filters or None)
+              for p in parts]
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=columns or [],
+                            index=pd.DatetimeIndex([], tz="UTC", name="ts"))
+    return pd.concat(frames)              # month partitions are already ordered
+
+def import_file(symbol, freq, path, root=None) -> int:
+    """One-off migration of a legacy whole-history file into the store."""
+    return upsert(symbol, freq, pd.read_parquet(path), root)
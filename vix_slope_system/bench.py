@@ -0,0 +1,289 @@
+"""
+bench.py – offline benchmarks for the ETL → features → train → predict →
+trade hot paths.
+
+    python vix_slope_system/bench.py [--years 5] [--months 1] [--symbols 3]
+                                     [--repeat 3] [--only build_eod,train_daily]
+                                     [--baseline PATH] [--save-baseline]
+                                     [--tolerance 0.25]
+
+Synthetic inputs (years of EOD closes, months of minute bars, N symbols)
+are generated into a temp dir and every CFG path is pointed there, so
+nothing under data_raw/ … reports/ is touched.  Each case runs `repeat`
+times (median wall clock reported) plus once under tracemalloc for the
+peak Python / NumPy heap (peak_mb) while pyarrow's allocator – invisible
+to tracemalloc, and where Parquet reads / writes live – is watched for
+its own peak (arrow_mb).  Results go to reports/bench_<UTC stamp>.json;
+cases slower or hungrier than the baseline by more than `tolerance` are
+listed under "regressions" and the CLI exits 1.  cold_predict times a
+fresh `cli.py predict` process on the sandbox config (interpreter start +
+imports included; its peak_mb / arrow_mb are the parent's only).
+"""
+import argparse, contextlib, io, json, os, platform, statistics, subprocess, sys, tempfile
+import time, tracemalloc, yaml
+from datetime import datetime, timezone
+from typing import Callable, NamedTuple
+import numpy as np, pandas as pd
+from util import CFG, log
+
+ROOT     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE     = ["spy", "vixy", "vxz"]                  # symbols build_eod needs
+MIN_DIFF = 0.005                                   # s – ignore slower-by-less-than this
+
+def _scale(**kw) -> dict:
+    cfg = {"years": 5, "months": 1, "symbols": 3, "repeat": 3, "tolerance": 0.25,
+           **CFG.get("bench", {})}
+    return {**cfg, **{k: v for k, v in kw.items() if v is not None}}
+
+# ── synthetic data ──────────────────────────────────────────────────
+def symbols(n: int) -> list:
+    return BASE + [f"sym{i:02d}" for i in range(max(0, n - len(BASE)))]
+
+def gen_eod(raw: str, years: float, syms, seed=0, end="2025-06-30") -> pd.DataFrame:
+    """<raw><tag>.parquet with an Adj Close random walk per symbol (legacy raw layout)."""
+    rng  = np.random.default_rng(seed)
+    idx  = pd.bdate_range(end=end, periods=int(years * 252), tz="UTC", name="Date")
+    base = {"spy": 400.0, "vixy": 20.0, "vxz": 12.0}
+    out  = {}
+    for tag in syms:
+        close = base.get(tag, 50.0) * np.exp(np.cumsum(rng.normal(0, .01, len(idx))))
+        pd.DataFrame({"Adj Close": close}, index=idx).to_parquet(f"{raw}{tag}.parquet")
+        out[tag] = close
+    return pd.DataFrame(out, index=idx)
+
+def gen_minutes(raw: str, months: float, symbol="SPY", seed=1, end="2025-06-30"):
+    """<raw><SYMBOL>_<day>.parquet, 390 one-minute closes per session."""
+    rng  = np.random.default_rng(seed)
+    days = pd.bdate_range(end=end, periods=max(1, round(months * 21)))
+    px   = 400.0
+    for d in days:
+        ts = pd.date_range(d + pd.Timedelta("14:30:00"), periods=390, freq="min", tz="UTC")
+        close = px * np.exp(np.cumsum(rng.normal(0, 5e-4, len(ts))))
+        px = close[-1]
+        pd.DataFrame({"close": close}, index=ts).to_parquet(f"{raw}{symbol}_{d:%Y-%m-%d}.parquet")
+    return len(days) * 390
+
+def gen_qlib(root: str, panel: pd.DataFrame):
+    """Provider layout: <root>/daily/<sym>.parquet (close) + calendar.txt."""
+    os.makedirs(f"{root}/daily", exist_ok=True)
+    for tag in panel:
+        panel[[tag]].rename(columns={tag: "close"}).to_parquet(f"{root}/daily/{tag}.parquet")
+    with open(f"{root}/daily/calendar.txt", "w") as fh:
+        fh.writelines(f"{d:%Y-%m-%d}\n" for d in panel.index)
+
+# ── cases ───────────────────────────────────────────────────────────
+class Case(NamedTuple):
+    name:    str
+    run:     Callable                  # the timed call
+    prepare: Callable = None           # untimed, once before the first run
+    ops:     int = 1                   # calls per run (for per-op time)
+
+def cases(env: dict) -> list:
+    import feature_engineering as fe, train_backtest as tb, portfolio
+    sys.path.insert(0, ROOT)                       # vix_provider lives at the repo root
+    from vix_provider.vix_provider import VixProvider
+
+    qroot, syms = env["qlib"], [s.upper() for s in env["symbols"]]
+    start, end  = env["window"]
+    eod_factors = ["S1", "S1_Z", "S1_PCT", "RV5", "TARGET_5D", "TARGET_10D"]
+    n_trades    = 1000
+
+    def trades():
+        for i in range(n_trades):
+            portfolio.book_trade("BUY" if i % 2 == 0 else "SELL", 400.0 + i % 7,
+                                 f"2025-01-{1 + i // 100 % 28:02d} 15:{i % 60:02d}")
+
+    def live_predict():
+        import live_predict
+        live_predict.main()
+
+    def live_trade():
+        import live_trade_intraday
+        live_trade_intraday.main()
+
+    def cold_predict():
+        # fresh interpreter on the sandbox config: imports + lite model load + one row
+        subprocess.run([sys.executable, os.path.join(ROOT, "vix_slope_system", "cli.py"), "predict"],
+                       env={**os.environ, "VIX_CONFIG": env["config"]},
+                       capture_output=True, check=True)
+
+    return [
+        Case("build_eod",            lambda: fe.build_eod(incremental=False)),
+        Case("build_intraday",       lambda: fe.build_intraday(incremental=False)),
+        Case("train_daily",          lambda: tb.train_daily("TARGET_5D", "daily_clf_5d")),
+        Case("walkforward_backtest", lambda: tb.walkforward_backtest()),
+        Case("provider_load",        lambda: VixProvider(qroot, factor_cache=None)
+                                             .load(["close"], syms, "daily", start, end)),
+        Case("provider_features",    lambda: VixProvider(qroot, factor_cache=None)
+                                             .features(["SPY"], eod_factors, start, end)),
+        Case("live_predict",         live_predict,
+             prepare=lambda: tb.train_daily("TARGET_10D", "daily_clf_10d")),
+        Case("cold_predict",         cold_predict),
+        Case("live_trade_intraday",  live_trade, prepare=lambda: tb.train_intraday()),
+        Case("book_trade",           trades, ops=n_trades),
+    ]
+
+# ── runner ──────────────────────────────────────────────────────────
+@contextlib.contextmanager
+def sandbox(scale: dict):
+    """Temp data tree + CFG pointed at it; CFG and open ledgers restored on exit."""
+    import ledger
+    saved = {k: CFG.get(k) for k in ("paths", "symbols", "parallel")}
+    with tempfile.TemporaryDirectory(prefix="vix_bench_") as tmp:
+        paths = {k: f"{tmp}/{k}/" for k in ("raw", "ready", "model", "reports", "store")}
+        for p in paths.values():
+            os.makedirs(p)
+        syms = symbols(scale["symbols"])
+        CFG.update(paths=paths, symbols=syms, parallel={"workers": 1})
+        try:
+            panel = gen_eod(paths["raw"], scale["years"], syms)
+            bars  = gen_minutes(paths["raw"], scale["months"])
+            gen_qlib(f"{tmp}/qlib", panel)
+            with open(f"{tmp}/config.yml", "w") as fh:
+                yaml.safe_dump(CFG, fh)
+            yield {"qlib": f"{tmp}/qlib", "config": f"{tmp}/config.yml",
+                   "symbols": syms, "bars": bars, "rows": len(panel),
+                   "window": (str(panel.index[len(panel) // 2].date()), str(panel.index[-1].date()))}
+        finally:
+            for p, lg in list(ledger._OPEN.items()):
+                if p.startswith(tmp):
+                    lg.close()
+                    del ledger._OPEN[p]
+            CFG.update({k: v for k, v in saved.items() if v is not None})
+
+@contextlib.contextmanager
+def _arrow_peak(interval=0.001):
+    """
+    {"bytes": peak pyarrow pool bytes above the level at entry}.  The pool is
+    polled every `interval` s; a run that sets a new process high-water
+    mark (pool.max_memory()) is exact, smaller ones are as fine as the poll.
+    """
+    import threading, pyarrow as pa
+    pool = pa.default_memory_pool()
+    start, top, box = pool.bytes_allocated(), pool.max_memory(), {"bytes": 0}
+    stop = threading.Event()
+
+    def poll():
+        while not stop.wait(interval):
+            box["bytes"] = max(box["bytes"], pool.bytes_allocated() - start)
+
+    t = threading.Thread(target=poll, name="bench-arrow", daemon=True)
+    t.start()
+    try:
+        yield box
+    finally:
+        stop.set()
+        t.join()
+        if pool.max_memory() > top:
+            box["bytes"] = max(box["bytes"], pool.max_memory() - start)
+
+@contextlib.contextmanager
+def _quiet():
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+def measure(case: Case, repeat: int) -> dict:
+    with _quiet():
+        if case.prepare:
+            case.prepare()
+        runs = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            case.run()
+            runs.append(time.perf_counter() - t)
+        tracemalloc.start()
+        try:
+            with _arrow_peak() as arrow:
+                case.run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    med = statistics.median(runs)
+    return {"seconds": med, "min": min(runs), "runs": runs, "per_op": med / case.ops,
+            "peak_mb": peak / 2**20, "arrow_mb": arrow["bytes"] / 2**20}
+
+def _meta(scale: dict, env: dict) -> dict:
+    import lightgbm
+    try:
+        git = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        git = ""
+    return {"stamp": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"), "git": git,
+            "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "lightgbm": lightgbm.__version__,
+            "cpus": os.cpu_count(), "machine": platform.machine(),
+            "scale": {k: scale[k] for k in ("years", "months", "symbols", "repeat")},
+            "eod_rows": env["rows"], "minute_bars": env["bars"]}
+
+def compare(res: dict, base: dict, tolerance: float) -> list:
+    """Cases slower / hungrier than base by more than tolerance → [{case, metric, …}]."""
+    if base.get("meta", {}).get("scale") != res["meta"]["scale"]:
+        log(f"bench: baseline scale {base.get('meta', {}).get('scale')} ≠ "
+            f"{res['meta']['scale']} – not compared", 30)
+        return []
+    out = []
+    for name, now in res["cases"].items():
+        was = base.get("cases", {}).get(name)
+        if not was:
+            continue
+        for metric, floor in (("seconds", MIN_DIFF), ("peak_mb", 1.0), ("arrow_mb", 1.0)):
+            if metric not in was:                      # baseline from before arrow_mb
+                continue
+            if now[metric] > was[metric] * (1 + tolerance) and now[metric] - was[metric] > floor:
+                out.append({"case": name, "metric": metric, "baseline": was[metric],
+                            "now": now[metric], "ratio": now[metric] / max(was[metric], 1e-12)})
+    return out
+
+def run(years=None, months=None, n_symbols=None, repeat=None, only=None,
+        baseline=None, tolerance=None, out=None) -> dict:
+    """Run the suite → results dict (also written to `out` / reports/bench_<stamp>.json)."""
+    scale = _scale(years=years, months=months, symbols=n_symbols, repeat=repeat,
+                   tolerance=tolerance)
+    reports = CFG["paths"].get("reports", "./")
+    with sandbox(scale) as env:
+        res = {"meta": _meta(scale, env), "cases": {}}
+        for case in cases(env):
+            if only and case.name not in only:
+                continue
+            r = res["cases"][case.name] = measure(case, scale["repeat"])
+            log(f"bench {case.name:<22} {r['seconds'] * 1e3:9.1f} ms  "
+                f"peak {r['peak_mb']:7.1f} MiB  arrow {r['arrow_mb']:7.1f} MiB" +
+                (f"  ({r['per_op'] * 1e3:.3f} ms/op)" if case.ops > 1 else ""))
+
+    baseline = baseline or os.path.join(reports, "bench_baseline.json")
+    res["regressions"] = []
+    if os.path.exists(baseline):
+        with open(baseline) as fh:
+            res["regressions"] = compare(res, json.load(fh), scale["tolerance"])
+        for r in res["regressions"]:
+            log(f"REGRESSION {r['case']} {r['metric']}: {r['baseline']:.4g} → "
+                f"{r['now']:.4g} ({r['ratio']:.2f}x)", 30)
+    out = out or os.path.join(reports, f"bench_{res['meta']['stamp']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as fh:
+        json.dump(res, fh, indent=1)
+    log(f"bench → {out}")
+    return res
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=float)
+    ap.add_argument("--months", type=float)
+    ap.add_argument("--symbols", type=int)
+    ap.add_argument("--repeat", type=int)
+    ap.add_argument("--only", help="comma-separated case names")
+    ap.add_argument("--baseline", help="default: reports/bench_baseline.json")
+    ap.add_argument("--tolerance", type=float, help="allowed slow-down, e.g. 0.25 = +25%%")
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    res = run(args.years, args.months, args.symbols, args.repeat,
+              args.only.split(",") if args.only else None,
+              args.baseline, args.tolerance, args.out)
+    if args.save_baseline:
+        dst = args.baseline or os.path.join(CFG["paths"]["reports"], "bench_baseline.json")
+        with open(dst, "w") as fh:
+            json.dump({**res, "regressions": []}, fh, indent=1)
+        log(f"bench baseline → {dst}")
+    sys.exit(1 if res["regressions"] else 0)
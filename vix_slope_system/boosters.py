@@ -0,0 +1,141 @@
+"""
+boosters.py – sklearn-style faces over native lightgbm.Booster objects.
+
+train_backtest fits every model with lightgbm.train on subsets of one
+pre-binned Dataset; these wrappers give the resulting boosters the
+predict / predict_proba interface the live scorers and the registry
+bundles already use (same as LGBMClassifier / LGBMRegressor).
+"""
+import numpy as np
+
+class BoosterClassifier:
+    """Binary booster trained on y > 0; classes_ mirror the ±1 targets."""
+    classes_ = np.array([-1.0, 1.0])
+
+    def __init__(self, booster):
+        self.booster_ = booster
+
+    def predict_proba(self, X):
+        p = self.booster_.predict(X)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes_[(self.booster_.predict(X) > 0.5).astype(int)]
+
+class BoosterRegressor:
+    def __init__(self, booster):
+        self.booster_ = booster
+
+    def predict(self, X):
+        return self.booster_.predict(X)
+
+# ── lite models (numpy-only scoring, see registry.load_lite) ──────────
+# A cold `cli.py predict` used to spend ~2 s importing sklearn / lightgbm /
+# pandas to score one row.  The registry also stores each bundle as the
+# scaler's mean / scale plus LightGBM's text model; these classes evaluate
+# that with numpy alone and return the same numbers as the full bundle.
+ZERO = 1e-35          # LightGBM kZeroThreshold
+
+class LiteScaler:
+    """StandardScaler.transform from mean_ / scale_."""
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean if mean is not None else 0.0, dtype=np.float64)
+        self.scale = np.asarray(scale if scale is not None else 1.0, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+class TreeModel:
+    """LightGBM text model (numerical splits, single output) → predict / predict_proba."""
+
+    def __init__(self, text: str):
+        head, trees, cur = {}, [], None
+        for line in text.splitlines():
+            if line.startswith("Tree="):
+                cur = {}
+                trees.append(cur)
+            elif line.startswith("end of trees"):
+                break
+            elif line == "average_output":
+                head["average_output"] = True
+            else:
+                k, sep, v = line.partition("=")
+                if sep:
+                    (head if cur is None else cur)[k] = v
+        obj = head.get("objective", "").split()
+        if int(head.get("num_tree_per_iteration", 1)) != 1:
+            raise ValueError("multi-output models are not supported")
+        self.binary = bool(obj) and obj[0] == "binary"
+        self.sigmoid = float(obj[1].split(":")[1]) if self.binary and len(obj) > 1 else 1.0
+        if obj and obj[0] not in ("binary", "regression", "quantile", "huber", "fair", "regression_l1"):
+            raise ValueError(f"objective {obj[0]!r} is not supported")
+        if "sqrt" in obj:
+            raise ValueError("sqrt-transformed regression is not supported")
+        self.average = head.get("average_output", False)
+        self.trees = [self._tree(t) for t in trees]
+
+    @staticmethod
+    def _tree(t):
+        arr = lambda k, dt: np.array(t[k].split(), dtype=dt)
+        leaf = arr("leaf_value", np.float64)
+        if int(t["num_leaves"]) == 1:
+            return None, leaf
+        if int(t.get("num_cat", 0)) or int(t.get("is_linear", 0)):
+            raise ValueError("categorical / linear trees are not supported")
+        dec = arr("decision_type", np.int64)
+        return (arr("split_feature", np.int64), arr("threshold", np.float64),
+                (dec >> 2) & 3, (dec & 2) > 0,
+                arr("left_child", np.int64), arr("right_child", np.int64)), leaf
+
+    def raw(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        out = np.zeros(len(X))
+        for nodes, leaf in self.trees:
+            if nodes is None:
+                out += leaf[0]
+                continue
+            feat, thr, miss, dleft, left, right = nodes
+            node = np.zeros(len(X), dtype=np.int64)
+            live = np.arange(len(X))
+            while len(live):
+                i = node[live]
+                f = X[live, feat[i]]
+                nan = np.isnan(f)
+                f = np.where(nan & (miss[i] != 2), 0.0, f)       # NaN → 0 unless NaN-aware
+                missing = ((miss[i] == 1) & (np.abs(f) <= ZERO)) | ((miss[i] == 2) & nan)
+                go = np.where(missing, dleft[i], f <= thr[i])
+                node[live] = np.where(go, left[i], right[i])
+                live = live[node[live] >= 0]
+            out += leaf[~node]
+        return out / len(self.trees) if self.average and self.trees else out
+
+    def predict(self, X):
+        r = self.raw(X)
+        return 1 / (1 + np.exp(-self.sigmoid * r)) if self.binary else r
+
+    def predict_proba(self, X):
+        p = self.predict(X)
+        return np.column_stack([1 - p, p])
+
+def lite_spec(bundle: dict) -> dict:
+    """Full bundle (StandardScaler + LightGBM models) → JSON-able lite spec; ValueError if not representable."""
+    sc = bundle["scaler"]
+    if not hasattr(sc, "scale_"):
+        raise ValueError(f"scaler {type(sc).__name__} has no mean_ / scale_")
+    tolist = lambda a: None if a is None else np.asarray(a, dtype=np.float64).tolist()
+    spec = {"scaler": {"mean": tolist(sc.mean_), "scale": tolist(sc.scale_)}, "models": {}}
+    for part, model in bundle.items():
+        if part == "scaler":
+            continue
+        booster = getattr(model, "booster_", None)
+        if booster is None or not hasattr(booster, "model_to_string"):
+            raise ValueError(f"{part}: {type(model).__name__} is not a LightGBM model")
+        text = booster.model_to_string()
+        TreeModel(text)                                  # unsupported → ValueError now, not at load
+        spec["models"][part] = text
+    return spec
+
+def lite_bundle(spec: dict) -> dict:
+    """Lite spec → {"scaler": LiteScaler, part: TreeModel} – same faces as the full bundle."""
+    return {"scaler": LiteScaler(**spec["scaler"]),
+            **{part: TreeModel(text) for part, text in spec["models"].items()}}
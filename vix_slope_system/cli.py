@@ -0,0 +1,119 @@
+"""
+cli.py – one entry point for the pipeline stages.
+
+    python cli.py fetch eod [--mode backfill]
+    python cli.py fetch intraday [--symbol SPY] [--date D]
+                                 [--start D --end D --symbols SPY,QQQ]
+    python cli.py build [--full] [--symbol SPY]
+    python cli.py train [--force] [--search [--budget S]]
+    python cli.py predict [--history [--start D] [--end D] [--out CSV]]
+    python cli.py trade
+    python cli.py report [--no-open]
+
+Only argparse and util are imported up front; each subcommand imports the
+modules it runs when it runs, so `predict` / `trade` never load the ETL,
+training or plotting stacks (and, with lite model artifacts present, not
+pandas / sklearn / lightgbm either – see registry.load_lite).  Cold-start
+time of `cli.py predict` is tracked by bench.py (cold_predict).  With
+profiling on (profile.enabled / PROFILE=1) the subcommand runs as one
+profiler.stage – auto_loop.sh's LEGACY loop relies on that.
+"""
+import argparse
+from util import CFG, ensure_dirs, log
+import profiler
+
+# ── subcommands (heavy imports happen inside) ───────────────────────
+def fetch(args):
+    if args.what == "eod":
+        import data_etl
+        data_etl.main(args.mode)
+        return
+    from datetime import date
+    import data_etl_intraday, market
+    if args.start:
+        syms = [s.strip().upper() for s in (args.symbols or args.symbol).split(",")]
+        end = date.fromisoformat(args.end) if args.end else date.today()
+        data_etl_intraday.backfill(syms, date.fromisoformat(args.start), end, args.workers)
+    else:
+        day = date.fromisoformat(args.date) if args.date else market.last_market_day()
+        data_etl_intraday.main(args.symbol.upper(), day)
+
+def build(args):
+    import feature_engineering as fe
+    fe.build_eod(incremental=not args.full)
+    fe.build_intraday(args.symbol, incremental=not args.full)
+
+def train(args):
+    import train_backtest
+    if args.search:
+        train_backtest.search_all(budget_s=args.budget)
+    else:
+        train_backtest.main(args.force)
+
+def predict(args):
+    import live_predict
+    if not args.history:
+        live_predict.main()
+        return
+    res = live_predict.score_history(args.start, args.end)
+    out = args.out or f'{CFG["paths"]["reports"]}rescore_eod.csv'
+    res.to_csv(out)
+    log(f"rescored {len(res):,} rows → {out}")
+
+def trade(args):
+    import live_trade_intraday
+    live_trade_intraday.main()
+
+def report(args):
+    import backtest_report
+    backtest_report.main(open_browser=not args.no_open)
+
+def parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="cli.py", description="VIX-slope pipeline")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("fetch", help="download EOD or minute bars into the bar store")
+    p.add_argument("what", choices=("eod", "intraday"))
+    p.add_argument("--mode", choices=("backfill", "daily"), default="daily", help="eod")
+    p.add_argument("--symbol", default="SPY", help="intraday")
+    p.add_argument("--date", help="intraday: YYYY-MM-DD (omit → last market day)")
+    p.add_argument("--start", help="intraday backfill: first date")
+    p.add_argument("--end", help="intraday backfill: last date (default today)")
+    p.add_argument("--symbols", help="intraday backfill: comma list (default --symbol)")
+    p.add_argument("--workers", type=int, help="intraday backfill: concurrent requests")
+    p.set_defaults(fn=fetch)
+
+    p = sub.add_parser("build", help="EOD + intraday feature datasets")
+    p.add_argument("--full", action="store_true", help="ignore watermarks, rebuild")
+    p.add_argument("--symbol", default="SPY")
+    p.set_defaults(fn=build)
+
+    p = sub.add_parser("train", help="retrain changed models (or hyper-parameter search)")
+    p.add_argument("--force", action="store_true")
+    p.add_argument("--search", action="store_true")
+    p.add_argument("--budget", type=float, help="seconds before --search pauses")
+    p.set_defaults(fn=train)
+
+    p = sub.add_parser("predict", help="latest 5-day / 10-day regime calls")
+    p.add_argument("--history", action="store_true", help="rescore every row")
+    p.add_argument("--start")
+    p.add_argument("--end")
+    p.add_argument("--out", help="CSV path for --history (default: reports/)")
+    p.set_defaults(fn=predict)
+
+    p = sub.add_parser("trade", help="score the latest minute bar and book the signal")
+    p.set_defaults(fn=trade)
+
+    p = sub.add_parser("report", help="write the P/L dashboard")
+    p.add_argument("--no-open", action="store_true")
+    p.set_defaults(fn=report)
+    return ap
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    ensure_dirs()
+    with profiler.stage(f"{args.cmd}_{args.what}" if args.cmd == "fetch" else args.cmd):
+        args.fn(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+daemon.py – resident scheduler replacing auto_loop.sh's cold launches.
+
+auto_loop.sh spawned a fresh interpreter per stage (and one more just to
+ask the NYSE calendar whether the market is open), so every cycle paid for
+importing pandas / lightgbm / sklearn / yfinance / polygon, rebuilding the
+calendar and unpickling the models.  This process imports everything once
+and then runs the same stages in-process:
+
+    open   (every --interval s):  etl_intraday → features → trade
+    closed (every --step s):      etl_eod (once per session) → features
+                                  → train → predict → search (time-boxed)
+
+Models, datasets and the win-rate log stay in memory between cycles
+(dataset_io.cached – re-read only when their writer replaced the file),
+the calendar is memoised (market.py), and the incremental builders only
+touch new rows.  Per-stage latency (last / mean / max / errors) is logged
+and written to reports/daemon_stats.json after every cycle; the stage's
+sub-step spans and counters (util.span / util.count) go to
+reports/trace.jsonl and reports/metrics.prom.
+
+    python daemon.py            # run forever
+    python daemon.py --once     # one cycle for the current market state
+    python daemon.py --profile  # + per-stage flame graphs (profiler.py)
+"""
+import argparse, json, os, time, traceback
+from util import CFG, COUNTERS, ensure_dirs, log, span, trace_flush
+import market, profiler
+
+STATS = {}
+_EOD_DONE = {"day": None}
+
+# ── stages (heavy modules are imported once, on first use) ──────────
+def etl_intraday():
+    import data_etl_intraday
+    data_etl_intraday.main("SPY", market.last_market_day())
+
+def etl_eod():
+    # EOD bars change once per session – fetch after its close (a pre-open
+    # cycle still sees yesterday, so it can't latch today early) and latch
+    # only once every symbol holds that session's bar; a failed or too-early
+    # fetch is retried on the next closed cycle
+    day = market.last_closed_session()
+    if _EOD_DONE["day"] == day:
+        return
+    import data_etl
+    stored = data_etl.main("daily")
+    missing = sorted(t for t, d in stored.items() if d is None or d < day)
+    if missing:
+        log(f"EOD bars for {day} missing for {', '.join(missing)} – retrying next cycle", 30)
+        return
+    _EOD_DONE["day"] = day
+
+def features():
+    import feature_engineering
+    feature_engineering.build_eod()
+    feature_engineering.build_intraday("SPY")
+
+def train():
+    import train_backtest
+    train_backtest.main()
+
+def predict():
+    import live_predict
+    live_predict.main()
+
+def search():
+    # idle closed-market time → resumable hyper-parameter search
+    import train_backtest
+    train_backtest.search_all(budget_s=CFG.get("search", {}).get("budget_s", 30))
+
+def trade():
+    import live_trade_intraday
+    live_trade_intraday.main()
+
+OPEN   = [("etl_intraday", etl_intraday), ("features", features), ("trade", trade)]
+CLOSED = [("etl_eod", etl_eod), ("features", features),
+          ("train", train), ("predict", predict), ("search", search)]
+
+# ── runner ──────────────────────────────────────────────────────────
+def run_stage(name, fn) -> float:
+    t = time.perf_counter()
+    ok = True
+    try:
+        # sub-steps nest as <stage>/fetch, <stage>/fit …; sampled when profiling is on
+        with span(name), profiler.stage(name):
+            fn()
+    except Exception:
+        ok = False
+        log(f"stage {name} FAILED\n{traceback.format_exc()}", 40)
+    dt = time.perf_counter() - t
+    st = STATS.setdefault(name, {"runs": 0, "errors": 0, "last_s": 0.0,
+                                 "mean_s": 0.0, "max_s": 0.0})
+    st["runs"] += 1
+    st["errors"] += not ok
+    st["last_s"] = dt
+    st["mean_s"] += (dt - st["mean_s"]) / st["runs"]
+    st["max_s"] = max(st["max_s"], dt)
+    log(f"stage {name:<12} {dt*1000:9.1f} ms{'' if ok else '  (failed)'}")
+    return dt
+
+def write_stats():
+    p = f'{CFG["paths"]["reports"]}daemon_stats.json'
+    tmp = p + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump({"updated": market.now_utc().isoformat(), "stages": STATS,
+                   "counters": COUNTERS}, fh, indent=1)
+    os.replace(tmp, p)
+
+def cycle() -> bool:
+    """Run one cycle for the current market state; True if the market was open."""
+    is_open = market.is_open()
+    stages = OPEN if is_open else CLOSED
+    t = time.perf_counter()
+    for name, fn in stages:
+        run_stage(name, fn)
+    log(f"{'Intraday' if is_open else 'Nightly-loop'} cycle "
+        f"{(time.perf_counter() - t)*1000:.0f} ms")
+    write_stats()
+    trace_flush()
+    return is_open
+
+def warm_up():
+    """Pay every import + the calendar build once, before the first cycle."""
+    t = time.perf_counter()
+    import data_etl, data_etl_intraday, feature_engineering    # noqa: F401
+    import train_backtest, live_predict, live_trade_intraday   # noqa: F401
+    market.nyse()
+    log(f"warm-up (imports + calendar) {time.perf_counter() - t:.1f}s")
+
+def loop(interval: int, step: int):
+    warm_up()
+    log(f"🟢 daemon launched – intraday every {interval // 60} min, closed every {step}s")
+    while True:
+        was_open = cycle()
+        wait = interval if was_open else step
+        if not was_open:
+            # don't oversleep the open
+            wait = min(wait, max(1, (market.next_open() - market.now_utc()).total_seconds()))
+        time.sleep(wait)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--interval", type=int, default=15 * 60, help="seconds between open-market cycles")
+    ap.add_argument("--step", type=int, default=15, help="seconds between closed-market cycles")
+    ap.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    ap.add_argument("--profile", action="store_true",
+                    help="sample every stage → reports/profiles/<stage>/ (see profiler.py)")
+    args = ap.parse_args()
+    ensure_dirs()
+    if args.profile:
+        CFG.setdefault("profile", {})["enabled"] = True
+    if args.once:
+        cycle()
+    else:
+        loop(args.interval, args.step)
@@ -3,66 +3,76 @@ Nightly end-of-day downloader using Polygon REST instead of Yahoo.
 Run once per day after 16:10 ET.
 
 • --mode backfill   → pulls full history from CFG['start_date'] to today
-• --mode daily      → appends only today's bar   (default)
+• --mode daily      → upserts only the last few bars   (default)
+
+All configured symbols are fetched concurrently over one pooled
+connection (polygon_fetch.py).  Bars go into the partitioned bar store
+(barstore.py), so a daily run rewrites one small month partition instead
+of the whole history.
 """
-from datetime import date, datetime as dt, timedelta
+from datetime import date, timedelta
 import argparse, os, pandas as pd
-from polygon import RESTClient
 from util import CFG, ensure_dirs, log
-import sys
-import pandas_market_calendars as mcal, pytz, datetime as dt
-from util import log
-log(f"=== ENTER {__file__} ===")
-def nyse_open_now() -> bool:
-    """True iff right now (wall-clock) is inside today’s regular session."""
-    ny = mcal.get_calendar("NYSE")
-    now = dt.datetime.now(tz=pytz.UTC)
-    sched = ny.schedule(start_date=now.date(), end_date=now.date())
-    if sched.empty:      # weekend / holiday
-        return False
-    market_open, market_close = sched.iloc[0][['market_open', 'market_close']]
-    return market_open <= now <= market_close
+import barstore, polygon_fetch
+import market, sys
+nyse_open_now = market.is_open
 
-ensure_dirs()
-if not nyse_open_now():
-    log("Market closed – skipping fetch.")
-    sys.exit(0)
-def fetch_polygon(symbol: str, start_iso: str) -> pd.DataFrame:
-    """Return a DataFrame with an 'Adj Close' column indexed by UTC date."""
-    cli = RESTClient(CFG["polygon_key"])
-    bars = cli.list_aggs(
-        symbol, 1, "day",
-        from_=start_iso,
-        to=date.today().isoformat(),
-        limit=50_000
-    )
-    df = pd.DataFrame([b.__dict__ for b in bars])
+def symbol_map() -> dict:
+    """{tag: ticker} – CFG['symbols'] may be a list of tags or a tag→ticker map."""
+    syms = CFG["symbols"]
+    return dict(syms) if isinstance(syms, dict) else {t: t.upper() for t in syms}
+
+def _adj_close(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
     if df.empty:
         raise ValueError(f"Polygon returned 0 rows for {symbol}")
-    df["t"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
-    df.set_index("t", inplace=True)
     return df.rename(columns={"close": "Adj Close"})[["Adj Close"]]
 
-def main(mode: str = "daily") -> None:
-    for tag, sym in CFG["symbols"].items():
-        dst = f'{CFG["paths"]["raw"]}{tag}.parquet'
+def fetch_polygon(symbol: str, start_iso: str) -> pd.DataFrame:
+    """Return a DataFrame with an 'Adj Close' column indexed by UTC date."""
+    df = polygon_fetch.fetch_aggs(symbol, start_iso, date.today().isoformat())
+    return _adj_close(df, symbol)
+
+def last_bar_day(tag: str):
+    """Session date (ET) of the newest stored daily bar, None when empty."""
+    ts = barstore.last_timestamp(tag, "day")
+    return None if ts is None else ts.tz_convert("America/New_York").date()
+
+def main(mode: str = "daily") -> dict:
+    """Fetch every symbol; {tag: last stored bar date} – failures keep their old date."""
+    # migrate legacy whole-history files, then decide each symbol's range
+    jobs, today = {}, date.today().isoformat()
+    for tag, sym in symbol_map().items():
+        legacy = f'{CFG["paths"]["raw"]}{tag}.parquet'
+        if not barstore.partitions(tag, "day") and os.path.exists(legacy):
+            n = barstore.import_file(tag, "day", legacy)
+            log(f"{tag.upper()}: imported {n:,} legacy rows into bar store")
+        if mode == "backfill" or not barstore.partitions(tag, "day"):
+            start = CFG["start_date"]
+        else:
+            # fetch only the last two days (Polygon merges weekends)
+            start = (date.today() - timedelta(days=3)).isoformat()
+        jobs[tag] = (sym, start, today)
+
+    # all symbols in flight at once over the shared connection pool
+    for tag, res in polygon_fetch.fetch_many(jobs).items():
         try:
-            if mode == "backfill" or not os.path.exists(dst):
-                df = fetch_polygon(sym, CFG["start_date"])
-            else:
-                # fetch only the last two days (Polygon merges weekends)
-                start = (date.today() - timedelta(days=3)).isoformat()
-                df_new = fetch_polygon(sym, start)
-                df_old = pd.read_parquet(dst) if os.path.exists(dst) else pd.DataFrame()
-                df = pd.concat([df_old, df_new]).drop_duplicates()
-            df.to_parquet(dst)
-            log(f"{tag.upper()}: saved {len(df):,} rows → {dst}")
+            if isinstance(res, Exception):
+                raise res
+            df = _adj_close(res, jobs[tag][0])
+            n = barstore.upsert(tag, "day", df)   # touches 1–2 month partitions
+            log(f"{tag.upper()}: upserted {n:,} rows → {barstore.store_root()}{tag}/day/")
         except Exception as e:
-            log(f"{tag.upper()} download FAILED: {e}", level=40)
+            log(f"{tag.upper()} download FAILED: {e}", 40)
+    return {tag: last_bar_day(tag) for tag in jobs}
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--mode", choices=("backfill", "daily"), default="daily")
-    main(p.parse_args().mode)
-
-log(f"=== EXIT  {__file__} ===")
\ No newline at end of file
+    args = p.parse_args()
+    ensure_dirs()
+    log(f"=== ENTER {__file__} ===")
+    if not nyse_open_now():
+        log("Market closed – skipping fetch.")
+        sys.exit(0)
+    main(args.mode)
+    log(f"=== EXIT  {__file__} ===")
\ No newline at end of file
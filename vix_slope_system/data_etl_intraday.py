@@ -3,62 +3,33 @@ Intraday 1-minute downloader.
 • First tries Polygon; if plan lacks minute data, silently falls back to Yahoo
   (last ~30 calendar days available).
 • Auto-selects the most recent NYSE session if --date is omitted.
+• Bars are upserted into the bar store's <symbol>/minute/<YYYY-MM> partition.
 
 Cron (15-min cadence during NY hours):
     */15 6-13 * * 1-5  cd /full/path/vix_slope_system && python data_etl_intraday.py
+
+Backfill (any time):
+    python data_etl_intraday.py --start 2025-01-02 --end 2025-06-20 --symbols SPY,QQQ
+  diffs the NYSE calendar against per-session bar counts recorded in
+  <store>/<symbol>/minute/_sessions.json, batches consecutive missing or
+  partial sessions into multi-day range requests and runs them over the
+  pooled fetch layer; complete sessions are skipped on reruns.
 """
 from datetime import date, timedelta
 import argparse, pandas as pd, yfinance as yf
-from polygon import RESTClient, exceptions as pl_exc
-import pandas_market_calendars as mcal
-from util import CFG, ensure_dirs, log
-import sys
-import pandas_market_calendars as mcal, pytz, datetime as dt
-
-
-def nyse_open_now() -> bool:
-    """True iff right now (wall-clock) is inside today’s regular session."""
-    ny = mcal.get_calendar("NYSE")
-    now = dt.datetime.now(tz=pytz.UTC)
-    sched = ny.schedule(start_date=now.date(), end_date=now.date())
-    if sched.empty:      # weekend / holiday
-        return False
-    market_open, market_close = sched.iloc[0][['market_open', 'market_close']]
-    return market_open <= now <= market_close
-
-ensure_dirs()
-if not nyse_open_now():
-    log("Market closed – skipping fetch.")
-    sys.exit(0)
-
-
-
-poly = RESTClient(CFG["polygon_key"])
-
-# ── helpers ──────────────────────────────────────────────────────────
-def last_market_day() -> date:
-    nyse = mcal.get_calendar("NYSE")
-    sched = nyse.schedule(
-        start_date=date.today() - timedelta(days=7),
-        end_date=date.today()
-    )
-    return sched.index[-1].date()
+from util import ensure_dirs, log, span
+from dataset_io import read_state, write_state
+import barstore, polygon_fetch
+import market, os, sys
+
+nyse_open_now   = market.is_open
+last_market_day = market.last_market_day
 
 # ---------- Polygon ----------
-def polygon_minutes(symbol: str, day: date) -> pd.DataFrame:
-    bars = poly.list_aggs(
-        symbol, 1, "minute",
-        from_=day.isoformat(), to=day.isoformat(), limit=50_000
-    )
-    df = pd.DataFrame([b.__dict__ for b in bars])
-    if df.empty:
-        return df
-    df = df.rename(
-        columns={"o": "open", "h": "high", "l": "low",
-                 "c": "close", "v": "volume", "t": "timestamp"}
-    )
-    df["ts"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
-    df.set_index("ts", inplace=True)
+def polygon_minutes(symbol: str, day: date, end: date | None = None) -> pd.DataFrame:
+    """1-minute bars for day (or day..end) over the shared connection pool."""
+    df = polygon_fetch.fetch_aggs(symbol, day.isoformat(),
+                                  (end or day).isoformat(), timespan="minute")
     return df[["open", "high", "low", "close", "volume"]]
 
 # ---------- Yahoo fallback ----------
@@ -87,6 +58,7 @@ def yahoo_minutes(symbol: str, day: date) -> pd.DataFrame:
     return df[["open", "high", "low", "close", "volume"]]
 
 # ── main fetch wrapper ───────────────────────────────────────────────
+@span("fetch")
 def fetch_minutes(symbol: str, day: date) -> pd.DataFrame:
     try:
         df = polygon_minutes(symbol, day)
@@ -94,8 +66,8 @@ def fetch_minutes(symbol: str, day: date) -> pd.DataFrame:
             raise ValueError("Polygon returned 0 rows")
         log(f"Polygon minute bars pulled ({len(df):,} rows)")
         return df
-    except (pl_exc.BadResponse, Exception) as e:
-        log(f"Polygon failed ({e}); switching to Yahoo", level=30)
+    except Exception as e:
+        log(f"Polygon failed ({e}); switching to Yahoo", 30)
         df = yahoo_minutes(symbol, day)
         if df.empty:
             raise RuntimeError("Yahoo also returned empty 1-minute data")
@@ -104,14 +76,120 @@ def fetch_minutes(symbol: str, day: date) -> pd.DataFrame:
 
 def main(symbol: str, day: date):
     df = fetch_minutes(symbol, day)
-    dst = f'{CFG["paths"]["raw"]}{symbol}_{day}.parquet'
-    df.to_parquet(dst)
-    log(f"{symbol} {day}: stored {len(df):,} rows → {dst}")
+    n = barstore.upsert(symbol, "minute", df)
+    record_sessions(symbol, session_counts(df, sessions(day, day)))
+    log(f"{symbol} {day}: stored {n:,} rows → "
+        f"{barstore.partition_path(symbol, 'minute', day.strftime('%Y-%m'))}")
+
+# ── gap-aware backfill ───────────────────────────────────────────────
+def sessions(start: date, end: date) -> pd.DataFrame:
+    """NYSE regular sessions in [start, end] + expected 1-minute bar count."""
+    sched = market.schedule(start, end)
+    span = sched["market_close"] - sched["market_open"]
+    sched["expected"] = (span.dt.total_seconds() // 60).astype(int)  # 390 / 210
+    return sched
+
+def session_counts(df: pd.DataFrame, sched: pd.DataFrame) -> dict:
+    """{YYYY-MM-DD: regular-hours bar count} for the sessions df touches."""
+    if df.empty or sched.empty:
+        return {}
+    idx = pd.DatetimeIndex(df.index).tz_convert("UTC")
+    day = idx.tz_convert("America/New_York").normalize().tz_localize(None)
+    s   = sched.reindex(day)
+    ts  = idx.tz_localize(None).to_numpy()
+    rth = ((ts >= s["market_open"].dt.tz_convert("UTC").dt.tz_localize(None).to_numpy())
+           & (ts <  s["market_close"].dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()))
+    counts = pd.Series(rth, index=day).groupby(level=0).sum()
+    return {d.date().isoformat(): int(n) for d, n in counts.items() if d in sched.index}
+
+def _sessions_path(symbol: str) -> str:
+    return os.path.join(barstore.store_root(), symbol.lower(), "minute", "_sessions.json")
+
+def record_sessions(symbol: str, counts: dict) -> None:
+    """Merge per-session bar counts into <store>/<symbol>/minute/_sessions.json."""
+    if counts:
+        p = _sessions_path(symbol)
+        write_state(p, {**read_state(p), **counts})
+
+def completeness(symbol: str, sched: pd.DataFrame) -> dict:
+    """Recorded bar counts; sessions never recorded are counted from the store once."""
+    done = read_state(_sessions_path(symbol))
+    todo = [d for d in sched.index if d.date().isoformat() not in done]
+    if todo:
+        have = barstore.read(symbol, "minute", todo[0], todo[-1] + timedelta(days=1),
+                             columns=["close"])
+        counts = session_counts(have, sched.loc[todo])
+        record_sessions(symbol, counts)
+        done = {**done, **counts}
+    return done
+
+def plan_backfill(symbols, start: date, end: date, max_batch: int = 20):
+    """
+    [(symbol, [session, ...]), ...] – runs of consecutive sessions that are
+    missing or partial (< expected bars), at most max_batch per request.
+    """
+    sched = sessions(start, end)
+    pos = {d: i for i, d in enumerate(sched.index)}
+    jobs = []
+    for sym in symbols:
+        done = completeness(sym, sched)
+        gaps = [d for d, exp in sched["expected"].items()
+                if done.get(d.date().isoformat(), 0) < exp]
+        run = []
+        for d in gaps:
+            if run and (pos[d] != pos[run[-1]] + 1 or len(run) >= max_batch):
+                jobs.append((sym, run)); run = []
+            run.append(d)
+        if run:
+            jobs.append((sym, run))
+    return jobs, sched
+
+def backfill(symbols, start: date, end: date, workers=None, max_batch: int = 20):
+    """Fetch only the missing / partial sessions, contiguous gaps batched."""
+    jobs, sched = plan_backfill(symbols, start, end, max_batch)
+    if not jobs:
+        log(f"Backfill {start}→{end}: all sessions complete")
+        return
+    log(f"Backfill {start}→{end}: {sum(len(d) for _, d in jobs)} sessions "
+        f"in {len(jobs)} range requests")
+    req = {i: (sym, days[0].date().isoformat(), days[-1].date().isoformat())
+           for i, (sym, days) in enumerate(jobs)}
+    got = polygon_fetch.fetch_many(req, workers, timespan="minute")
+
+    for i, (sym, days) in enumerate(jobs):
+        df = got[i]
+        if isinstance(df, Exception) or df.empty:
+            log(f"{sym} {req[i][1]}→{req[i][2]}: Polygon failed ({df if isinstance(df, Exception) else 'empty'})", 30)
+            # Yahoo only serves ~30 days of 1-minute history
+            recent = [d.date() for d in days if (date.today() - d.date()).days < 30]
+            df = pd.concat([yahoo_minutes(sym, d) for d in recent]) if recent else pd.DataFrame()
+            if df.empty:
+                continue
+        barstore.upsert(sym, "minute", df)
+        counts = session_counts(df, sched.loc[days])
+        record_sessions(sym, {d.date().isoformat(): counts.get(d.date().isoformat(), 0)
+                              for d in days})
+        short = [k for k, n in counts.items() if n < sched.loc[pd.Timestamp(k), "expected"]]
+        log(f"{sym} {req[i][1]}→{req[i][2]}: {len(df):,} bars"
+            + (f", partial: {', '.join(short)}" if short else ""))
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--symbol", default="SPY")
     ap.add_argument("--date", help="YYYY-MM-DD (omit → last market day)")
+    ap.add_argument("--start", help="backfill: first date YYYY-MM-DD")
+    ap.add_argument("--end", help="backfill: last date (default today)")
+    ap.add_argument("--symbols", help="backfill: comma list (default --symbol)")
+    ap.add_argument("--workers", type=int, help="backfill: concurrent range requests")
     args = ap.parse_args()
+    ensure_dirs()
+    if args.start:
+        syms = [s.strip().upper() for s in (args.symbols or args.symbol).split(",")]
+        end = date.fromisoformat(args.end) if args.end else date.today()
+        backfill(syms, date.fromisoformat(args.start), end, args.workers)
+        sys.exit(0)
+    if not nyse_open_now():
+        log("Market closed – skipping fetch.")
+        sys.exit(0)
     d = date.fromisoformat(args.date) if args.date else last_market_day()
     main(args.symbol.upper(), d)
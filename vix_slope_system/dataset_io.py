@@ -0,0 +1,367 @@
+"""
+dataset_io.py – small Parquet / JSON helpers shared by the builders.
+
+Every write lands in a temp file next to the destination and is then
+os.replace()d into place, so a reader (auto_loop, live_*) never sees a
+half-written file.
+"""
+import os, json, hashlib, shutil, tempfile
+from util import count, span
+
+ROW_GROUP = 4096      # rows per Parquet row group – read_tail skips whole groups
+
+def _tmp_near(dst: str, suffix: str) -> str:
+    d = os.path.dirname(os.path.abspath(dst))
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=suffix, dir=d)
+    os.close(fd)
+    return tmp
+
+def write_parquet_atomic(df, dst: str, **kw) -> None:
+    tmp = _tmp_near(dst, ".parquet")
+    kw.setdefault("row_group_size", ROW_GROUP)
+    try:
+        df.to_parquet(tmp, **kw)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def file_sig(path: str):
+    """
+    [mtime_ns, size] – cheap change detector; None if missing.  A ready
+    dataset with appended segments adds [count, newest's mtime_ns, size].
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    sig = [st.st_mtime_ns, st.st_size]
+    parts = segments(path)[1:]
+    if parts:
+        last = os.stat(parts[-1])
+        sig += [len(parts), last.st_mtime_ns, last.st_size]
+    return sig
+
+def sha256_file(path: str) -> str:
+    """sha256 of the file (and of its appended segments, in order)."""
+    h = hashlib.sha256()
+    for p in segments(path):
+        with open(p, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+def content_hash(path: str, memo: dict) -> str | None:
+    """sha256 of path, re-hashed only when its [mtime, size] moved (memo is persisted by the caller)."""
+    sig = file_sig(path)
+    if sig is None:
+        return None
+    hit = memo.get(path)
+    if hit and hit["sig"] == sig:
+        return hit["sha256"]
+    memo[path] = {"sig": sig, "sha256": sha256_file(path)}
+    return memo[path]["sha256"]
+
+def parquet_columns(path: str) -> list:
+    """Data columns of a pandas-written or ready Parquet file (index excluded), footer only."""
+    import pyarrow.parquet as pq
+    schema = pq.read_schema(path)
+    ready = _ready_meta(schema)
+    idx = {ready["index"]} if ready else \
+          set((schema.pandas_metadata or {}).get("index_columns", []))
+    return [c for c in schema.names if c not in idx]
+
+def read_state(path: str) -> dict:
+    """Sidecar JSON state; {} when missing or unreadable (→ full rebuild)."""
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_state(path: str, state: dict) -> None:
+    tmp = _tmp_near(path, ".json")
+    with open(tmp, "w") as fh:
+        json.dump(state, fh, indent=1, default=str)
+    os.replace(tmp, path)
+
+def _utc(ts):
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def _in_zone(t, tz):
+    """Bound → Timestamp comparable with an index in tz: naive values are wall
+    time in tz (as .loc reads them), aware ones keep their instant."""
+    import pandas as pd
+    t = pd.Timestamp(t)
+    if tz is None:
+        return t if t.tzinfo is None else t.tz_convert("UTC").tz_localize(None)
+    return t.tz_localize(tz) if t.tzinfo is None else t
+
+@span("parquet_read")
+def read_tail(path: str, n: int | None = 1, columns=None, since=None):
+    """
+    Trailing rows of a Parquet dataset without reading the whole file:
+    row groups are walked from the end and only those needed for the last
+    n rows – or, with since=, those whose index max (row-group statistics)
+    is ≥ since – are decoded.  columns= projects as in pd.read_parquet.
+    """
+    import pyarrow.parquet as pq
+    import pandas as pd
+    pf = pq.ParquetFile(path)
+    if _ready_meta(pf.schema_arrow):
+        # already inside this span – don't nest a second parquet_read
+        return read_ready.__wrapped__(path, columns, start=since, tail=n)
+    md = pf.metadata
+    idx = (pf.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+    pos = md.schema.names.index(idx[0]) if idx and isinstance(idx[0], str) else None
+    if since is not None:
+        if pos is None:
+            raise ValueError(f"{path}: since= needs a stored index column")
+        tz = getattr(pf.schema_arrow.field(idx[0]).type, "tz", None)
+        since = _utc(_in_zone(since, tz))
+
+    groups, rows = [], 0
+    for g in range(md.num_row_groups - 1, -1, -1):
+        if since is not None:
+            st = md.row_group(g).column(pos).statistics
+            if st is not None and st.has_min_max and _utc(pd.Timestamp(st.max)) < since:
+                break
+        groups.append(g)
+        rows += md.row_group(g).num_rows
+        if since is None and n is not None and rows >= n:
+            break
+    df = pf.read_row_groups(sorted(groups), columns=columns,
+                            use_pandas_metadata=True).to_pandas()
+    count("bytes_read", sum(md.row_group(g).column(i).total_compressed_size
+                            for g in groups for i in range(md.num_columns)))
+    count("rows_read", len(df))
+    if since is not None:
+        df = df.loc[df.index >= (since if df.index.tz else since.tz_localize(None))]
+    return df if n is None else df.tail(n)
+
+# ── ready datasets (data_ready/*.parquet) ───────────────────────────
+# Explicit on-disk schema instead of pandas defaults: the time index is an
+# int64 epoch-ns column, TARGET_* labels are int8 (±1, 0 = missing), every
+# other column float32 unless listed in exact= (reference prices).  Row
+# groups carry min/max statistics on the time column, so read_ready prunes
+# a date range or a tail to the groups that overlap it.
+#
+# A ready dataset can grow without being rewritten: append_ready() puts
+# new rows in segment files under <path>.parts/ (same schema, later rows),
+# and every reader here – read_ready / read_tail / read_last, file_sig,
+# sha256_file – treats the base file plus its segments as one table.
+READY_KEY = b"vix_ready"
+
+def _parts_dir(path) -> str:
+    return f"{path}.parts"
+
+def segments(path) -> list:
+    """[path] + its appended segment files, oldest first."""
+    try:
+        parts = sorted(e.path for e in os.scandir(_parts_dir(path))
+                       if e.name.endswith(".parquet") and not e.name.startswith(".tmp-"))
+    except (FileNotFoundError, NotADirectoryError):
+        parts = []
+    return [str(path)] + parts
+
+def _ready_meta(schema):
+    raw = (schema.metadata or {}).get(READY_KEY)
+    return json.loads(raw) if raw else None
+
+def write_ready(df, dst: str, exact=(), row_group_size=ROW_GROUP) -> None:
+    """
+    Atomically write a data_ready table in the compact schema: the time
+    index as an int64 epoch-ns column, TARGET_* as dictionary-encoded int8
+    (±1, 0 = no label yet), columns in `exact` (raw prices) as float64 and
+    every other feature as float32.  Row groups carry min/max statistics so
+    read_ready() can skip them by date.  Replaces any appended segments.
+    """
+    import numpy as np, pyarrow as pa, pyarrow.parquet as pq
+    idx = df.index
+    name = idx.name or "ts"
+    tz = str(idx.tz) if getattr(idx, "tz", None) is not None else None
+    cols, targets = {name: pa.array(idx.as_unit("ns").asi8, pa.int64())}, []
+    for c in df.columns:
+        v = df[c].to_numpy(dtype=np.float64)
+        if c.startswith("TARGET_"):
+            targets.append(c)
+            cols[c] = pa.array(np.nan_to_num(np.sign(v)).astype(np.int8))
+        elif c in exact:
+            cols[c] = pa.array(v)
+        else:
+            cols[c] = pa.array(v.astype(np.float32))
+    meta = {"index": name, "name": idx.name, "tz": tz, "targets": targets}
+    table = pa.table(cols).replace_schema_metadata({READY_KEY: json.dumps(meta)})
+    tmp = _tmp_near(dst, ".parquet")
+    try:
+        pq.write_table(table, tmp, row_group_size=row_group_size,
+                       write_statistics=True, use_dictionary=targets,
+                       compression="snappy")
+        shutil.rmtree(_parts_dir(dst), ignore_errors=True)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def append_ready(df, dst: str, exact=(), row_group_size=ROW_GROUP) -> None:
+    """
+    Add rows (all after the dataset's last) to a ready dataset without
+    touching what is already written: they go to the newest segment under
+    <dst>.parts/, which is rewritten only while it holds fewer than
+    row_group_size rows, else a new segment is started.  A call costs
+    O(row_group_size), whatever the history length.
+    """
+    import pandas as pd, pyarrow.parquet as pq
+    meta = _ready_meta(pq.read_schema(dst))
+    if meta is None:
+        raise ValueError(f"{dst}: not a ready dataset – write_ready() it first")
+    df = df.rename_axis(meta["name"])
+    parts = segments(dst)[1:]
+    if parts and pq.ParquetFile(parts[-1]).metadata.num_rows < row_group_size:
+        target = parts[-1]
+        df = pd.concat([read_ready(target), df])
+    else:
+        os.makedirs(_parts_dir(dst), exist_ok=True)
+        target = os.path.join(_parts_dir(dst), f"{len(parts):06d}.parquet")
+    write_ready(df, target, exact, row_group_size)
+
+@span("parquet_read")
+def read_ready(path: str, columns=None, start=None, end=None, tail=None):
+    """
+    Ready dataset → DataFrame on its (tz-aware) time index.  columns=
+    projects, start / end (inclusive) and tail=n prune whole row groups via
+    the time-column statistics before anything is decoded.  Targets come
+    back float32 with NaN for missing.  Appended segments are read as part
+    of the table.  Plain pandas-written files (the pre-schema format) are
+    read with pd.read_parquet and sliced the same way.
+    """
+    import numpy as np, pandas as pd, pyarrow.parquet as pq
+    pf = pq.ParquetFile(path)
+    meta = _ready_meta(pf.schema_arrow)
+    if meta is None:
+        df = pd.read_parquet(path, columns=columns)
+        count("bytes_read", os.path.getsize(path))
+        count("rows_read", len(df))
+        if start is not None or end is not None:
+            fix = lambda t: t if t is None or isinstance(t, str) else _in_zone(t, df.index.tz)
+            df = df.loc[fix(start):fix(end)]
+        return df if tail is None else df.tail(tail)
+
+    import pyarrow as pa
+    name, names = meta["index"], pf.metadata.schema.names
+    pos = names.index(name)
+    # naive / 'YYYY-MM-DD' bounds are wall time in the index's zone, like .loc
+    ns = lambda t: None if t is None else _utc(_in_zone(t, meta["tz"])).value
+    lo, hi = ns(start), ns(end)
+    if isinstance(end, str) and len(end) <= 10:      # 'YYYY-MM-DD' → whole day, like .loc
+        hi = ns(pd.Timestamp(end) + pd.Timedelta(days=1)) - 1
+    want = [c for c in (columns if columns is not None else names) if c != name]
+    cols = [names.index(c) for c in [name] + want]
+    files, rows, done = segments(path), 0, False
+    picked = []                                      # (ParquetFile, [groups]) newest first
+    for i in range(len(files) - 1, -1, -1):          # segments hold later rows than the base
+        f = pf if i == 0 else pq.ParquetFile(files[i])
+        md, groups = f.metadata, []
+        for g in range(md.num_row_groups - 1, -1, -1):
+            st = md.row_group(g).column(pos).statistics
+            if st is not None and st.has_min_max:
+                if hi is not None and st.min > hi:
+                    continue
+                if lo is not None and st.max < lo:
+                    done = True
+                    break
+            groups.append(g)
+            rows += md.row_group(g).num_rows
+            if tail is not None and rows >= tail and (hi is None or st is None or st.max <= hi):
+                done = True
+                break
+        if groups:
+            picked.append((f, sorted(groups)))
+        if done:
+            break
+    tbls = []
+    for f, groups in reversed(picked):
+        tbls.append(f.read_row_groups(groups, columns=[name] + want))
+        count("bytes_read", sum(f.metadata.row_group(g).column(i).total_compressed_size
+                                for g in groups for i in cols))
+    tbl = pa.concat_tables(tbls) if tbls else pf.schema_arrow.empty_table().select([name] + want)
+    ts = tbl.column(name).to_numpy()
+    keep = np.ones(len(ts), bool)
+    if lo is not None:
+        keep &= ts >= lo
+    if hi is not None:
+        keep &= ts <= hi
+    index = pd.DatetimeIndex(ts[keep].astype("datetime64[ns]"), name=meta.get("name", name))
+    if meta["tz"]:
+        index = index.tz_localize("UTC").tz_convert(meta["tz"])
+    data = {}
+    for c in want:
+        v = tbl.column(c).to_numpy()[keep]
+        if c in meta["targets"]:
+            v = np.where(v == 0, np.nan, v).astype(np.float32)
+        data[c] = v
+    df = pd.DataFrame(data, index=index, columns=want)
+    count("rows_read", len(df))
+    return df if tail is None else df.tail(tail)
+
+@span("parquet_read")
+def read_last(path: str, columns=None):
+    """
+    (timestamp, {column: float}) of the last row, with pyarrow alone – the
+    one-row live scorers never import pandas.  Handles ready and plain
+    pandas-written files; the timestamp is a tz-aware datetime in the
+    index's zone (UTC when it was naive), targets decode 0 → NaN.
+    """
+    import datetime as dt, math
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(segments(path)[-1])          # newest appended segment, if any
+    md, meta = pf.metadata, _ready_meta(pf.schema_arrow)
+    if meta:
+        name, tz, targets = meta["index"], meta["tz"], set(meta["targets"])
+    else:
+        idx = (pf.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+        if not idx or not isinstance(idx[0], str):
+            raise ValueError(f"{path}: no stored time index")
+        name, targets = idx[0], set()
+        tz = getattr(pf.schema_arrow.field(name).type, "tz", None)
+    want = [c for c in (columns if columns is not None else md.schema.names) if c != name]
+    g = md.num_row_groups - 1
+    while g > 0 and md.row_group(g).num_rows == 0:
+        g -= 1
+    tbl = pf.read_row_group(g, columns=[name] + want)
+    t = tbl.column(name)[-1]
+    # TimestampScalar.value, not .cast(): casting would import pyarrow.compute
+    ns = t.as_py() if meta else t.value * {"s": 10**9, "ms": 10**6, "us": 10**3, "ns": 1}[t.type.unit]
+    when = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc) + dt.timedelta(microseconds=ns // 1000)
+    if tz:
+        try:
+            from zoneinfo import ZoneInfo
+            when = when.astimezone(ZoneInfo(tz))
+        except (ValueError, KeyError):
+            pass                                      # fixed-offset tz string: keep UTC
+    row = {}
+    for c in want:
+        v = tbl.column(c)[-1].as_py()
+        v = math.nan if v is None else float(v)
+        row[c] = math.nan if c in targets and v == 0 else v
+    count("rows_read", 1)
+    return when, row
+
+# ── in-process cache for resident callers (daemon.py) ─────────────────
+_CACHE = {}
+
+def cached(path: str, loader):
+    """
+    loader(path), memoised on the file's [mtime, size]: a long-lived process
+    re-reads a model / dataset only after the writer has replaced it.
+    """
+    sig = file_sig(path)
+    hit = _CACHE.get(path)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    obj = loader(path)
+    _CACHE[path] = (sig, obj)
+    return obj
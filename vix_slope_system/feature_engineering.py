@@ -3,8 +3,11 @@ Build EOD & intraday feature sets for the VIX-slope project.
 Calling this module *as a script* will write Parquet datasets, but simply
 importing it is now side-effect-free.
 """
-import glob, os, pandas as pd, numpy as np
-from util import CFG, ensure_dirs, log
+import argparse, glob, os, pandas as pd, numpy as np
+from util import CFG, count, ensure_dirs, log, span
+from dataset_io import (write_ready, append_ready, read_ready, read_tail, file_sig,
+                        read_state, write_state)
+import barstore
 
 # ---------- helpers -------------------------------------------------
 def z(s, w=20):
@@ -12,67 +15,240 @@ def z(s, w=20):
     return (s - s.rolling(w).mean()) / s.rolling(w).std()
 
 # ---------- EOD -----------------------------------------------------
-def build_eod():
+Z_WIN, RV_WIN, HORIZONS = 20, 5, (5, 10)
+EOD_WARMUP = max(Z_WIN, RV_WIN + 1)     # history rows a new row's features need
+
+def _eod_paths():
+    dst = f'{CFG["paths"]["ready"]}dataset_eod.parquet'
+    return dst, dst.replace(".parquet", ".state.json")
+
+def _legacy_eod(tag):
+    return f'{CFG["paths"]["raw"]}{tag}.parquet'
+
+def _has_raw(tag):
+    fp = _legacy_eod(tag)
+    return bool(barstore.partitions(tag, "day")) or (
+        os.path.exists(fp) and os.path.getsize(fp) > 100)
+
+def _raw_sig(tag):
+    return barstore.signature(tag, "day") or file_sig(_legacy_eod(tag))
+
+def _raw_close(tag, start=None):
+    """Adj Close for one symbol – bar store first, legacy <tag>.parquet second."""
+    if barstore.partitions(tag, "day"):
+        ser = barstore.read(tag, "day", start=start, columns=["Adj Close"])["Adj Close"]
+    else:
+        ser = pd.read_parquet(_legacy_eod(tag))["Adj Close"]
+        if start is not None:
+            ser = ser[ser.index >= start]
+    return ser.rename(tag.upper())
+
+def _eod_panel(start=None):
+    """Joined close-price panel, one upper-case column per symbol."""
+    return pd.concat([_raw_close(t, start) for t in CFG["symbols"]], axis=1).dropna()
+
+@span("rolling_features")
+def _eod_features(df):
+    df["S1"]      = df["VXZ"] - df["VIXY"]
+    df["S1_Z"]    = z(df["S1"], Z_WIN)
+    df["S1_PCT"]  = df["S1"].pct_change()
+    df["RV5"]     = np.log(df["SPY"]).diff().rolling(RV_WIN).std() * np.sqrt(252)
+    for h in HORIZONS:
+        df[f"TARGET_{h}D"] = np.sign(df["SPY"].shift(-h) / df["SPY"] - 1).replace(0, np.nan)
+    return df.dropna()
+
+def build_eod(incremental: bool = True):
     """
     Create daily feature table with:
       S1, S1_Z, S1_PCT, RV5, TARGET_5D, TARGET_10D
     and save to dataset_eod.parquet
+
+    Incremental mode keeps a watermark (last written date) in
+    dataset_eod.state.json.  When the raw bars are unchanged it returns
+    without reading anything; otherwise it reads back only the
+    EOD_WARMUP-row rolling-window tail (a date-range read from the bar
+    store, a row-group read from the dataset), recomputes the rows after
+    the watermark and appends them as a new segment
+    (dataset_io.append_ready) – the written history is never rewritten.
+    Rows whose TARGET_5D/10D look-ahead has not arrived yet stay after the
+    watermark and are picked up (labels backfilled) once it has.  Falls
+    back to a full rebuild when there is no state, or when the raw history
+    under the warm-up tail was revised.
     """
-    raw_files = [f'{CFG["paths"]["raw"]}{t}.parquet' for t in CFG["symbols"]]
-    if not all(os.path.exists(f) and os.path.getsize(f) > 100 for f in raw_files):
+    dst, state_p = _eod_paths()
+    if not all(_has_raw(t) for t in CFG["symbols"]):
         log("EOD build skipped – missing raw files", 30)
         return
 
-    dfs = {
-        t: pd.read_parquet(f)[["Adj Close"]].rename(columns={"Adj Close": t.upper()})
-        for t, f in zip(CFG["symbols"], raw_files)
-    }
-    df = pd.concat(dfs.values(), axis=1).dropna()
-
-    df["S1"]      = df["VXZ"] - df["VIXY"]
-    df["S1_Z"]    = z(df["S1"])
-    df["S1_PCT"]  = df["S1"].pct_change()
-    df["RV5"]     = np.log(df["SPY"]).diff().rolling(5).std() * np.sqrt(252)
+    sigs  = {t: _raw_sig(t) for t in CFG["symbols"]}
+    state = read_state(state_p) if incremental else {}
+    fresh = (state.get("dataset") == file_sig(dst)
+             and set(state.get("raw", {})) == set(sigs))
+    if fresh and state["raw"] == sigs:
+        log("EOD set up to date – nothing to do")
+        return
 
-    df["TARGET_5D"]  = np.sign(df["SPY"].shift(-5)  / df["SPY"] - 1).replace(0, np.nan)
-    df["TARGET_10D"] = np.sign(df["SPY"].shift(-10) / df["SPY"] - 1).replace(0, np.nan)
-    df.dropna(inplace=True)
+    old = None
+    if fresh:
+        # only the warm-up tail is read back, from the dataset and the raw bars
+        old  = read_tail(dst, EOD_WARMUP)
+        mark = pd.Timestamp(state["watermark"])
+        panel = _eod_panel(old.index[0])
+        p = panel.index.searchsorted(mark, side="right")
+        tail = panel.iloc[max(0, p - EOD_WARMUP):].copy()
+        # prices the warm-up rows were built from must not have moved
+        cols = old.columns.intersection(panel.columns)
+        chk  = old.loc[old.index >= tail.index[0], cols]
+        if (old.index[-1] != mark or not chk.index.isin(panel.index).all()
+                or not np.allclose(chk, panel.loc[chk.index, cols])):
+            log("EOD raw history revised under watermark – full rebuild", 30)
+            old = None
 
-    dst = f'{CFG["paths"]["ready"]}dataset_eod.parquet'
-    df.to_parquet(dst)
-    log(f"EOD set → {dst} ({len(df):,} rows)")
+    # raw prices stay float64 so the warm-up check above compares exactly
+    exact = [t.upper() for t in CFG["symbols"]]
+    if old is None:
+        df = _eod_features(_eod_panel())
+        with span("parquet_write"):
+            write_ready(df, dst, exact=exact)
+        rows, how = len(df), "full"
+    else:
+        df = _eod_features(tail).loc[lambda d: d.index > mark]
+        if df.empty:
+            write_state(state_p, {**state, "raw": sigs})
+            log("EOD set: no rows with complete labels past watermark")
+            return
+        with span("parquet_write"):
+            append_ready(df[old.columns], dst, exact=exact)
+        rows, how = state.get("rows", 0) + len(df), f"+{len(df)} rows"
+    count("rows_built", len(df))
+    write_state(state_p, {"watermark": df.index[-1].isoformat(),
+                          "rows": rows, "raw": sigs,
+                          "dataset": file_sig(dst)})
+    log(f"EOD set → {dst} ({rows:,} rows, {how})")
 
 # ---------- intraday (SPY) ------------------------------------------
-def build_intraday(symbol: str = "SPY", horizon: int = 10):
+INTRA_WIN = 10                          # MA10 / ATR10 window
+
+def _close_series(part):
+    """Close column of one minute file (flat or yfinance MultiIndex cols)."""
+    col = part["close" if "close" in part.columns else "Close"]
+    return col.iloc[:, 0] if isinstance(col, pd.DataFrame) else col
+
+def _read_closes(files):
+    ser = pd.concat([_close_series(pd.read_parquet(fp)) for fp in files])
+    return ser[~ser.index.duplicated("last")].sort_index()
+
+@span("rolling_features")
+def _intraday_features(ser, symbol, horizon):
+    df = ser.to_frame(name=symbol)
+    df["RET1"]    = ser.pct_change()
+    df["MA10"]    = ser.rolling(INTRA_WIN).mean() / ser - 1
+    df["ATR10"]   = (ser.rolling(INTRA_WIN).max() - ser.rolling(INTRA_WIN).min()) / ser.shift(1)
+    df["RET_FWD"] = ser.shift(-horizon) / ser - 1
+    return df.dropna()
+
+def _tail_state(ser, last_row):
+    """Bars after the last written row plus the INTRA_WIN bars before them."""
+    p = ser.index.searchsorted(last_row, side="right")
+    tail = ser.iloc[max(0, p - INTRA_WIN):]
+    return {"ts": tail.index.as_unit("ns").asi8.tolist(), "close": tail.tolist()}
+
+def build_intraday(symbol: str = "SPY", horizon: int = 10, incremental: bool = True):
     """
     Build minute-bar feature table with:
       RET1, MA10, ATR10, RET_FWD
+
+    Sources are the legacy <SYMBOL>_<day>.parquet files plus the bar
+    store's <symbol>/minute/<YYYY-MM> partitions (the store wins on
+    duplicate timestamps).
+
+    Streaming mode: dataset_intraday_<SYMBOL>.state.json holds a manifest
+    of every minute file's [mtime, size] plus the close-price tail (bars
+    still waiting for their RET_FWD look-ahead and the 10-bar window before
+    them) and the last written row.  Each run reads only new/changed files,
+    extends the tail across the day boundary and appends the rows that
+    became complete as a new segment (dataset_io.append_ready) – the
+    written history is neither read nor rewritten, so a cycle costs the
+    same on day 500 as on day 5.  Re-read bars are checked against the tail
+    and, for those before it, against the dataset's close column over just
+    that span (a row-group-pruned read).  An already-processed bar coming
+    back with a different price, or a new file for an older session,
+    forces a full rebuild.
     """
     pat = f'{CFG["paths"]["raw"]}{symbol}_*.parquet'
-    files = sorted(glob.glob(pat))
+    files = sorted(glob.glob(pat)) + barstore.partitions(symbol, "minute")
     if not files:
         log("Intraday build skipped – no minute files", 30)
         return
 
-    parts = [pd.read_parquet(fp) for fp in files]
-    ser   = pd.concat([p["close" if "close" in p.columns else "Close"] for p in parts])
-    ser   = ser[~ser.index.duplicated("last")]
+    dst = f'{CFG["paths"]["ready"]}dataset_intraday_{symbol}.parquet'
+    state_p = dst.replace(".parquet", ".state.json")
+    sigs  = {os.path.basename(fp): file_sig(fp) for fp in files}
+    state = read_state(state_p) if incremental else {}
+    ok = (state.get("dataset") == file_sig(dst)
+          and state.get("horizon") == horizon and "last" in state
+          and set(state.get("files", {})) <= set(sigs))
+    changed = [fp for fp in files
+               if state.get("files", {}).get(os.path.basename(fp)) != sigs[os.path.basename(fp)]]
+    if ok and not changed:
+        log("Intraday set up to date – nothing to do")
+        return
 
-    df = ser.to_frame(name=symbol)
-    df["RET1"]    = ser.pct_change()
-    df["MA10"]    = ser.rolling(10).mean() / ser - 1
-    df["ATR10"]   = (ser.rolling(10).max() - ser.rolling(10).min()) / ser.shift(1)
-    df["RET_FWD"] = ser.shift(-horizon) / ser - 1
-    df.dropna(inplace=True)
+    full = True
+    if ok:
+        fresh = _read_closes(changed)
+        tail  = pd.Series(state["tail"]["close"], dtype="float64",
+                          index=pd.to_datetime(state["tail"]["ts"], unit="ns", utc=True))
+        last  = pd.Timestamp(state["last"])
+        # bars we already processed must come back unchanged: the tail from
+        # the state, anything older from the dataset over the re-read span only
+        seen  = fresh[fresh.index <= tail.index[-1]] if len(tail) else fresh
+        known = tail
+        if len(seen) and len(tail) and seen.index[0] < tail.index[0]:
+            span_ = read_ready(dst, columns=[symbol], start=seen.index[0],
+                               end=tail.index[0] - pd.Timedelta(1, "ns"))[symbol]
+            known = pd.concat([span_.astype("float64"), tail])
+        hit   = seen.index.intersection(known.index)
+        if (tail.empty or len(hit) < len(seen)
+                or not np.allclose(seen[hit], known[hit])):
+            log("Intraday: history revised before tail – full rebuild", 30)
+        else:
+            full = False
+            ser = pd.concat([tail, fresh[fresh.index > tail.index[-1]]])
+            new = _intraday_features(ser, symbol, horizon)
+            new = new[new.index > last]
+            if len(new):
+                with span("parquet_write"):
+                    append_ready(new, dst, exact=(symbol,))
+                count("rows_built", len(new))
+                last = new.index[-1]
+            rows = state.get("rows", 0) + len(new)
+            how = f"+{len(new)} rows"
 
-    dst = f'{CFG["paths"]["ready"]}dataset_intraday_{symbol}.parquet'
-    df.to_parquet(dst)
-    log(f"Intraday set → {dst} ({len(df):,} rows)")
+    if full:
+        ser = _read_closes(files)
+        df  = _intraday_features(ser, symbol, horizon)
+        if df.empty:
+            log("Intraday build skipped – not enough bars yet", 30)
+            return
+        with span("parquet_write"):
+            write_ready(df, dst, exact=(symbol,))
+        count("rows_built", len(df))
+        last, rows, how = df.index[-1], len(df), "full"
+
+    write_state(state_p, {"files": sigs, "horizon": horizon, "last": last.isoformat(),
+                          "rows": rows, "tail": _tail_state(ser, last),
+                          "dataset": file_sig(dst)})
+    log(f"Intraday set → {dst} ({rows:,} rows, {how})")
 
 # ---------- CLI entry-point -----------------------------------------
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true",
+                    help="ignore watermarks and rebuild from scratch")
+    args = ap.parse_args()
     ensure_dirs()
     log(f"=== ENTER {__file__} ===")
-    build_eod()
-    build_intraday("SPY")
+    build_eod(incremental=not args.full)
+    build_intraday("SPY", incremental=not args.full)
     log(f"=== EXIT  {__file__} ===")
@@ -0,0 +1,181 @@
+"""
+ledger.py – append-only paper-trading ledger (SQLite, WAL journal).
+
+portfolio.book_trade used to read the whole equity_curve.csv, append one
+row and rewrite the file on every fill, so latency grew with the ledger's
+age.  Here the current cash / position / NAV live in memory, each fill is
+one INSERT committed to the write-ahead log, and the PDT window is an
+incrementally maintained counter – a trade costs the same whether the
+ledger holds ten rows or ten million.
+
+    reports/ledger.db   table fills(id, timestamp, day, side, qty, price,
+                                    cash, pos, nav, day_trades)
+
+The first row is the funding row (side 'INIT').  An existing
+equity_curve.csv is imported once when the ledger is created.
+"""
+import os, sqlite3, datetime as dt
+from collections import deque
+import numpy as np
+from util import CFG, log
+
+PDT_DAYS = 5          # FINRA pattern-day-trader look-back, in business days
+
+# ── PDT window ──────────────────────────────────────────────────────
+def trading_day(ts) -> dt.date:
+    """Session date of a fill timestamp (str 'YYYY-MM-DD …', datetime or date)."""
+    if isinstance(ts, str):
+        return dt.date.fromisoformat(ts[:10])
+    if isinstance(ts, dt.datetime):
+        return ts.date()
+    return ts
+
+def _bday(day: dt.date) -> int:
+    return int(np.busday_count(dt.date(1970, 1, 5), day))
+
+class PDTWindow:
+    """
+    Round-trips over the last `days` business days.  At most `days` buckets
+    are ever held, so count() / add() are O(1) regardless of history length.
+    Days must arrive in non-decreasing order (they do for a ledger replay).
+    """
+    def __init__(self, days: int = PDT_DAYS):
+        self.days  = days
+        self.q     = deque()          # [business-day ordinal, round-trips]
+        self.total = 0
+
+    def _evict(self, b: int):
+        while self.q and self.q[0][0] <= b - self.days:
+            self.total -= self.q.popleft()[1]
+
+    def count(self, day) -> int:
+        self._evict(_bday(trading_day(day)))
+        return self.total
+
+    def add(self, day, n: int = 1):
+        b = _bday(trading_day(day))
+        self._evict(b)
+        if self.q and self.q[-1][0] == b:
+            self.q[-1][1] += n
+        else:
+            self.q.append([b, n])
+        self.total += n
+
+# ── fill rule (shared with backtester.py) ───────────────────────────
+def fill_rule(side, price, qty, cash, pos, pdt: PDTWindow, day, max_day_trades):
+    """
+    book_trade's checks, state-free: → (skip message | None, cash, pos,
+    day_trades).  Cash / inventory first, then the PDT cap on a SELL that
+    flattens the position.
+    """
+    if side == "BUY":
+        cost = price * qty
+        if cash < cost:
+            return "SKIP – insufficient cash", cash, pos, 0
+        pos += qty
+        cash -= cost
+    else:   # SELL
+        if pos < qty:
+            return "SKIP – no inventory", cash, pos, 0
+        pos -= qty
+        cash += price * qty
+
+    if side == "SELL" and pos == 0:         # closed same-day position
+        if pdt.count(day) >= max_day_trades:
+            return "SKIP – PDT cap", cash, pos, 0
+        return None, cash, pos, 1
+    return None, cash, pos, 0
+
+# ── ledger ──────────────────────────────────────────────────────────
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY, timestamp TEXT, day TEXT, side TEXT,
+    qty REAL, price REAL, cash REAL, pos REAL, nav REAL, day_trades INTEGER);
+CREATE INDEX IF NOT EXISTS fills_day ON fills(day);
+"""
+COLS = ["timestamp", "cash", "pos", "nav", "day_trades"]   # equity_curve.csv layout
+
+class Ledger:
+    def __init__(self, path: str, start_cash=None, max_day_trades=None):
+        pf = CFG.get("portfolio", {})
+        self.path = path
+        self.max_day_trades = max_day_trades if max_day_trades is not None \
+                              else pf.get("max_day_trades", 3)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(_SCHEMA)
+        if self.db.execute("SELECT 1 FROM fills LIMIT 1").fetchone() is None:
+            self._seed(start_cash if start_cash is not None else pf.get("start_cash", 10_000))
+        self._load()
+
+    def _seed(self, start_cash):
+        legacy = os.path.join(os.path.dirname(self.path), "equity_curve.csv")
+        if os.path.exists(legacy):
+            import pandas as pd
+            df = pd.read_csv(legacy)
+            rows = [(str(r.timestamp), str(r.timestamp)[:10], "IMPORT", None, None,
+                     r.cash, r.pos, r.nav, int(r.day_trades)) for r in df.itertuples()]
+            log(f"ledger: imported {len(rows):,} rows from {legacy}")
+        else:
+            now = dt.datetime.utcnow()
+            rows = [(str(now), now.date().isoformat(), "INIT", None, None,
+                     start_cash, 0, start_cash, 0)]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO fills(timestamp, day, side, qty, price, cash, pos, nav, day_trades)"
+                " VALUES (?,?,?,?,?,?,?,?,?)", rows)
+
+    def _load(self):
+        """Current book from the last row; PDT buckets from the last few days only."""
+        self.cash, self.pos, self.nav, last = self.db.execute(
+            "SELECT cash, pos, nav, day FROM fills ORDER BY id DESC LIMIT 1").fetchone()
+        self.pdt = PDTWindow()
+        since = np.busday_offset(dt.date.fromisoformat(last), -PDT_DAYS, roll="backward")
+        for day, n in self.db.execute(
+                "SELECT day, SUM(day_trades) FROM fills WHERE day > ? GROUP BY day ORDER BY day",
+                (str(since),)):
+            if n:
+                self.pdt.add(dt.date.fromisoformat(day), int(n))
+
+    def book(self, side, price, timestamp, qty=1) -> str:
+        """Same rules and messages as the CSV-backed portfolio.book_trade."""
+        day = trading_day(timestamp)
+        skip, cash, pos, day_trades = fill_rule(
+            side, price, qty, self.cash, self.pos, self.pdt, day, self.max_day_trades)
+        if skip:
+            return skip
+
+        nav = cash + pos * price
+        self.db.execute(
+            "INSERT INTO fills(timestamp, day, side, qty, price, cash, pos, nav, day_trades)"
+            " VALUES (?,?,?,?,?,?,?,?,?)",
+            (str(timestamp), day.isoformat(), side, qty, price, cash, pos, nav, day_trades))
+        self.cash, self.pos, self.nav = cash, pos, nav
+        if day_trades:
+            self.pdt.add(day)
+        return f"EXECUTED {side} {qty}@{price:.2f}  NAV={nav:.2f}"
+
+    def frame(self):
+        """Whole ledger in equity_curve.csv layout (for reports, not the hot path)."""
+        import pandas as pd
+        df = pd.read_sql_query(f"SELECT {', '.join(COLS)} FROM fills ORDER BY id", self.db)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="mixed")
+        return df
+
+    def close(self):
+        self.db.close()
+
+# ── process-wide handle ─────────────────────────────────────────────
+_OPEN = {}
+
+def path() -> str:
+    return f'{CFG["paths"]["reports"]}ledger.db'
+
+def get() -> Ledger:
+    """The ledger for the configured reports dir, opened once per process."""
+    p = path()
+    if p not in _OPEN:
+        _OPEN[p] = Ledger(p)
+    return _OPEN[p]
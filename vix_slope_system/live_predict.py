@@ -1,37 +1,108 @@
 """
 live_predict.py  –  prints the latest 5-day and 10-day regime calls
+
+    python live_predict.py                          # latest row, all horizons
+    python live_predict.py --history [--start D]    # rescore the whole set
+
+main() scores the latest row through the lite models (registry.load_lite:
+numpy + pyarrow only), so a cold start skips pandas / sklearn / lightgbm;
+it falls back to the full bundles when no lite artifact is current.
 """
-import joblib, pandas as pd
-from util import CFG, log
+from __future__ import annotations
+import argparse, math
+from util import CFG, count, log, span
+from dataset_io import read_last, read_tail, read_ready
+import registry
+
+HORIZONS = ("5d", "10d")
+NON_FEATS = ("SPY", "QQQ", "TARGET_5D", "TARGET_10D")
 
 def load_model(tag):
-    """tag = '5d' or '10d'"""
-    return joblib.load(f'{CFG["paths"]["model"]}daily_clf_{tag}.pkl')
+    """tag = '5d' or '10d' – (bundle, manifest); unpickled again only after a publish"""
+    return registry.load(f"daily_clf_{tag}")
+
+def _dataset():
+    return f'{CFG["paths"]["ready"]}dataset_eod.parquet'
 
 def latest_row():
-    df = pd.read_parquet(f'{CFG["paths"]["ready"]}dataset_eod.parquet')
-    return df.tail(1)
+    # only the trailing row group is decoded
+    return read_tail(_dataset(), 1)
+
+@span("predict")
+def score(rows: pd.DataFrame, tags=HORIZONS) -> pd.DataFrame:
+    """
+    P(up) for N rows × K horizon models → DataFrame (rows.index × tags).
+    One scaler transform + one predict_proba per model over all rows;
+    ±Inf features are treated as missing (LightGBM routes NaN natively).
+    """
+    import numpy as np, pandas as pd
+    out = {}
+    for tag in tags:
+        bundle, meta = load_model(tag)
+        feats = meta.get("features") or [c for c in rows.columns if c not in NON_FEATS]
+        X = rows[feats].replace([np.inf, -np.inf], np.nan)
+        out[tag] = bundle["model"].predict_proba(bundle["scaler"].transform(X))[:, 1]
+    count("rows_scored", len(rows) * len(tags))
+    return pd.DataFrame(out, index=rows.index)
 
 def predict(tag, latest):
-    scaler, model = load_model(tag)
-    feats = [c for c in latest.columns
-             if c not in ("SPY","QQQ","TARGET_5D","TARGET_10D")]
-    X = scaler.transform(latest[feats])
-    return model.predict_proba(X)[0,1]
+    """Single-horizon, single-row convenience wrapper around score()."""
+    return score(latest.tail(1), (tag,))[tag].iloc[0]
+
+def score_history(start=None, end=None, tags=HORIZONS) -> pd.DataFrame:
+    """Rescore every row of dataset_eod in [start, end] with the current models."""
+    return score(read_ready(_dataset(), start=start, end=end), tags)
+
+@span("predict")
+def score_latest(tags=HORIZONS):
+    """
+    (timestamp, {tag: P(up)}) for the last dataset row via the lite models,
+    or None when any horizon has no current lite artifact.  Same features,
+    ±Inf handling and numbers as score().
+    """
+    lites = {tag: registry.load_lite(f"daily_clf_{tag}") for tag in tags}
+    if not all(lites.values()):
+        return None
+    when, row = read_last(_dataset())
+    out = {}
+    for tag, (bundle, meta) in lites.items():
+        feats = meta.get("features") or [c for c in row if c not in NON_FEATS]
+        x = [[v if math.isfinite(v) else math.nan for v in (row[c] for c in feats)]]
+        out[tag] = float(bundle["model"].predict_proba(bundle["scaler"].transform(x))[0, 1])
+    count("rows_scored", len(tags))
+    return when, out
+
+def call(p):
+    return "LONG" if p>0.6 else "SHORT" if p<0.4 else "FLAT"
 
 def main():
-    row = latest_row()
-    ts  = row.index[-1].strftime("%Y-%m-%d")
-    p5  = predict("5d",  row)
-    p10 = predict("10d", row)
-    dir5  = "LONG" if p5>0.6 else "SHORT" if p5<0.4 else "FLAT"
-    dir10 = "LONG" if p10>0.6 else "SHORT" if p10<0.4 else "FLAT"
+    fast = score_latest()
+    if fast is not None:
+        when, p = fast
+    else:
+        row = latest_row()
+        when, p = row.index[-1], score(row).iloc[-1]
+    ts  = when.strftime("%Y-%m-%d")
+    p5, p10 = p["5d"], p["10d"]
+    dir5, dir10 = call(p5), call(p10)
 
     log(f"{ts} 5-day P(up)={p5:.1%} → {dir5}")
     log(f"{ts} 10-day P(up)={p10:.1%} → {dir10}")
     print(f"{ts}\n  5-day : {dir5}  ({p5:.1%})\n 10-day : {dir10} ({p10:.1%})")
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--history", action="store_true", help="rescore every row")
+    ap.add_argument("--start", help="first date for --history")
+    ap.add_argument("--end", help="last date for --history")
+    ap.add_argument("--out", help="CSV path for --history (default: reports/)")
+    args = ap.parse_args()
     log(f"=== ENTER {__file__} ===")
-    main()
+    if args.history:
+        res = score_history(args.start, args.end)
+        out = args.out or f'{CFG["paths"]["reports"]}rescore_eod.csv'
+        res.to_csv(out)
+        log(f"rescored {len(res):,} rows → {out}")
+    else:
+        main()
     log(f"=== EXIT  {__file__} ===")
@@ -1,55 +1,85 @@
 """
 Called after every intraday data pull; prints buy/short zone & advice.
+
+The latest bar is scored through the lite quantile pair (registry.load_lite:
+numpy + pyarrow only); the full bundle / pandas path is the fallback when
+no lite artifact is current.  zone_signal is the trading rule itself –
+backtester.py imports it to replay history.
 """
-import os, joblib, pandas as pd
-from util import CFG, log
+import csv, os
+import numpy as np
+from util import CFG, log, span
+from dataset_io import cached, read_last
+import registry
 from portfolio import book_trade
-from util import log
-log(f"=== ENTER {__file__} ===")
 
 SYMBOL = "SPY"      # can extend to loop over symbols later
 HORIZ  = 10         # forward-return horizon, in minutes
+ZONE   = 0.002      # minimum predicted move on the favourable quantile
+TZ     = "America/New_York"
 
 # ── helper ──────────────────────────────────────────────────────────
-def load(tag):
-    return joblib.load(
-        f'{CFG["paths"]["model"]}{SYMBOL.lower()}_reg_{tag}.pkl')
+def zone_signal(ret_hi, ret_lo):
+    """+1 BUY / -1 SELL / 0 hold, elementwise over the quantile pair."""
+    ret_hi, ret_lo = np.asarray(ret_hi), np.asarray(ret_lo)
+    return np.where((ret_hi > ZONE) & (ret_lo > 0), 1,
+           np.where((ret_lo < -ZONE) & (ret_hi < 0), -1, 0)).astype(np.int8)
+
+def load():
+    """{"scaler", "lo", "hi"} quantile pair + manifest, from the registry"""
+    return registry.load(f"{SYMBOL.lower()}_reg")
+
+def _last_winrate(p) -> float:
+    with open(p, newline="") as fh:
+        return float(list(csv.DictReader(fh))[-1]["win_rate"])
 
 def latest_winrate() -> float:
     p = f'{CFG["paths"]["reports"]}winrate_log.csv'
     if not os.path.exists(p):
         return 0.5
-    return pd.read_csv(p)["win_rate"].iloc[-1]
+    return cached(p, _last_winrate)
 
-# ── main ────────────────────────────────────────────────────────────
-def main():
-    df = pd.read_parquet(
-        f'{CFG["paths"]["ready"]}dataset_intraday_{SYMBOL}.parquet')
-    latest = df.tail(1)
-    price_now = latest[SYMBOL].iloc[0]
-    feats = [c for c in latest.columns if c not in ("RET_FWD", SYMBOL)]
+def _dataset():
+    return f'{CFG["paths"]["ready"]}dataset_intraday_{SYMBOL}.parquet'
 
-    scaler_hi, reg_hi = load("hi")
-    scaler_lo, reg_lo = load("lo")
-    X_hi = scaler_hi.transform(latest[feats])
-    X_lo = scaler_lo.transform(latest[feats])
+@span("predict")
+def zone():
+    """(bar time, price, ret_hi, ret_lo) for the latest bar."""
+    lite = registry.load_lite(f"{SYMBOL.lower()}_reg")
+    if lite is not None:
+        (bundle, meta), (when, row) = lite, read_last(_dataset())
+        feats = meta.get("features") or [c for c in row if c not in ("RET_FWD", SYMBOL)]
+        price_now, x = row[SYMBOL], [[row[c] for c in feats]]
+    else:
+        from dataset_io import read_ready
+        latest = read_ready(_dataset(), tail=1)
+        bundle, meta = load()
+        feats = meta.get("features") or \
+                [c for c in latest.columns if c not in ("RET_FWD", SYMBOL)]
+        when, price_now, x = latest.index[-1], latest[SYMBOL].iloc[0], latest[feats]
+    X = bundle["scaler"].transform(x)    # shared by both quantiles
+    ret_hi = bundle["hi"].predict(X)[0]   # 80-percentile
+    ret_lo = bundle["lo"].predict(X)[0]   # 20-percentile
+    return when, price_now, ret_hi, ret_lo
 
-    ret_hi = reg_hi.predict(X_hi)[0]   # 80-percentile
-    ret_lo = reg_lo.predict(X_lo)[0]   # 20-percentile
+# ── main ────────────────────────────────────────────────────────────
+def main():
+    from zoneinfo import ZoneInfo
+    when, price_now, ret_hi, ret_lo = zone()
 
     tgt_hi = price_now * (1 + ret_hi)
     tgt_lo = price_now * (1 + ret_lo)
 
-    ts = latest.index[-1].tz_convert("America/New_York")\
-                         .strftime("%Y-%m-%d %H:%M")
+    ts = when.astimezone(ZoneInfo(TZ)).strftime("%Y-%m-%d %H:%M")
     log(f"{ts}  {SYMBOL}={price_now:.2f}  → zone {tgt_lo:.2f}-{tgt_hi:.2f}")
 
     conf = latest_winrate()            # historical win-rate as confidence
-    if ret_hi > 0.002 and ret_lo > 0:
+    sig = zone_signal(ret_hi, ret_lo)  # same rule backtester.py replays
+    if sig > 0:
         advice = (f"Buy {SYMBOL} {price_now:.2f} now ({ts}), "
                   f"target ≥{tgt_hi:.2f} within {HORIZ} min – conf {conf:.0%}")
         res = book_trade("BUY", price_now, ts)
-    elif ret_lo < -0.002 and ret_hi < 0:
+    elif sig < 0:
         advice = (f"Short {SYMBOL} {price_now:.2f} now, "
                   f"cover ≤{tgt_lo:.2f} within {HORIZ} min – conf {conf:.0%}")
         res = book_trade("SELL", price_now, ts)
@@ -59,7 +89,5 @@ def main():
 
     log("⇢ " + advice + "   [" + res + "]")
 
-# ── CLI ─────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     main()
-log(f"=== EXIT  {__file__} ===")
\ No newline at end of file
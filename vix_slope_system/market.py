@@ -0,0 +1,56 @@
+"""
+market.py – NYSE session calendar, built once per process.
+
+pandas_market_calendars is slow to construct and every module used to
+build its own copy (plus auto_loop.sh spawned a fresh interpreter just to
+ask "is it open?").  Everything here is memoised, so a resident process
+(daemon.py) pays for the calendar once.
+"""
+import datetime as dt
+from functools import lru_cache
+import pandas as pd
+
+@lru_cache(None)
+def nyse():
+    import pandas_market_calendars as mcal
+    return mcal.get_calendar("NYSE")
+
+@lru_cache(maxsize=256)
+def _schedule(start: dt.date, end: dt.date) -> pd.DataFrame:
+    return nyse().schedule(start_date=start, end_date=end)
+
+def schedule(start: dt.date, end: dt.date) -> pd.DataFrame:
+    """market_open / market_close (UTC) per session in [start, end]."""
+    return _schedule(start, end).copy()
+
+def session(day: dt.date):
+    """(open, close) UTC timestamps for day, or None on weekends / holidays."""
+    s = _schedule(day, day)
+    if s.empty:
+        return None
+    return s["market_open"].iloc[0], s["market_close"].iloc[0]
+
+def now_utc() -> pd.Timestamp:
+    return pd.Timestamp.now(tz="UTC")
+
+def is_open(now=None) -> bool:
+    """True iff now (default: wall-clock) is inside that day's regular session."""
+    now = now or now_utc()
+    sess = session(now.date())
+    return sess is not None and sess[0] <= now <= sess[1]
+
+def last_market_day(today: dt.date | None = None) -> dt.date:
+    today = today or dt.date.today()
+    return _schedule(today - dt.timedelta(days=7), today).index[-1].date()
+
+def last_closed_session(now=None) -> dt.date:
+    """Newest session whose regular close is at or before now – today only after the bell."""
+    now = now or now_utc()
+    s = _schedule(now.date() - dt.timedelta(days=10), now.date())
+    return s.index[s["market_close"] <= now][-1].date()
+
+def next_open(now=None) -> pd.Timestamp:
+    """Start of the next regular session strictly after now."""
+    now = now or now_utc()
+    s = _schedule(now.date(), now.date() + dt.timedelta(days=10))
+    return s.loc[s["market_open"] > now, "market_open"].iloc[0]
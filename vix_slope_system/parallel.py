@@ -0,0 +1,95 @@
+"""
+parallel.py – process-pool fan-out for walk-forward windows and CV folds.
+
+    pmap(fn, tasks, payload, workers)  →  [fn(payload, task, threads), ...]
+    with pool(payload, workers) as run:     # many batches, one pool
+        run(fn, tasks) …
+
+• results come back in *task order*, so merged metrics are identical to a
+  serial run regardless of which worker finished first
+• the (large) payload is shipped once per worker through the pool
+  initializer, not once per task – and its numeric arrays go through
+  shm.share(), so workers attach to one memory-mapped copy instead of
+  unpickling their own
+• `threads` is the LightGBM n_jobs each worker should use, so that
+  workers × threads never exceeds the core count; every fit also takes
+  STABLE, so a pooled fold (fewer threads) and a serial one (LightGBM's
+  default) grow the same trees
+• workers ≤ 1 runs everything in-process (no pool, no pickling)
+• pool() keeps one share() and one set of workers across batches, so a
+  caller that checkpoints between batches (train_backtest.search) does
+  not pay for the payload write and process start-up every time
+"""
+import contextlib, os
+from concurrent.futures import ProcessPoolExecutor
+from util import CFG
+import shm
+
+_PAYLOAD = None
+
+# column-wise histograms summed in a fixed order – results don't depend on
+# how many threads LightGBM was given
+STABLE = {"deterministic": True, "force_col_wise": True}
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+def resolve_workers(workers=None) -> int:
+    """None → CFG['parallel']['workers'] (default 1); 0 or <0 → all cores."""
+    if workers is None:
+        workers = CFG.get("parallel", {}).get("workers", 1)
+    workers = int(workers)
+    return cpu_count() if workers <= 0 else workers
+
+def lgbm_threads(workers: int):
+    """LightGBM n_jobs per worker; None keeps LightGBM's default when serial."""
+    if workers <= 1:
+        return None
+    return max(1, cpu_count() // workers)
+
+def _init_worker(payload):
+    global _PAYLOAD
+    _PAYLOAD = shm.resolve(payload)
+
+def _call(args):
+    fn, task, threads = args
+    return fn(_PAYLOAD, task, threads)
+
+@contextlib.contextmanager
+def pool(payload=None, workers=1):
+    """
+    Yield run(fn, tasks, progress=None) → [fn(payload, task, threads), ...]
+    (task order) backed by one shared payload and one process pool for the
+    whole block; workers ≤ 1 yields an in-process runner.
+    """
+    workers = resolve_workers(workers)
+    threads = lgbm_threads(workers)
+    if workers <= 1:
+        def run(fn, tasks, progress=None):
+            tasks = list(tasks)
+            it = (fn(payload, t, threads) for t in tasks)
+            return list(progress(it, total=len(tasks)) if progress else it)
+        yield run
+        return
+
+    shared, refs = shm.share(payload)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared,)) as ex:
+            def run(fn, tasks, progress=None):
+                tasks = list(tasks)
+                it = ex.map(_call, [(fn, t, threads) for t in tasks])
+                return list(progress(it, total=len(tasks)) if progress else it)
+            yield run
+    finally:
+        shm.release(refs)
+
+def pmap(fn, tasks, payload=None, workers=1, progress=None):
+    """
+    Apply fn(payload, task, threads) to every task, results in task order.
+    `fn` must be a module-level function so worker processes can import it.
+    `progress` optionally wraps the result iterator (e.g. a tqdm partial).
+    """
+    tasks = list(tasks)
+    with pool(payload, min(resolve_workers(workers), max(1, len(tasks)))) as run:
+        return run(fn, tasks, progress)
@@ -0,0 +1,128 @@
+"""
+polygon_fetch.py – pooled, concurrent Polygon aggregates downloader.
+
+• one process-wide urllib3 connection pool (keep-alive, sized to the
+  worker count) instead of a fresh RESTClient per call
+• fetch_many() runs many symbol / date-range jobs over a bounded thread
+  pool – backfills are latency-bound, not bandwidth-bound
+• 429 / 5xx responses are retried with exponential backoff + jitter,
+  honouring Retry-After when Polygon sends it
+• bars are decoded straight from the JSON "results" list into columnar
+  NumPy arrays – no Agg objects, no b.__dict__ round-trip
+• CFG['polygon']['base'] can point at a local stand-in (tests/ serves
+  recorded responses) so throughput is testable offline
+
+Config (all optional):
+    polygon: {base: https://api.polygon.io, workers: 4, retries: 5,
+              backoff: 1.0, timeout: 30}
+"""
+import random, threading, time, json, numpy as np, pandas as pd, urllib3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from util import CFG, count, log, span
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+COLUMNS = {"o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"}
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _cfg(key, default):
+    return CFG.get("polygon", {}).get(key, default)
+
+def pool() -> urllib3.PoolManager:
+    """Process-wide keep-alive pool shared by every fetch thread."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = urllib3.PoolManager(
+                num_pools=4, maxsize=max(4, int(_cfg("workers", 4))), block=True,
+                headers={"Authorization": f'Bearer {CFG.get("polygon_key", "")}',
+                         "Accept-Encoding": "gzip"},
+                timeout=urllib3.Timeout(total=float(_cfg("timeout", 30))),
+                retries=False)
+        return _POOL
+
+def reset_pool():
+    """Drop the shared pool (config change, or after fork)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.clear()
+        _POOL = None
+
+# ── HTTP ────────────────────────────────────────────────────────────
+def _get_json(url: str) -> dict:
+    retries, backoff = int(_cfg("retries", 5)), float(_cfg("backoff", 1.0))
+    for attempt in range(retries + 1):
+        try:
+            resp = pool().request("GET", url)
+        except urllib3.exceptions.HTTPError as e:
+            status, err, wait = None, e, None
+        else:
+            if resp.status == 200:
+                count("bytes_fetched", len(resp.data))
+                return json.loads(resp.data)
+            status, err = resp.status, resp.data[:200].decode("utf-8", "replace")
+            wait = resp.headers.get("Retry-After")
+            if status not in RETRY_STATUS:
+                break
+        if attempt == retries:
+            break
+        delay = float(wait) if wait else backoff * 2 ** attempt
+        time.sleep(delay * (1 + 0.25 * random.random()))
+    raise RuntimeError(f"Polygon GET failed ({status}): {err}")
+
+def _columns(results: list) -> dict:
+    n = len(results)
+    cols = {"t": np.fromiter((r["t"] for r in results), np.int64, n)}
+    for k in COLUMNS:
+        cols[k] = np.fromiter((r.get(k, np.nan) for r in results), np.float64, n)
+    return cols
+
+# ── public API ──────────────────────────────────────────────────────
+def fetch_aggs(symbol: str, start, end, timespan="day", multiplier=1) -> pd.DataFrame:
+    """
+    OHLCV bars for symbol over [start, end] (ISO dates), following
+    next_url pagination.  Index = UTC DatetimeIndex "ts".
+    """
+    base = _cfg("base", "https://api.polygon.io").rstrip("/")
+    url = (f"{base}/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/"
+           f"{start}/{end}?" + urlencode({"adjusted": "true", "sort": "asc",
+                                          "limit": 50_000}))
+    chunks = []
+    while url:
+        with span("http", symbol=symbol):
+            body = _get_json(url)
+        if body.get("results"):
+            chunks.append(_columns(body["results"]))
+        url = body.get("next_url")
+    if not chunks:
+        return pd.DataFrame(columns=list(COLUMNS.values()),
+                            index=pd.DatetimeIndex([], tz="UTC", name="ts"))
+    cols = {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+    idx = pd.DatetimeIndex(pd.to_datetime(cols.pop("t"), unit="ms", utc=True), name="ts")
+    return pd.DataFrame({COLUMNS[k]: v for k, v in cols.items()}, index=idx)
+
+def fetch_many(jobs: dict, workers=None, timespan="day") -> dict:
+    """
+    jobs = {key: (symbol, start, end)}  →  {key: DataFrame | Exception}.
+    At most `workers` requests are in flight; one failure doesn't sink
+    the batch – the caller decides what to do with it.
+    """
+    workers = int(workers or _cfg("workers", 4))
+
+    def one(item):
+        key, (sym, start, end) = item
+        t = time.perf_counter()
+        try:
+            with span("fetch", symbol=sym):
+                df = fetch_aggs(sym, start, end, timespan)
+        except Exception as e:
+            return key, e
+        count("rows_fetched", len(df))
+        log(f"{sym}: {len(df):,} {timespan} bars in {time.perf_counter() - t:.2f}s")
+        return key, df
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        return dict(ex.map(one, jobs.items()))
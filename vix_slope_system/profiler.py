@@ -0,0 +1,239 @@
+"""
+profiler.py – opt-in sampling profiler for the daemon stages.
+
+A background thread snapshots the stage thread's Python stack (plus any
+busy worker threads – Polygon fetch / LightGBM fit pools) every
+`interval_ms` via sys._current_frames(): no tracing hooks, so the stage
+runs at full speed and the cost is one stack walk per tick.  Each
+profiled stage run writes
+
+    reports/profiles/<stage>/<UTC stamp>.folded   collapsed stacks
+    reports/profiles/<stage>/<UTC stamp>.svg      flame graph
+
+and only the newest `keep` runs per stage are kept.  Frames are named
+dotted.module:qualname (not line numbers), so runs from different deploys diff
+cleanly; lazy imports show up as importlib._bootstrap frames.
+
+    python daemon.py --profile              # or profile.enabled / PROFILE=1
+    python profiler.py list
+    python profiler.py diff train           # newest two runs of a stage
+    python profiler.py diff A.folded B.folded [--top 20]
+"""
+import argparse, collections, contextlib, glob, html, os, sys, threading, time, zlib
+from datetime import datetime, timezone
+from util import CFG, log
+
+INTERVAL_MS = 5
+KEEP        = 10
+_IDLE = ("threading.py", "queue.py", "selectors.py")   # parked pool workers
+
+def _cfg(key, default):
+    return CFG.get("profile", {}).get(key, default)
+
+def enabled() -> bool:
+    """profile.enabled in config.yml, daemon.py --profile, or PROFILE=1 in the environment."""
+    return bool(_cfg("enabled", False)) or os.environ.get("PROFILE", "0") not in ("", "0")
+
+# ── sampler ─────────────────────────────────────────────────────────
+_LABELS = {}
+
+def _label(frame) -> str:
+    code = frame.f_code
+    lab = _LABELS.get(code)
+    if lab is None:
+        mod = frame.f_globals.get("__name__") or \
+              os.path.splitext(os.path.basename(code.co_filename))[0]
+        lab = _LABELS[code] = f"{mod}:{getattr(code, 'co_qualname', code.co_name)}"
+    return lab
+
+def _stack(frame) -> list:
+    out = []
+    while frame is not None:
+        out.append(_label(frame))
+        frame = frame.f_back
+    return out[::-1]
+
+def _idle(frame) -> bool:
+    f = frame.f_code.co_filename
+    return f.endswith(_IDLE) or (f.endswith("thread.py") and frame.f_code.co_name == "_worker")
+
+class Sampler:
+    """with Sampler() as s: … → s.stacks (Counter of frame tuples), s.samples, s.seconds"""
+
+    def __init__(self, interval_ms=INTERVAL_MS, all_threads=True):
+        self.interval = interval_ms / 1000
+        self.all_threads = all_threads
+        self.stacks = collections.Counter()
+        self.samples, self.seconds = 0, 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.target = threading.get_ident()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._t0
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = None
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if tid == self.target:
+                    self.stacks[tuple(_stack(frame))] += 1
+                elif self.all_threads and not _idle(frame):
+                    if names is None:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    self.stacks[(f"[{names.get(tid, tid)}]", *_stack(frame))] += 1
+            self.samples += 1
+
+# ── collapsed stacks / flame graph ──────────────────────────────────
+def folded(stacks) -> str:
+    """Brendan Gregg's collapsed format: 'a;b;c <count>' per line."""
+    return "".join(f"{';'.join(s)} {n}\n" for s, n in sorted(stacks.items()))
+
+def load(path: str) -> collections.Counter:
+    out = collections.Counter()
+    with open(path) as fh:
+        for line in fh:
+            stack, _, n = line.rstrip("\n").rpartition(" ")
+            if stack:
+                out[tuple(stack.split(";"))] += int(n)
+    return out
+
+def _color(name: str) -> str:
+    h = zlib.crc32(name.encode())
+    return f"rgb({205 + h % 50},{(h >> 8) % 180 + 50},{(h >> 16) % 55})"
+
+def flamegraph(stacks, title="", width=1200, row=16) -> str:
+    """Self-contained SVG flame graph (hover a frame for samples / %)."""
+    root = [0, {}]
+    for s, n in stacks.items():
+        node = root
+        node[0] += n
+        for f in s:
+            node = node[1].setdefault(f, [0, {}])
+            node[0] += n
+    total = max(root[0], 1)
+    depth = max((len(s) for s in stacks), default=0)
+    height, scale = (depth + 1) * row + 40, (width - 20) / total
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'font-family="monospace" font-size="11">',
+           f'<text x="10" y="20" font-size="14">{html.escape(title)}</text>']
+
+    def walk(children, x, d):
+        for name, (n, kids) in sorted(children.items()):
+            w = n * scale
+            if w >= 0.5:
+                y = height - (d + 1) * row - 4
+                tip = f"{name} – {n} samples ({100 * n / total:.1f}%)"
+                out.append(f'<g><title>{html.escape(tip)}</title>'
+                           f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" '
+                           f'fill="{_color(name)}"/>')
+                if w > 25:
+                    text = name if len(name) * 7 < w - 4 else name[:max(0, int(w / 7) - 2)] + ".."
+                    out.append(f'<text x="{x + 3:.1f}" y="{y + row - 4}">{html.escape(text)}</text>')
+                out.append("</g>")
+                walk(kids, x, d + 1)
+            x += w
+
+    walk(root[1], 10, 0)
+    out.append("</svg>")
+    return "\n".join(out)
+
+# ── per-stage runs ──────────────────────────────────────────────────
+def _dir(stage: str) -> str:
+    return f'{CFG["paths"]["reports"]}profiles/{stage}/'
+
+def runs(stage: str) -> list:
+    """Collapsed-stack files of a stage, oldest → newest."""
+    return sorted(glob.glob(f"{_dir(stage)}*.folded"))
+
+def save(stage: str, s: Sampler, keep=None) -> str:
+    """Write <stamp>.folded + .svg for one run, drop all but the newest `keep`."""
+    d = _dir(stage)
+    os.makedirs(d, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+    base = f"{d}{stamp}"
+    with open(base + ".folded", "w") as fh:
+        fh.write(folded(s.stacks))
+    with open(base + ".svg", "w") as fh:
+        fh.write(flamegraph(s.stacks, f"{stage}  {stamp}  {s.seconds:.2f}s  "
+                                      f"{s.samples} samples @ {s.interval * 1000:g} ms"))
+    for old in runs(stage)[:-(keep or _cfg("keep", KEEP))]:
+        for p in (old, old[:-len(".folded")] + ".svg"):
+            if os.path.exists(p):
+                os.remove(p)
+    return base + ".folded"
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Profile the block as one run of `name` when profiling is enabled, else no-op."""
+    if not enabled():
+        yield
+        return
+    s = Sampler(_cfg("interval_ms", INTERVAL_MS), _cfg("all_threads", True))
+    try:
+        with s:
+            yield
+    finally:
+        if s.samples:
+            log(f"profile {name}: {s.samples} samples → {save(name, s)}")
+
+# ── hot-function diff ───────────────────────────────────────────────
+def hot(stacks) -> dict:
+    """{function: (inclusive share, self share)} – a frame counts once per stack."""
+    total = sum(stacks.values()) or 1
+    incl, self_ = collections.Counter(), collections.Counter()
+    for s, n in stacks.items():
+        for f in set(s):
+            incl[f] += n
+        if s:
+            self_[s[-1]] += n
+    return {f: (incl[f] / total, self_[f] / total) for f in incl}
+
+def diff(a, b, top=15) -> list:
+    """[(function, incl_a, incl_b, self_a, self_b)] ordered by largest inclusive-share change."""
+    ha, hb = hot(load(a) if isinstance(a, str) else a), hot(load(b) if isinstance(b, str) else b)
+    rows = []
+    for f in set(ha) | set(hb):
+        (ia, sa), (ib, sb) = ha.get(f, (0.0, 0.0)), hb.get(f, (0.0, 0.0))
+        rows.append((f, ia, ib, sa, sb))
+    rows.sort(key=lambda r: (-abs(r[2] - r[1]), -abs(r[4] - r[3]), r[0]))
+    return rows[:top]
+
+def _print_diff(a: str, b: str, top: int):
+    print(f"A = {a}\nB = {b}")
+    print(f"{'incl A':>7} {'incl B':>7} {'Δ':>7}  {'self A':>7} {'self B':>7}  function")
+    for f, ia, ib, sa, sb in diff(a, b, top):
+        print(f"{ia:7.1%} {ib:7.1%} {ib - ia:+7.1%}  {sa:7.1%} {sb:7.1%}  {f}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="profiled stages and their runs")
+    d = sub.add_parser("diff", help="hot-function shift between two runs")
+    d.add_argument("target", nargs="+", help="<stage> (newest two runs) or A.folded B.folded")
+    d.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+    if args.cmd == "list":
+        for p in sorted(glob.glob(f'{CFG["paths"]["reports"]}profiles/*/')):
+            name = os.path.basename(p.rstrip("/"))
+            rs = runs(name)
+            print(f"{name:<14} {len(rs)} runs" + (f", newest {os.path.basename(rs[-1])}" if rs else ""))
+    else:
+        if len(args.target) == 1:
+            rs = runs(args.target[0])
+            if len(rs) < 2:
+                sys.exit(f"{args.target[0]}: need two profiled runs, have {len(rs)}")
+            a, b = rs[-2:]
+        else:
+            a, b = args.target[:2]
+        _print_diff(a, b, args.top)
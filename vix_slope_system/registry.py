@@ -0,0 +1,216 @@
+"""
+registry.py – versioned model artifacts with an in-process cache.
+
+Layout (under paths.model):
+
+    registry/<name>/v0003.pkl      joblib bundle, e.g. {"scaler", "model"}
+    registry/<name>/v0003.json     manifest: version, sha256, rows, features …
+    registry/<name>/CURRENT.json   copy of the live manifest (the pointer)
+
+publish() writes the pickle to a temp file, hashes it, os.replace()s it
+into its versioned name and only then swaps CURRENT.json – a reader can
+never see a half-written artifact.  load() stats CURRENT.json and returns
+the already-unpickled bundle until a new version is published, so the
+live scorers never touch joblib on the hot path.
+
+Names with no registry entry fall back to the legacy flat pickles
+(models/<name>.pkl, or models/<name>_<part>.pkl for a bundle such as
+spy_reg_lo / spy_reg_hi).
+
+Every bundle is also exported as a lite artifact (vNNNN.lite.json, or
+models/<name>.lite.json next to legacy pickles): the scaler's mean / scale
+and LightGBM's text model, scored by boosters.TreeModel with numpy only.
+load_lite() is what a cold `cli.py predict` / `trade` uses – it never
+imports joblib, sklearn or lightgbm.  Lite files are written on publish and
+backfilled the first time load() unpickles a version that lacks one.
+"""
+import glob, os, json
+from util import CFG, log
+from dataset_io import _tmp_near, file_sig, read_state, write_state, sha256_file
+
+_LOADED = {}          # name → (sig, bundle, manifest)
+_LITE   = {}          # name → (sig, lite bundle, manifest)
+
+# ── paths ───────────────────────────────────────────────────────────
+def _dir(name: str) -> str:
+    return os.path.join(CFG["paths"]["model"], "registry", name)
+
+def _pointer(name: str) -> str:
+    return os.path.join(_dir(name), "CURRENT.json")
+
+def current(name: str) -> dict:
+    """Manifest of the live version; {} if nothing is published."""
+    return read_state(_pointer(name))
+
+def versions(name: str) -> list:
+    return sorted(int(os.path.basename(p)[1:5])
+                  for p in glob.glob(os.path.join(_dir(name), "v[0-9][0-9][0-9][0-9].pkl")))
+
+# ── write side (train_backtest) ─────────────────────────────────────
+def publish(name: str, bundle: dict, rows=None, features=None, **extra) -> dict:
+    """
+    Store bundle as the next version of name and make it current.
+    Re-publishing byte-identical content keeps the live version (only its
+    manifest metadata is refreshed).
+    """
+    import joblib
+    d = _dir(name)
+    tmp = _tmp_near(os.path.join(d, "x"), ".pkl")
+    try:
+        joblib.dump(bundle, tmp)
+        sha = sha256_file(tmp)
+        cur = current(name)
+        if cur.get("sha256") == sha:
+            os.remove(tmp)
+            # same bytes: keep the version, refresh its metadata (fingerprint …)
+            meta = {**cur, "rows": rows,
+                    "features": list(features) if features is not None else None, **extra}
+            if meta != cur:
+                write_state(os.path.join(d, f"v{cur['version']:04d}.json"), meta)
+                write_state(_pointer(name), meta)
+            log(f"registry {name}: unchanged (v{cur['version']:04d})")
+            return meta
+        version = max(versions(name) + [cur.get("version", 0)]) + 1
+        dst = os.path.join(d, f"v{version:04d}.pkl")
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    meta = {"name": name, "version": version, "file": os.path.basename(dst),
+            "sha256": sha, "rows": rows,
+            "features": list(features) if features is not None else None,
+            "parts": sorted(bundle), **extra}
+    write_state(os.path.join(d, f"v{version:04d}.json"), meta)
+    export_lite(name, bundle, meta)         # before the swap: never a pointer without it
+    write_state(_pointer(name), meta)       # the swap readers key on
+    prune(name)
+    log(f"registry {name}: published v{version:04d} ({sha[:10]}, {rows} rows)")
+    return meta
+
+def prune(name: str, keep=None) -> None:
+    """Drop all but the newest `keep` versions (CFG registry.keep, default 5)."""
+    keep = max(2, keep or CFG.get("registry", {}).get("keep", 5))
+    live = current(name).get("version")
+    for v in versions(name)[:-keep]:
+        if v == live:
+            continue
+        for ext in (".pkl", ".json", ".lite.json"):
+            p = os.path.join(_dir(name), f"v{v:04d}{ext}")
+            if os.path.exists(p):
+                os.remove(p)
+
+# ── read side (live_predict / live_trade_intraday) ──────────────────
+def _legacy_files(name: str) -> list:
+    base = os.path.join(CFG["paths"]["model"], name)
+    if os.path.exists(base + ".pkl"):
+        return [base + ".pkl"]
+    return sorted(glob.glob(base + "_*.pkl"))
+
+def _load_legacy(name: str, files: list):
+    """(scaler, model) pickles → one bundle; the pair shares a single scaler."""
+    import joblib
+    base = os.path.join(CFG["paths"]["model"], name)
+    bundle = {}
+    for p in files:
+        scaler, model = joblib.load(p)
+        part = "model" if p == base + ".pkl" else p[len(base) + 1:-4]
+        bundle.setdefault("scaler", scaler)
+        bundle[part] = model
+    return bundle, {"name": name, "version": 0, "file": [os.path.basename(p) for p in files]}
+
+def load(name: str):
+    """
+    (bundle, manifest) for the current version of name.  Unpickles only
+    when CURRENT.json changed since the last call; otherwise a dict lookup
+    plus one stat().
+    """
+    ptr = _pointer(name)
+    sig = file_sig(ptr)
+    if sig is None:                                     # never published
+        files = _legacy_files(name)
+        if not files:
+            raise FileNotFoundError(f"no model registered or on disk for {name!r}")
+        sig = ["legacy"] + [file_sig(p) for p in files]
+    hit = _LOADED.get(name)
+    if hit is not None and hit[0] == sig:
+        return hit[1], hit[2]
+
+    if sig[0] == "legacy":
+        bundle, meta = _load_legacy(name, files)
+    else:
+        meta = read_state(ptr)
+        if hit is not None and hit[2].get("sha256") == meta.get("sha256"):
+            _LOADED[name] = (sig, hit[1], meta)     # pointer rewritten, same bytes
+            return hit[1], meta
+        path = os.path.join(_dir(name), meta["file"])
+        if sha256_file(path) != meta["sha256"]:
+            raise ValueError(f"registry {name} v{meta['version']}: sha256 mismatch")
+        import joblib
+        bundle = joblib.load(path)
+        log(f"registry {name}: loaded v{meta['version']:04d}")
+    _LOADED[name] = (sig, bundle, meta)
+    if _lite_source(name, meta, sig) != read_state(_lite_path(name, meta)).get("source"):
+        try:
+            export_lite(name, bundle, meta, sig)
+        except OSError as e:          # read-only / full disk – the bundle is still good
+            log(f"registry {name}: lite backfill failed ({e})", 30)
+    return bundle, meta
+
+# ── lite artifacts (numpy-only scoring) ─────────────────────────────
+def _lite_path(name: str, meta: dict) -> str:
+    if meta.get("version"):
+        return os.path.join(_dir(name), f"v{meta['version']:04d}.lite.json")
+    return os.path.join(CFG["paths"]["model"], f"{name}.lite.json")
+
+def _lite_source(name: str, meta: dict, sig=None):
+    """What a lite file was derived from: the version's sha256, or the legacy pickles' sigs."""
+    if meta.get("version"):
+        return meta["sha256"]
+    return sig if sig is not None else \
+        ["legacy"] + [file_sig(p) for p in _legacy_files(name)]
+
+def export_lite(name: str, bundle: dict, meta: dict, sig=None) -> bool:
+    """Write the lite artifact for bundle; False (logged) if it can't be represented."""
+    from boosters import lite_spec
+    try:
+        spec = lite_spec(bundle)
+    except (ValueError, KeyError) as e:
+        log(f"registry {name}: no lite export ({e})", 30)
+        return False
+    write_state(_lite_path(name, meta), {"source": _lite_source(name, meta, sig),
+                                         "features": meta.get("features"), **spec})
+    return True
+
+def load_lite(name: str):
+    """
+    (lite bundle, manifest) for the current version of name, or None when
+    there is no up-to-date lite artifact (caller falls back to load()).
+    Costs two small JSON reads on a cold start and one stat() after that.
+    """
+    from boosters import lite_bundle
+    ptr = _pointer(name)
+    sig = file_sig(ptr)
+    if sig is None:
+        files = _legacy_files(name)
+        if not files:
+            return None
+        sig, meta = ["legacy"] + [file_sig(p) for p in files], {"name": name, "version": 0}
+    else:
+        meta = None
+    hit = _LITE.get(name)
+    if hit is not None and hit[0] == sig:
+        return hit[1], hit[2]
+    meta = meta or read_state(ptr)
+    path = _lite_path(name, meta)
+    try:
+        with open(path) as fh:
+            spec = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+    if spec.get("source") != _lite_source(name, meta, sig):
+        return None                                        # stale: pickles changed since export
+    meta = {**meta, "features": spec.get("features") or meta.get("features")}
+    bundle = lite_bundle(spec)
+    _LITE[name] = (sig, bundle, meta)
+    return bundle, meta
@@ -0,0 +1,98 @@
+"""
+shm.py – zero-copy feature matrices for pool workers.
+
+pmap used to pickle its payload (the cleaned feature matrix + labels) into
+every worker, so each process held its own copy and startup was dominated
+by serialisation.  share() walks a payload (tuples / lists / dicts) and
+writes every numeric ndarray once to data_ready/.shm/*.npy, replacing it
+with a tiny ArrayRef; workers resolve() the refs with np.load(mmap_mode="r")
+and read straight from the page cache – resident memory stays flat as the
+worker count grows.
+
+Files are reference-counted per array: share() acquires, release() drops,
+the last release unlinks the file; anything left at exit is removed.
+"""
+import atexit, itertools, os, weakref
+from typing import NamedTuple
+import numpy as np
+from util import CFG
+
+MIN_BYTES = 1 << 16       # smaller arrays are cheaper to pickle than to map
+
+class ArrayRef(NamedTuple):
+    path:  str
+    shape: tuple
+    dtype: str
+
+_REFS = {}                # id(array) → [ArrayRef, refcount, weakref(array)]
+_SEQ  = itertools.count()
+
+def _dir() -> str:
+    d = os.path.join(CFG["paths"].get("ready", "."), ".shm")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def matrix(df, feats, labels=(), dtype=np.float32):
+    """
+    Cleaned training matrix: rows with finite features only, features as one
+    C-contiguous `dtype` array, each label as its own vector → (X, {label: y}).
+    """
+    X = df[feats].to_numpy(dtype=np.float64)
+    ok = np.isfinite(X).all(axis=1)
+    return (np.ascontiguousarray(X[ok], dtype=dtype),
+            {c: np.ascontiguousarray(df[c].to_numpy()[ok], dtype=dtype) for c in labels})
+
+# ── owner side ──────────────────────────────────────────────────────
+def _export(arr: np.ndarray, refs: list) -> ArrayRef:
+    hit = _REFS.get(id(arr))
+    if hit is not None and hit[2]() is arr:
+        hit[1] += 1
+    else:
+        path = os.path.join(_dir(), f"{os.getpid()}-{next(_SEQ)}.npy")
+        np.save(path, arr, allow_pickle=False)
+        hit = _REFS[id(arr)] = [ArrayRef(path, arr.shape, arr.dtype.str), 1, weakref.ref(arr)]
+    refs.append(hit[0])
+    return hit[0]
+
+def share(obj, refs=None):
+    """(obj with large numeric arrays swapped for ArrayRefs, [acquired refs])."""
+    refs = [] if refs is None else refs
+    if isinstance(obj, np.ndarray) and not obj.dtype.hasobject and obj.nbytes >= MIN_BYTES:
+        return _export(obj, refs), refs
+    if isinstance(obj, (tuple, list)):
+        return type(obj)(share(o, refs)[0] for o in obj), refs
+    if isinstance(obj, dict):
+        return {k: share(v, refs)[0] for k, v in obj.items()}, refs
+    return obj, refs
+
+def release(refs) -> None:
+    """Drop one reference per ArrayRef; the last one unlinks the file."""
+    for ref in refs:
+        for key, hit in list(_REFS.items()):
+            if hit[0] == ref:
+                hit[1] -= 1
+                if hit[1] <= 0:
+                    del _REFS[key]
+                    if os.path.exists(ref.path):
+                        os.remove(ref.path)
+                break
+
+@atexit.register
+def _cleanup():
+    mine = f"{os.getpid()}-"              # forked workers inherit _REFS – leave those
+    for hit in list(_REFS.values()):
+        p = hit[0].path
+        if os.path.basename(p).startswith(mine) and os.path.exists(p):
+            os.remove(p)
+    _REFS.clear()
+
+# ── worker side ─────────────────────────────────────────────────────
+def resolve(obj):
+    """Inverse of share(): ArrayRefs → read-only memmaps (no copy)."""
+    if isinstance(obj, ArrayRef):
+        return np.load(obj.path, mmap_mode="r")
+    if isinstance(obj, (tuple, list)):
+        return type(obj)(resolve(o) for o in obj)
+    if isinstance(obj, dict):
+        return {k: resolve(v) for k, v in obj.items()}
+    return obj
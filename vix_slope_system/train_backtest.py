@@ -1,136 +1,246 @@
 """
 train_backtest.py
 ───────────────────────────────────────────────────────────────────────────────
-1. Train two daily classifiers:
+1. Train the daily direction classifiers (DAILY):
      • 5-day direction  (TARGET_5D)
      • 10-day direction (TARGET_10D)
 
-2. Train intraday 0.20 / 0.80 quantile regressors on minute features.
+2. Train intraday quantile regressors (QUANTILES: 0.20 / 0.80) on minute
+   features.
 
-3. Run a full walk-forward back-test (daily) and append win-rate to reports.
+3. Run a walk-forward back-test (daily, refit cadence from CFG["walkforward"])
+   and append win-rate to reports.
 
-All outputs go into models/ and reports/.  Any ±Inf / NaN rows are dropped
-before fitting.  Progress is shown with tqdm so auto_loop logs % complete.
+train_all() reads each dataset once, scales and bins it into one LightGBM
+Dataset, and fits every target / CV fold / quantile on subsets of that
+binning (optionally on a thread pool – LightGBM releases the GIL).  Adding
+a horizon or a quantile adds boosting rounds, not another read + rebin.
+
+Each stage (daily / intraday / walkforward) is fingerprinted – dataset
+content hash, feature list, hyper-parameters, code version – and skipped
+when the fingerprint matches the published artifact (models/
+fingerprints.json + the registry manifest); --force retrains anyway.
+
+Models are published to models/registry/ (registry.py), logs to reports/.
+Any ±Inf / NaN rows are dropped before fitting.
 """
-from util import CFG, log
-log(f"=== ENTER {__file__} ===")
+from util import CFG, log, span
 
 # ── imports ─────────────────────────────────────────────────────────
-import os, joblib, numpy as np, pandas as pd
+import argparse, hashlib, json, os, time, numpy as np, pandas as pd, lightgbm as lgb
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import roc_auc_score
-from lightgbm import LGBMClassifier, LGBMRegressor
-from tqdm import tqdm
+from walkforward import run_walkforward, fold_summary
+from parallel import pool, resolve_workers, lgbm_threads, STABLE
+from boosters import BoosterClassifier, BoosterRegressor
+import shm
+from dataset_io import (read_ready, write_ready, read_state, write_state,
+                        content_hash, parquet_columns)
+import registry
+
+DAILY     = {"daily_clf_5d": "TARGET_5D", "daily_clf_10d": "TARGET_10D"}
+QUANTILES = {"lo": 0.2, "hi": 0.8}
+NON_FEATS = ("SPY", "QQQ", "TARGET_5D", "TARGET_10D")
+# LGBMClassifier / LGBMRegressor defaults, as the models were fitted before
+ROUNDS     = 100
+CLF_PARAMS = {"objective": "binary", "num_leaves": 31, "seed": 42, "verbosity": -1}
+REG_PARAMS = {"objective": "quantile", "num_leaves": 31, "seed": 42, "verbosity": -1}
 
 # ── helper funcs ────────────────────────────────────────────────────
 def clean(df: pd.DataFrame, cols_keep) -> pd.DataFrame:
     return (df.replace([np.inf, -np.inf], np.nan)
               .dropna(subset=cols_keep))
 
-def adaptive_tscv(df, test_days=252, max_splits=6):
-    n = len(df)
+def adaptive_tscv_idx(n, test_days=252, max_splits=6):
+    """Positional (train, test) index arrays behind adaptive_tscv."""
     possible = max(0, (n - test_days) // test_days)
     splits   = min(max_splits, possible)
     if splits >= 2:
         tscv = TimeSeriesSplit(n_splits=splits, test_size=test_days)
-        for tr, te in tscv.split(df):
-            yield df.iloc[tr], df.iloc[te]
+        yield from tscv.split(np.arange(n))
     else:
-        train, test = df.iloc[: n-test_days], df.iloc[n-test_days :]
-        yield train, test
+        yield np.arange(n-test_days), np.arange(n-test_days, n)
+
+def adaptive_tscv(df, test_days=252, max_splits=6):
+    for tr, te in adaptive_tscv_idx(len(df), test_days, max_splits):
+        yield df.iloc[tr], df.iloc[te]
 
 def scale_fit(X):
     scaler = StandardScaler().fit(X)
     return scaler, scaler.transform(X)
 
+# ── fingerprints ────────────────────────────────────────────────────
+CODE = ("train_backtest.py", "walkforward.py", "boosters.py")
+
+@lru_cache(None)
+def code_version() -> str:
+    """Hash of the training code + LightGBM version – a code change retrains."""
+    h = hashlib.sha256(lgb.__version__.encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for f in CODE:
+        with open(os.path.join(here, f), "rb") as fh:
+            h.update(fh.read())
+    return h.hexdigest()[:16]
+
+def fingerprint(path, feats, params, memo) -> str | None:
+    """Dataset content + feature list + params + code → short hex id."""
+    data = content_hash(path, memo)
+    if data is None:
+        return None
+    blob = json.dumps({"data": data, "features": list(feats), "params": params,
+                       "code": code_version()}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+def _fp_path():
+    return f'{CFG["paths"]["model"]}fingerprints.json'
+
+def append_csv(path, rows):
+    if rows:
+        pd.DataFrame(rows).to_csv(path, mode="a", header=not os.path.exists(path),
+                                  index=False)
+
+# ── shared binning ──────────────────────────────────────────────────
+def binned(X):
+    """Scale once and bin once → (scaler, Xs, Dataset); models train on views."""
+    scaler, Xs = scale_fit(X)
+    ds = lgb.Dataset(Xs, label=np.zeros(len(Xs)), free_raw_data=False,
+                     params={"verbosity": -1}).construct()
+    return scaler, Xs, ds
+
+def view(ds, rows, label):
+    """Rows of the pre-binned ds with their own label – no re-binning."""
+    sub = ds.subset(np.asarray(rows, dtype=np.int32)).construct()
+    sub.set_label(label)          # after construct(): it copies the parent's label
+    return sub
+
+def fit(params, ds, threads=None):
+    p = {**STABLE, **{k: v for k, v in params.items() if k != "num_boost_round"}}
+    if threads is not None:
+        p["num_threads"] = threads
+    with span("fit"):
+        return lgb.train(p, ds, num_boost_round=params.get("num_boost_round", ROUNDS))
+
+def params_for(out_name):
+    """LightGBM params of the live model (promoted by search()), else CLF_PARAMS."""
+    return registry.current(out_name).get("params") or CLF_PARAMS
+
+def fit_all(jobs, workers=None):
+    """[(params, Dataset)] → boosters in job order, optionally on a thread pool."""
+    workers = min(resolve_workers(workers), max(1, len(jobs)))
+    if workers <= 1:
+        return [fit(p, d) for p, d in jobs]
+    threads = lgbm_threads(workers)
+    with ThreadPoolExecutor(workers) as ex:
+        return list(ex.map(lambda j: fit(*j, threads), jobs))
+
+def load_eod():
+    """dataset_eod read once per run → (df, feature columns)."""
+    fe_path = f'{CFG["paths"]["ready"]}dataset_eod.parquet'
+    df = read_ready(fe_path)
+    # ensure TARGET_10D exists – add once to feature file if missing
+    if "TARGET_10D" not in df.columns:
+        df["TARGET_10D"] = np.sign(df["SPY"].shift(-10)/df["SPY"]-1).replace(0,np.nan)
+        write_ready(df, fe_path, exact=[t.upper() for t in CFG["symbols"]])
+    return df, [c for c in df.columns if c not in NON_FEATS]
+
 # ── part 1 – daily classifiers ─────────────────────────────────────
-def train_daily(target_col, out_name):
-    df = pd.read_parquet(f'{CFG["paths"]["ready"]}dataset_eod.parquet')
-    feats = [c for c in df.columns if c not in ("SPY","QQQ",
-                                               "TARGET_5D","TARGET_10D")]
-    df = clean(df, feats + [target_col])
+def train_daily_all(df, feats, targets=DAILY, workers=None, params=None, **extra) -> list:
+    """
+    Every target in {out_name: target_col} – CV folds and final fit – off one
+    binning of the feature-clean rows.  params = {out_name: LightGBM params}
+    (default params_for).  Returns the metrics_log rows; extra is stored in
+    each registry manifest (e.g. fingerprint=).
+    """
+    params = {n: (params or {}).get(n) or params_for(n) for n in targets}
+    df = clean(df, feats)
     if df.empty:
-        log(f"Daily ({out_name}): no data after cleaning – abort", level=40)
-        return
+        log("Daily: no data after cleaning – abort", 40)
+        return []
+    scaler, Xs, ds = binned(df[feats].to_numpy())
 
-    X, y = df[feats], df[target_col]
-    scaler, Xs = scale_fit(X)
+    plan, jobs = [], []
+    for out_name, target_col in targets.items():
+        y = df[target_col].to_numpy()
+        rows = np.flatnonzero(~np.isnan(y))
+        if not len(rows):
+            log(f"Daily ({out_name}): no data after cleaning – abort", 40)
+            continue
+        lab = (y[rows] > 0).astype(float)
+        folds = list(adaptive_tscv_idx(len(rows)))
+        jobs += [(params[out_name], view(ds, rows[tr], lab[tr])) for tr, _ in folds]
+        jobs.append((params[out_name], view(ds, rows, lab)))
+        plan.append((out_name, target_col, rows, lab, folds))
 
-    model = LGBMClassifier(num_leaves=31, random_state=42, verbosity=-1)
-    scores = []
-    for tr, te in adaptive_tscv(df):
-        Xtr, Xte = scaler.transform(tr[feats]), scaler.transform(te[feats])
-        ytr, yte = tr[target_col], te[target_col]
-        model.fit(Xtr, ytr)
-        p = model.predict_proba(Xte)[:,1]
-        scores.append(roc_auc_score(yte, p))
-    log(f"{out_name} AUCs: {np.round(scores,3).tolist()}  mean={np.mean(scores):.3f}")
-
-    model.fit(Xs, y)
-    joblib.dump((scaler, model), f'{CFG["paths"]["model"]}{out_name}.pkl')
-    log(f"Saved → models/{out_name}.pkl")
-
-    # append metrics
-    metr = f'{CFG["paths"]["reports"]}metrics_log.csv'
-    pd.DataFrame([{
-        "timestamp": pd.Timestamp.utcnow(),
-        "model": out_name,
-        "rows": len(df),
-        "auc_mean": np.mean(scores)
-    }]).to_csv(metr, mode="a", header=not os.path.exists(metr), index=False)
+    boosters = iter(fit_all(jobs, workers))
+    metrics = []
+    for out_name, target_col, rows, lab, folds in plan:
+        scores = [roc_auc_score(lab[te], next(boosters).predict(Xs[rows[te]]))
+                  for _, te in folds]
+        log(f"{out_name} AUCs: {np.round(scores,3).tolist()}  mean={np.mean(scores):.3f}")
+        registry.publish(out_name, {"scaler": scaler, "model": BoosterClassifier(next(boosters))},
+                         rows=len(rows), features=feats, target=target_col,
+                         auc_mean=float(np.mean(scores)), params=params[out_name],
+                         **extra)
+        metrics.append({"timestamp": pd.Timestamp.utcnow(), "model": out_name,
+                        "rows": len(rows), "auc_mean": np.mean(scores)})
+    return metrics
+
+def train_daily(target_col, out_name, workers=None):
+    """Single-target wrapper around train_daily_all (reads the dataset itself)."""
+    df, feats = load_eod()
+    append_csv(f'{CFG["paths"]["reports"]}metrics_log.csv',
+               train_daily_all(df, feats, {out_name: target_col}, workers))
 
 # ── part 2 – intraday quantile regressors ──────────────────────────
-def train_intraday(symbol="SPY", horizon=10):
+def train_intraday(symbol="SPY", horizon=10, quantiles=QUANTILES, workers=None, **extra):
     path = f'{CFG["paths"]["ready"]}dataset_intraday_{symbol}.parquet'
     if not os.path.exists(path):
-        log("Intraday dataset missing – skip regs", level=30)
-        return
-    df = pd.read_parquet(path)
+        log("Intraday dataset missing – skip regs", 30)
+        return False
+    df = read_ready(path)
     feats = [c for c in df.columns if c not in ("RET_FWD", symbol)]
     df = clean(df, feats + ["RET_FWD"])
     if df.empty:
-        log("Intraday: no data after cleaning – abort", level=40)
-        return
+        log("Intraday: no data after cleaning – abort", 40)
+        return False
 
-    X, y = df[feats], df["RET_FWD"]
-    scaler, Xs = scale_fit(X)
-    regs = {
-        "lo": LGBMRegressor(objective="quantile", alpha=0.2,
-                            random_state=42, verbosity=-1),
-        "hi": LGBMRegressor(objective="quantile", alpha=0.8,
-                            random_state=42, verbosity=-1)
-    }
-    for tag, reg in regs.items():
-        reg.fit(Xs, y)
-        joblib.dump((scaler, reg),
-            f'{CFG["paths"]["model"]}{symbol.lower()}_reg_{tag}.pkl')
-        log(f"Saved intraday reg ({tag})")
+    scaler, Xs, ds = binned(df[feats].to_numpy())
+    y, rows = df["RET_FWD"].to_numpy(), np.arange(len(df))
+    # every quantile shares the matrix, the binning and the scaler
+    boosters = fit_all([({**REG_PARAMS, "alpha": a}, view(ds, rows, y))
+                        for a in quantiles.values()], workers)
+    regs = {tag: BoosterRegressor(b) for tag, b in zip(quantiles, boosters)}
+    # one bundle → the quantile pair shares a single scaler and flips together
+    registry.publish(f"{symbol.lower()}_reg", {"scaler": scaler, **regs},
+                     rows=len(df), features=feats, target="RET_FWD",
+                     horizon=horizon, **extra)
+    return True
 
 # ── part 3 – full walk-forward back-test for win-rate ───────────────
-def walkforward_backtest():
-    df = pd.read_parquet(f'{CFG["paths"]["ready"]}dataset_eod.parquet')
-    feats = [c for c in df.columns if c not in ("SPY","QQQ",
-                                               "TARGET_5D","TARGET_10D")]
+def walkforward_backtest(refit=None, workers=None, eod=None):
+    """
+    refit   = bars between model refits (1/"daily", "weekly", N, "drift");
+              defaults to CFG['walkforward']['refit'].  1 reproduces the
+              legacy refit-every-day numbers.
+    workers = process-pool size for the folds (CFG['parallel']['workers']);
+              results are merged in order, identical to a serial run.
+    eod     = (df, feats) from load_eod() to skip re-reading the dataset.
+    """
+    df, feats = eod or load_eod()
     df = clean(df, feats + ["TARGET_5D"])
     if len(df) < 300:
-        log("WF back-test: not enough rows", level=30); return
-
-    wins=trades=0
-    start=252
-    for i in tqdm(range(start, len(df)-5),
-                  desc="Walk-forward", ncols=70, ascii=True):
-        train, test = df.iloc[:i], df.iloc[i:i+1]
-        scaler = StandardScaler().fit(train[feats])
-        model  = LGBMClassifier(num_leaves=31, verbosity=-1).fit(
-                    scaler.transform(train[feats]), train["TARGET_5D"])
-        prob_up = model.predict_proba(scaler.transform(test[feats]))[0,1]
-        pred = 1 if prob_up>0.6 else -1 if prob_up<0.4 else 0
-        real = int(test["TARGET_5D"].iloc[0])
-        if pred!=0:
-            trades += 1
-            if pred==real: wins += 1
-    win_rate = wins/trades if trades else 0
+        log("WF back-test: not enough rows", 30); return
+
+    wf  = CFG.get("walkforward", {})
+    res = run_walkforward(df, feats, "TARGET_5D",
+                          refit=refit if refit is not None else wf.get("refit", 1),
+                          drift_z=wf.get("drift_z", 0.5),
+                          max_age=wf.get("max_age", 21),
+                          workers=workers)
+    wins, trades, win_rate = res["wins"], res["trades"], res["win_rate"]
     wl = f'{CFG["paths"]["reports"]}winrate_log.csv'
     pd.DataFrame([{
         "timestamp": pd.Timestamp.utcnow(),
@@ -140,20 +250,213 @@ def walkforward_backtest():
         "win_rate": win_rate
     }]).to_csv(wl, mode="a", header=not os.path.exists(wl), index=False)
     log(f"Walk-forward win-rate {win_rate:.2%} ({wins}/{trades})")
+    log(f"Walk-forward {fold_summary(res)}")
+    return res
+
+# ── part 4 – hyper-parameter search (successive halving) ────────────
+SPACE = {"num_leaves":        [7, 15, 31, 63],
+         "learning_rate":     [0.03, 0.05, 0.1],
+         "min_child_samples": [10, 20, 40],
+         "feature_fraction":  [0.7, 1.0],
+         "lambda_l2":         [0.0, 1.0],
+         "num_boost_round":   [100, 200]}
+
+def sample_configs(n, space, seed, base=CLF_PARAMS) -> list:
+    """n distinct random draws from the grid `space`, each on top of base."""
+    rng, out, seen = np.random.default_rng(seed), [], set()
+    total = int(np.prod([len(v) for v in space.values()]))
+    while len(out) < min(n, total):
+        draw = {k: v[rng.integers(len(v))] for k, v in space.items()}
+        key = json.dumps(draw, sort_keys=True, default=str)
+        if key not in seen:
+            seen.add(key)
+            out.append({**base, **{k: (v.item() if hasattr(v, "item") else v)
+                                   for k, v in draw.items()}})
+    return out
+
+def rung_budgets(n_folds, eta) -> list:
+    """Folds evaluated per rung: 1, eta, eta², … capped at – and ending on – n_folds."""
+    b = [min(n_folds, eta ** r) for r in range(n_folds) if eta ** r < n_folds]
+    return b + [n_folds]
+
+def search_auc(payload, task, threads=None):
+    """AUC of one (params, fold) pair – module-level for parallel.pool workers."""
+    Xs, lab, folds = payload
+    params, f = task
+    tr, te = folds[f]
+    ds = lgb.Dataset(Xs[tr], lab[tr], params={"verbosity": -1})
+    return roc_auc_score(lab[te], fit(params, ds, threads).predict(Xs[te]))
+
+def search(target_col="TARGET_5D", out_name="daily_clf_5d", workers=None,
+           budget_s=None, n=None, eta=None, seed=None):
+    """
+    Successive halving over LightGBM params with adaptive_tscv folds (newest
+    first) as the budget: every candidate is scored on 1 fold, the best 1/eta
+    go on to eta folds, … until the survivors are scored on all of them.
+    The live model's params (the incumbent) always run the full ladder.
+
+    Progress is checkpointed to models/search_<out_name>.json after every
+    batch; a call that runs past budget_s seconds returns None and the next
+    call resumes.  A new dataset / space restarts the search.  When done,
+    the winner is trained and published only if its mean AUC beats the
+    incumbent's on the same folds.  Returns the checkpoint's result.
+    """
+    cfg  = CFG.get("search", {})
+    n    = n or cfg.get("candidates", 27)
+    eta  = eta or cfg.get("eta", 3)
+    seed = cfg.get("seed", 0) if seed is None else seed
+    space = cfg.get("space", SPACE)
+    t0 = time.perf_counter()
+
+    df, feats = eod = load_eod()
+    # float32 matrix + labels: pool workers attach to it zero-copy (shm.py)
+    X, y  = shm.matrix(clean(df, feats + [target_col]), feats, [target_col])
+    _, Xs = scale_fit(X)
+    lab   = (y[target_col] > 0).astype(np.float32)
+    folds = list(adaptive_tscv_idx(len(Xs)))[::-1]     # rows clean() kept, not len(df)
+    budgets = rung_budgets(len(folds), eta)
+
+    ck_path = f'{CFG["paths"]["model"]}search_{out_name}.json'
+    memo = read_state(_fp_path())
+    incumbent = params_for(out_name)
+    sid = fingerprint(f'{CFG["paths"]["ready"]}dataset_eod.parquet', feats,
+                      {"target": target_col, "n": n, "eta": eta, "seed": seed,
+                       "space": space, "incumbent": incumbent}, memo.setdefault("files", {}))
+    write_state(_fp_path(), memo)
+    ck = read_state(ck_path)
+    if ck.get("id") != sid:
+        cands = [incumbent] + [c for c in sample_configs(n, space, seed) if c != incumbent]
+        ck = {"id": sid, "target": target_col, "candidates": cands,
+              "alive": list(range(len(cands))), "rung": 0, "scores": {}}
+        write_state(ck_path, ck)
+    if "result" in ck:
+        return ck["result"]
+
+    cands, scores = ck["candidates"], ck["scores"]
+    mean = lambda c, k: float(np.mean([scores[f"{c}:{f}"] for f in range(k)]))
+    chunk = max(1, resolve_workers(workers)) * 4
+    # one shared payload + one pool for every rung; checkpoint / budget between chunks
+    with pool((Xs, lab, folds), workers) as run:
+        for r in range(ck["rung"], len(budgets)):
+            k = budgets[r]
+            todo = [(c, f) for c in ck["alive"] for f in range(k) if f"{c}:{f}" not in scores]
+            for i in range(0, len(todo), chunk):
+                part = todo[i:i + chunk]
+                aucs = run(search_auc, [(cands[c], f) for c, f in part])
+                scores.update({f"{c}:{f}": a for (c, f), a in zip(part, aucs)})
+                write_state(ck_path, ck)
+                if budget_s is not None and time.perf_counter() - t0 > budget_s:
+                    log(f"search {out_name}: paused in rung {r} "
+                        f"({len(scores)} fold fits checkpointed)")
+                    return None
+            ranked = sorted(ck["alive"], key=lambda c: -mean(c, k))
+            if r < len(budgets) - 1:
+                keep = ranked[:max(1, -(-len(ranked) // eta))]
+                ck["alive"] = keep + ([0] if 0 not in keep else [])
+            ck["rung"] = r + 1
+            log(f"search {out_name}: rung {r} ({k} folds) best AUC "
+                f"{mean(ranked[0], k):.3f} – {len(ck['alive'])} left")
+            write_state(ck_path, ck)
+
+    k = len(folds)
+    best = max(ck["alive"], key=lambda c: mean(c, k))
+    res = {"best": cands[best], "auc_mean": mean(best, k),
+           "incumbent_auc": mean(0, k), "fits": len(scores),
+           "promoted": bool(best != 0 and mean(best, k) > mean(0, k))}
+    if res["promoted"]:
+        append_csv(f'{CFG["paths"]["reports"]}metrics_log.csv',
+                   train_daily_all(*eod, {out_name: target_col}, workers,
+                                   params={out_name: cands[best]}, search=sid))
+    log(f"search {out_name}: best AUC {res['auc_mean']:.3f} vs incumbent "
+        f"{res['incumbent_auc']:.3f} → {'promoted' if res['promoted'] else 'kept incumbent'}")
+    ck["result"] = res
+    write_state(ck_path, ck)
+    return res
+
+def search_all(workers=None, budget_s=None):
+    """Advance the searches for every DAILY target within one time budget."""
+    t = time.perf_counter()
+    for out_name, target_col in DAILY.items():
+        left = None if budget_s is None else budget_s - (time.perf_counter() - t)
+        if left is not None and left <= 0:
+            return
+        if search(target_col, out_name, workers, left) is None:
+            return
 
 # ── run everything ──────────────────────────────────────────────────
+def plan(symbol="SPY", refit=None):
+    """
+    Fingerprint every stage → ({stage: fingerprint}, {stage: up to date?},
+    memo).  Only Parquet footers are read; dataset bytes are re-hashed only
+    when their [mtime, size] moved.
+    """
+    memo = read_state(_fp_path())
+    files = memo.setdefault("files", {})
+    done = memo.get("stages", {})
+    eod_p = f'{CFG["paths"]["ready"]}dataset_eod.parquet'
+    intra_p = f'{CFG["paths"]["ready"]}dataset_intraday_{symbol}.parquet'
+    feats = [c for c in parquet_columns(eod_p) if c not in NON_FEATS]
+    wf = {**CFG.get("walkforward", {}), **({"refit": refit} if refit is not None else {})}
+    fps = {"daily": fingerprint(eod_p, feats, {"clf": {n: params_for(n) for n in DAILY}, "rounds": ROUNDS,
+                                                "targets": DAILY}, files),
+           "walkforward": fingerprint(eod_p, feats, {"walkforward": wf}, files)}
+    names = {"daily": list(DAILY), "intraday": [f"{symbol.lower()}_reg"], "walkforward": []}
+    if os.path.exists(intra_p):
+        ifeats = [c for c in parquet_columns(intra_p) if c not in ("RET_FWD", symbol)]
+        fps["intraday"] = fingerprint(intra_p, ifeats, {"reg": REG_PARAMS, "rounds": ROUNDS,
+                                                        "quantiles": QUANTILES}, files)
+    fresh = {k: fp is not None and done.get(k) == fp and
+                all(registry.current(n).get("fingerprint") == fp for n in names[k])
+             for k, fp in fps.items()}
+    return fps, fresh, memo
+
+def train_all(symbol="SPY", workers=None, force=False):
+    """
+    Nightly retrain: every model + the walk-forward off one read per dataset.
+    Stages whose fingerprint is unchanged are skipped unless force=True.
+    """
+    t = time.perf_counter()
+    eod_p = f'{CFG["paths"]["ready"]}dataset_eod.parquet'
+    if "TARGET_10D" not in parquet_columns(eod_p):
+        load_eod()                       # persists the column before hashing
+    fps, fresh, memo = plan(symbol)
+    todo = [k for k in fps if force or not fresh[k]]
+    if not todo:
+        log("train_all: inputs unchanged since last publish – nothing to do")
+        write_state(_fp_path(), memo)
+        return []
+
+    eod = load_eod() if {"daily", "walkforward"} & set(todo) else None
+    stages = memo.setdefault("stages", {})
+    if "daily" in todo:
+        append_csv(f'{CFG["paths"]["reports"]}metrics_log.csv',
+                   train_daily_all(*eod, DAILY, workers, fingerprint=fps["daily"]))
+        stages["daily"] = fps["daily"]
+    if "intraday" in todo and train_intraday(symbol, horizon=10, workers=workers,
+                                             fingerprint=fps["intraday"]):
+        stages["intraday"] = fps["intraday"]
+    if "walkforward" in todo and walkforward_backtest(workers=workers, eod=eod) is not None:
+        stages["walkforward"] = fps["walkforward"]
+    write_state(_fp_path(), memo)
+    skipped = [k for k in fps if k not in todo]
+    log(f"train_all done in {time.perf_counter() - t:.1f}s  "
+        f"(ran {', '.join(todo)}{'; unchanged ' + ', '.join(skipped) if skipped else ''})")
+    return todo
+
+def main(force=False):
+    train_all(force=force)
+
 if __name__ == "__main__":
-    # ensure TARGET_10D exists – add once to feature file if missing
-    fe_path = f'{CFG["paths"]["ready"]}dataset_eod.parquet'
-    df_eod = pd.read_parquet(fe_path)
-    if "TARGET_10D" not in df_eod.columns:
-        df_eod["TARGET_10D"] = np.sign(df_eod["SPY"].shift(-10)/df_eod["SPY"]-1)\
-                               .replace(0,np.nan)
-        df_eod.to_parquet(fe_path)
-
-    train_daily("TARGET_5D",  "daily_clf_5d")
-    train_daily("TARGET_10D", "daily_clf_10d")
-    train_intraday("SPY", horizon=10)
-    walkforward_backtest()
-
-log(f"=== EXIT  {__file__} ===")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--force", action="store_true",
+                    help="retrain even if the input fingerprints are unchanged")
+    ap.add_argument("--search", action="store_true",
+                    help="run / resume the hyper-parameter search instead")
+    ap.add_argument("--budget", type=float, help="seconds before --search pauses")
+    args = ap.parse_args()
+    log(f"=== ENTER {__file__} ===")
+    if args.search:
+        search_all(budget_s=args.budget)
+    else:
+        main(args.force)
+    log(f"=== EXIT  {__file__} ===")
@@ -1,8 +1,9 @@
-import os, yaml, pathlib
+import os, re, json, time, threading, contextlib, collections, yaml, pathlib
 
 def load_config(path: str | None = None):
-    """Return parsed YAML; fall back to sane defaults."""
-    path = path or pathlib.Path(__file__).with_name("config.yml")
+    """Return parsed YAML ($VIX_CONFIG, else config.yml here); fall back to sane defaults."""
+    path = pathlib.Path(path or os.environ.get("VIX_CONFIG")
+                        or pathlib.Path(__file__).with_name("config.yml"))
     if not path.exists():
         return {"paths": {}, "symbols": []}
     with open(path, "r") as fh:
@@ -17,5 +18,102 @@ def ensure_dirs():
     for p in CFG["paths"].values():
         os.makedirs(p, exist_ok=True)
 
-def log(msg, lvl=20):
-    print(f"{lvl}| {msg}")
+def log(msg, lvl=20, level=None):
+    """`<lvl>| msg` on stdout; level= is accepted as an alias of lvl."""
+    print(f"{lvl if level is None else level}| {msg}")
+
+# ── tracing: timed spans + counters ─────────────────────────────────
+# with span("fit"): … times a block (also usable as @span("book")).
+# Nested spans get slash-joined paths ("train/fit"); each thread keeps
+# its own stack.  Per-path totals and counters accumulate in memory and
+# trace_flush() (once per daemon cycle) appends the finished span events
+# plus a counter snapshot to reports/trace.jsonl and rewrites
+# reports/metrics.prom in Prometheus textfile format.  A span costs two
+# perf_counter() calls, a dict update and a bounded deque append.
+SPANS    = {}                 # path → {"n", "errors", "total_s", "max_s", "last_s"}
+COUNTERS = {}                 # name → running total (rows_read, bytes_read, …)
+MAX_EVENTS = 100_000          # unflushed span events kept (oldest dropped)
+_EVENTS  = collections.deque(maxlen=MAX_EVENTS)
+_TLS     = threading.local()
+_LOCK    = threading.Lock()
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    stack = getattr(_TLS, "stack", None)
+    if stack is None:
+        stack = _TLS.stack = []
+    path = f"{stack[-1]}/{name}" if stack else name
+    stack.append(path)
+    t, ok = time.perf_counter(), True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        dt = time.perf_counter() - t
+        stack.pop()
+        with _LOCK:
+            st = SPANS.get(path)
+            if st is None:
+                st = SPANS[path] = {"n": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0}
+            st["n"] += 1
+            st["errors"] += not ok
+            st["total_s"] += dt
+            st["last_s"] = dt
+            st["max_s"] = max(st["max_s"], dt)
+            _EVENTS.append({"ts": time.time(), "span": path, "s": round(dt, 6),
+                            **({} if ok else {"error": True}), **attrs})
+
+def count(name, n=1):
+    """Add n to counter `name` (rows processed, bytes read …)."""
+    with _LOCK:
+        COUNTERS[name] = COUNTERS.get(name, 0) + n
+
+def _prom_name(s):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", s)
+
+def prometheus(spans=None, counters=None) -> str:
+    """Span totals + counters in Prometheus text exposition format."""
+    spans = SPANS if spans is None else spans
+    counters = COUNTERS if counters is None else counters
+    out = []
+    for metric, key, kind, help_ in (
+            ("vix_span_seconds_total", "total_s", "counter", "wall time spent in the span"),
+            ("vix_span_calls_total",   "n",       "counter", "times the span was entered"),
+            ("vix_span_errors_total",  "errors",  "counter", "span exits by exception"),
+            ("vix_span_last_seconds",  "last_s",  "gauge",   "duration of the latest run"),
+            ("vix_span_max_seconds",   "max_s",   "gauge",   "slowest run since start")):
+        out += [f"# HELP {metric} {help_}", f"# TYPE {metric} {kind}"]
+        out += [f'{metric}{{span="{p}"}} {st[key]:.6g}' for p, st in sorted(spans.items())]
+    for name, v in sorted(counters.items()):
+        metric = f"vix_{_prom_name(name)}_total"
+        out += [f"# TYPE {metric} counter", f"{metric} {v:.12g}"]
+    return "\n".join(out) + "\n"
+
+def trace_flush():
+    """
+    Append unflushed span events + a counter snapshot to the JSON-lines
+    trace and rewrite the Prometheus textfile (CFG['trace']; the jsonl is
+    rotated to .1 past max_mb).  No-op without a reports path or when
+    trace.enabled is false.
+    """
+    cfg, rep = CFG.get("trace", {}), CFG["paths"].get("reports")
+    if not rep or not cfg.get("enabled", True):
+        return
+    with _LOCK:
+        events = list(_EVENTS)
+        _EVENTS.clear()
+        spans = {k: dict(v) for k, v in SPANS.items()}
+        counters = dict(COUNTERS)
+    os.makedirs(rep, exist_ok=True)
+    jl = f'{rep}{cfg.get("jsonl", "trace.jsonl")}'
+    if os.path.exists(jl) and os.path.getsize(jl) > cfg.get("max_mb", 50) * 2**20:
+        os.replace(jl, jl + ".1")
+    with open(jl, "a") as fh:
+        fh.writelines(json.dumps(e) + "\n" for e in events)
+        fh.write(json.dumps({"ts": time.time(), "counters": counters}) + "\n")
+    prom = f'{rep}{cfg.get("prom", "metrics.prom")}'
+    with open(prom + ".tmp", "w") as fh:
+        fh.write(prometheus(spans, counters))
+    os.replace(prom + ".tmp", prom)
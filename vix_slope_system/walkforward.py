@@ -0,0 +1,159 @@
+"""
+walkforward.py
+───────────────────────────────────────────────────────────────────────────────
+Incremental walk-forward engine for the daily direction classifier.
+
+The legacy loop refit a fresh StandardScaler + LGBMClassifier on df.iloc[:i]
+for every day i ≥ 252, which is O(N²).  Here the model is refit on a cadence:
+
+    refit = 1 | "daily"   → every bar (reproduces the legacy numbers exactly)
+            "weekly"      → every 5 bars
+            N  (int)      → every N bars
+            "drift"       → when the running feature means move more than
+                            `drift_z` scaler-σ away from the last refit
+                            (or after `max_age` bars, whichever comes first)
+
+Between refits the last model is reused while the scaler statistics are
+updated incrementally (StandardScaler.partial_fit) with every bar that joins
+the training window, so each prediction is still standardised with the
+statistics of df.iloc[:i] – exactly what the legacy loop used.
+
+A "fold" is the run of bars served by one fitted model; each fold reports
+its fit / predict wall-time so the nightly log shows where time goes.  The
+fold plan is computed up-front, so folds are independent and can fan out
+over a process pool (workers > 1) with results merged back in order.
+"""
+import time, numpy as np
+from functools import partial
+from sklearn.preprocessing import StandardScaler
+from lightgbm import LGBMClassifier
+from tqdm import tqdm
+from parallel import pmap, STABLE
+
+CADENCES = {"daily": 1, "weekly": 5}
+
+# ── helpers ─────────────────────────────────────────────────────────
+def parse_refit(refit):
+    """Return (every_n_bars, drift_trigger) for a cadence spec."""
+    if isinstance(refit, str):
+        key = refit.strip().lower()
+        if key == "drift":
+            return None, True
+        if key in CADENCES:
+            return CADENCES[key], False
+        refit = int(key)
+    every = int(refit)
+    if every < 1:
+        raise ValueError(f"refit cadence must be ≥ 1 bar, got {refit!r}")
+    return every, False
+
+def signal(prob_up, hi=0.6, lo=0.4):
+    """+1 / -1 / 0 call from P(up) – same thresholds as live_predict."""
+    return 1 if prob_up > hi else -1 if prob_up < lo else 0
+
+def make_model(**params):
+    return LGBMClassifier(**{"num_leaves": 31, "verbosity": -1, **STABLE, **params})
+
+# ── fold planning ───────────────────────────────────────────────────
+def plan_folds(X, start, stop, every=None, drift=False, drift_z=0.5,
+               max_age=21):
+    """
+    Return [(a, b), ...] – the model refit at bar a serves bars a..b-1.
+    Fixed cadences are pure arithmetic; the drift trigger only needs the
+    prefix means / σ of X, so the plan is known before any model is fit
+    and the folds can be run independently (see parallel.pmap).
+    """
+    if not drift:
+        edges = list(range(start, stop, every)) + [stop]
+        return list(zip(edges[:-1], edges[1:]))
+
+    csum = np.cumsum(X, axis=0)
+    folds, a = [], start
+    while a < stop:
+        ref_mean = X[:a].mean(axis=0)
+        ref_scale = X[:a].std(axis=0)
+        ref_scale[ref_scale == 0] = 1.0          # StandardScaler convention
+        b = a + 1
+        while b < stop and b - a < max_age:
+            mean_b = csum[b-1] / b               # μ of X[:b] – the running scaler
+            if np.max(np.abs(mean_b - ref_mean) / ref_scale) > drift_z:
+                break
+            b += 1
+        folds.append((a, b))
+        a = b
+    return folds
+
+# ── one fold ────────────────────────────────────────────────────────
+def run_fold(payload, fold, threads=None):
+    """
+    Fit on X[:a], then predict bars a..b-1, folding each bar that joins the
+    training window into the scaler statistics.  Module-level so it can be
+    shipped to a process pool.
+    """
+    X, y, model_params = payload
+    a, b = fold
+    params = dict(model_params)
+    if threads is not None:
+        params["n_jobs"] = threads
+
+    t = time.perf_counter()
+    scaler = StandardScaler().fit(X[:a])
+    model = make_model(**params).fit(scaler.transform(X[:a]), y[:a])
+    out = {"start": a, "bars": b - a, "trades": 0, "wins": 0,
+           "fit_s": time.perf_counter() - t, "predict_s": 0.0}
+
+    t = time.perf_counter()
+    for i in range(a, b):
+        if i > a:
+            scaler.partial_fit(X[i-1:i])         # bar i-1 joined the window
+        prob_up = model.predict_proba(scaler.transform(X[i:i+1]))[0, 1]
+        pred = signal(prob_up)
+        if pred != 0:
+            out["trades"] += 1
+            if pred == int(y[i]):
+                out["wins"] += 1
+    out["predict_s"] = time.perf_counter() - t
+    return out
+
+# ── engine ──────────────────────────────────────────────────────────
+def run_walkforward(df, feats, target="TARGET_5D", refit=1, start=252,
+                    stop=None, drift_z=0.5, max_age=21, model_params=None,
+                    workers=1, progress=True):
+    """
+    Walk forward over df.iloc[start:stop] one bar at a time and score the
+    thresholded P(up) call against `target`.  Folds fan out over
+    `workers` processes (parallel.pmap) and are merged back in order.
+
+    Returns a dict with rows / trades / wins / win_rate / refits / elapsed
+    and a per-fold list of {start, bars, trades, wins, fit_s, predict_s}.
+    """
+    every, drift = parse_refit(refit)
+    stop = len(df) - 5 if stop is None else stop
+    X = df[feats].to_numpy()
+    y = df[target].to_numpy()
+
+    t0 = time.perf_counter()
+    plan = plan_folds(X, start, stop, every, drift, drift_z, max_age)
+    bar = (partial(tqdm, desc="Walk-forward", ncols=70, ascii=True)
+           if progress else None)
+    folds = pmap(run_fold, plan, (X, y, model_params or {}), workers, bar)
+
+    wins = sum(f["wins"] for f in folds)
+    trades = sum(f["trades"] for f in folds)
+    return {
+        "rows": len(df),
+        "trades": trades,
+        "wins": wins,
+        "win_rate": wins / trades if trades else 0,
+        "refits": len(folds),
+        "elapsed": time.perf_counter() - t0,
+        "folds": folds,
+    }
+
+def fold_summary(res) -> str:
+    """One-line timing summary for the log."""
+    fit = [f["fit_s"] for f in res["folds"]] or [0.0]
+    pred = sum(f["predict_s"] for f in res["folds"])
+    return (f"{res['refits']} refits in {res['elapsed']:.1f}s  "
+            f"(fit mean {np.mean(fit):.3f}s / max {np.max(fit):.3f}s, "
+            f"predict total {pred:.2f}s)")